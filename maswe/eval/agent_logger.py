@@ -3,21 +3,41 @@
 """
 Lightweight agent-level logging & workflow tracing utilities for MASWE.
 
-This module does NOT depend on MetaGPT internals; it just provides a simple
-filesystem-based logger that other parts of the system can call into.
+The logger itself does NOT depend on MetaGPT internals; it just provides a
+simple filesystem-based logger that other parts of the system can call into.
+LLMLoggingWrapper optionally reads the per-call usage/timing metrics that
+MetaGPT providers publish (metagpt.provider.base_llm.pop_call_metrics).
 """
 
 from __future__ import annotations
 
+import atexit
 import json
+import logging
 import os
+import queue
+import threading
+from collections import defaultdict
 from dataclasses import dataclass, asdict, field
 from datetime import datetime
+from time import monotonic
 from typing import Any, Dict, Optional, List
 
+try:
+    from metagpt.provider.base_llm import pop_call_metrics
+except Exception:
+    pop_call_metrics = None
+
+
+_log = logging.getLogger(__name__)
 
 DEFAULT_LOG_BASE = os.environ.get("MASWE_AGENT_LOG_DIR", "/app/workspace/agent_logs")
 
+# fsync policy of the background writer
+FSYNC_NEVER = "never"    # leave it to the OS
+FSYNC_CLOSE = "close"    # once, when the logger is closed
+FSYNC_ALWAYS = "always"  # after every batch
+
 
 def _now_iso() -> str:
     return datetime.utcnow().isoformat(timespec="milliseconds") + "Z"
@@ -31,38 +51,207 @@ class TraceEvent:
     data: Dict[str, Any] = field(default_factory=dict)
 
 
+def _open_append(path: str):
+    """Open a JSON lines file for appending, ending a line torn by a crash first so the next record stays whole."""
+    f = open(path, "a", encoding="utf-8")
+    if f.tell():
+        with open(path, "rb") as r:
+            r.seek(-1, os.SEEK_END)
+            if r.read(1) != b"\n":
+                f.write("\n")
+    return f
+
+
+class _BufferedWriter:
+    """
+    Background thread that appends JSON lines to files in one directory.
+
+    Records are serialized on the caller's thread (so later mutation can't
+    leak into the log) and written in batches every `flush_interval` seconds
+    or once `max_batch` lines are pending; file handles stay open until close.
+    Logging never fails the caller: records written after close, or after the
+    thread died, are dropped with a warning, and flush/close give up after
+    `timeout` seconds.
+    """
+
+    _TICK = object()
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval: float = 1.0,
+        max_batch: int = 1000,
+        fsync: str = FSYNC_CLOSE,
+        timeout: float = 30.0,
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.timeout = timeout
+        self.dropped = 0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="agent-logger", daemon=True)
+        self._thread.start()
+
+    def write(self, filename: str, record: Dict[str, Any]) -> None:
+        if self._closed or not self._thread.is_alive():
+            if not self.dropped:
+                _log.warning("agent logger is %s, dropping records", "closed" if self._closed else "not running")
+            self.dropped += 1
+            return
+        self._queue.put((filename, json.dumps(record, ensure_ascii=False)))
+
+    def _wait(self, done: threading.Event, what: str) -> None:
+        deadline = monotonic() + self.timeout
+        while not done.wait(timeout=min(0.5, max(0.0, deadline - monotonic()))):
+            if not self._thread.is_alive() or monotonic() >= deadline:
+                _log.warning("agent logger %s gave up: writer thread %s", what,
+                             "is stuck" if self._thread.is_alive() else "died")
+                return
+
+    def flush(self) -> None:
+        """Block until everything written so far is on disk (or in the OS cache)."""
+        if self._closed or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        self._wait(done, "flush")
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=self.timeout)
+        if self._thread.is_alive():
+            _log.warning("agent logger close gave up after %.0fs, pending records may be lost", self.timeout)
+
+    def _run(self) -> None:
+        files: Dict[str, Any] = {}
+        pending: Dict[str, List[str]] = defaultdict(list)
+        n_pending = 0
+        last_flush = monotonic()
+
+        def write_pending(sync: bool) -> None:
+            for filename, lines in pending.items():
+                f = files.get(filename)
+                if f is None:
+                    f = files[filename] = _open_append(os.path.join(self.directory, filename))
+                f.write("\n".join(lines) + "\n")
+            for f in files.values():
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+            pending.clear()
+
+        while True:
+            timeout = max(0.0, self.flush_interval - (monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = self._TICK
+
+            if item is None:
+                write_pending(sync=self.fsync != FSYNC_NEVER)
+                for f in files.values():
+                    f.close()
+                return
+            if isinstance(item, threading.Event):
+                write_pending(sync=self.fsync == FSYNC_ALWAYS)
+                n_pending, last_flush = 0, monotonic()
+                item.set()
+                continue
+            if item is not self._TICK:
+                filename, line = item
+                pending[filename].append(line)
+                n_pending += 1
+
+            if n_pending >= self.max_batch or monotonic() - last_flush >= self.flush_interval:
+                if n_pending:
+                    write_pending(sync=self.fsync == FSYNC_ALWAYS)
+                n_pending, last_flush = 0, monotonic()
+
+
 class AgentLogger:
     """
     Filesystem-based logger for:
       - per-role logs (pm / architect / dev / coord / reviewer)
       - LLM calls (JSONL)
-      - workflow trace events (JSON list in trace.json)
+      - workflow trace events (append-only trace.jsonl, compacted into a
+        JSON list in trace.json on close)
+
+    All writes go through a buffered background writer; call `close()` (also
+    registered with atexit) to flush and produce trace.json.
     """
 
-    def __init__(self, run_id: str, base_dir: str = DEFAULT_LOG_BASE) -> None:
+    TRACE_LOG = "trace.jsonl"
+    TRACE_FILE = "trace.json"
+
+    def __init__(
+        self,
+        run_id: str,
+        base_dir: str = DEFAULT_LOG_BASE,
+        flush_interval: float = 1.0,
+        fsync: str = FSYNC_CLOSE,
+    ) -> None:
         self.run_id = run_id
         self.base_dir = os.path.abspath(base_dir)
         self.run_dir = os.path.join(self.base_dir, self.run_id)
 
         os.makedirs(self.run_dir, exist_ok=True)
 
-        # lazily written, no long-lived file handles
-        self._trace_events: List[TraceEvent] = []
+        self._writer = _BufferedWriter(self.run_dir, flush_interval=flush_interval, fsync=fsync)
+        self._closed = False
+        atexit.register(self.close)
 
     # ------------------------------------------------------------------
     # helpers
     # ------------------------------------------------------------------
     def _write_line(self, filename: str, record: Dict[str, Any]) -> None:
-        path = os.path.join(self.run_dir, filename)
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._writer.write(filename, record)
 
     def _append_trace(self, event: TraceEvent) -> None:
-        self._trace_events.append(event)
-        # overwrite full trace.json each time – simpler and logs are small
-        path = os.path.join(self.run_dir, "trace.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump([asdict(e) for e in self._trace_events], f, ensure_ascii=False, indent=2)
+        self._writer.write(self.TRACE_LOG, asdict(event))
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def close(self) -> None:
+        """Flush pending records and compact trace.jsonl into trace.json."""
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.close()
+        self._compact_trace()
+
+    def _compact_trace(self) -> None:
+        src = os.path.join(self.run_dir, self.TRACE_LOG)
+        if not os.path.exists(src):
+            return
+        events = []
+        with open(src, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # torn line left by a crash
+        dst = os.path.join(self.run_dir, self.TRACE_FILE)
+        tmp = dst + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(events, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, dst)
+
+    def __enter__(self) -> "AgentLogger":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
     # ------------------------------------------------------------------
     # role logs
@@ -200,17 +389,29 @@ class LLMLoggingWrapper:
             except Exception:
                 prompt_text = str(messages)
 
-        from time import monotonic
         start = monotonic()
+        if pop_call_metrics is not None:
+            pop_call_metrics()  # drop metrics of an earlier call in this task
         result = await self._llm.acompletion_text(messages, *args, **kwargs)
         latency = monotonic() - start
 
-        def est_tokens(text: str) -> int:
-            # very rough approximation: 1 token ~ 4 chars
-            return max(1, int(len(text) / 4))
-
-        prompt_tokens = est_tokens(prompt_text)
-        completion_tokens = est_tokens(result)
+        metrics = pop_call_metrics() if pop_call_metrics is not None else None
+        if metrics is not None:
+            prompt_tokens = metrics.prompt_tokens
+            completion_tokens = metrics.completion_tokens
+            timing = {
+                "usage_source": metrics.usage_source,
+                "ttft_sec": metrics.ttft_sec,
+                "queue_sec": metrics.queue_sec,
+                "prefill_sec": metrics.prefill_sec,
+                "generation_sec": metrics.generation_sec,
+                "tokens_per_sec": metrics.tokens_per_sec,
+            }
+        else:
+            # provider reported nothing: very rough approximation, 1 token ~ 4 chars
+            prompt_tokens = max(1, int(len(prompt_text) / 4))
+            completion_tokens = max(1, int(len(result) / 4))
+            timing = {"usage_source": "estimate"}
 
         if self._logger is not None:
             # detailed request/response
@@ -222,6 +423,7 @@ class LLMLoggingWrapper:
                 completion_tokens=completion_tokens,
                 run_id=self._run_id,
                 latency_sec=latency,
+                **timing,
             )
             # lightweight per-role summary line
             self._logger.log_role(
@@ -230,6 +432,7 @@ class LLMLoggingWrapper:
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
                 latency_sec=latency,
+                **timing,
             )
 
         return result
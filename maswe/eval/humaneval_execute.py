@@ -1,6 +1,22 @@
+import atexit
 import contextlib
 import io
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
 import traceback
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from multiprocessing.connection import wait as wait_connections
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 SAFE_GLOBALS = {
     "__builtins__": {
@@ -24,7 +40,10 @@ SAFE_GLOBALS = {
 }
 
 def execute_code_with_tests(function_code: str, test_code: str):
-    """Executes function_code + test_code in an isolated environment."""
+    """Executes function_code + test_code in-process (no timeout, no memory limit).
+
+    Prefer `SandboxPool` / `evaluate_samples` for untrusted model output.
+    """
     env = SAFE_GLOBALS.copy()
     buffer = io.StringIO()
 
@@ -36,11 +55,309 @@ def execute_code_with_tests(function_code: str, test_code: str):
     except Exception as e:
         return False, traceback.format_exc()
 
+# ============================================================
+# Sandboxed process-pool execution
+# ============================================================
+
+STATUS_PASSED = "passed"
+STATUS_FAILED = "failed"  # an assertion in the tests failed
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"  # syntax/runtime error, memory limit or worker crash
+
+DEFAULT_TIMEOUT_SEC = 5.0
+DEFAULT_MEMORY_LIMIT_MB = 1024
+DEFAULT_MAX_TASKS_PER_WORKER = 200
+
+# extra wall-clock time before the parent hard-kills a worker whose in-process
+# alarm did not fire (e.g. stuck inside a C call such as a huge bigint power)
+_HARD_KILL_GRACE_SEC = 1.0
+_POLL_INTERVAL_SEC = 0.05
+
+
+@dataclass
+class SampleResult:
+    """Structured outcome of running one sample against its tests."""
+
+    status: str
+    error: Optional[str] = None
+    duration_sec: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.status == STATUS_PASSED
+
+    def to_dict(self) -> dict:
+        rec = asdict(self)
+        rec["passed"] = self.passed
+        return rec
+
+
+class _SampleTimeout(BaseException):
+    """Raised by SIGALRM inside a worker; BaseException so `except Exception` in samples can't swallow it."""
+
+
+def _on_alarm(signum, frame):
+    raise _SampleTimeout()
+
+
+def _apply_memory_limit(memory_limit_mb: Optional[int]):
+    if not memory_limit_mb or resource is None:
+        return
+    limit = int(memory_limit_mb) * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _run_sample(function_code: str, test_code: str, timeout_sec: float) -> SampleResult:
+    """Run one sample inside a worker process with a soft (SIGALRM) time limit."""
+    env = SAFE_GLOBALS.copy()
+    start = time.monotonic()
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout_sec)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(function_code, env)
+            exec(test_code, env)
+        status, error = STATUS_PASSED, None
+    except _SampleTimeout:
+        status, error = STATUS_TIMEOUT, f"timed out after {timeout_sec}s"
+    except AssertionError:
+        status, error = STATUS_FAILED, traceback.format_exc()
+    except MemoryError:
+        status, error = STATUS_ERROR, "memory limit exceeded"
+    except BaseException:
+        status, error = STATUS_ERROR, traceback.format_exc()
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return SampleResult(status=status, error=error, duration_sec=time.monotonic() - start)
+
+
+def _worker_main(conn, memory_limit_mb: Optional[int]):
+    _apply_memory_limit(memory_limit_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        conn.send(_run_sample(*job))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb: Optional[int]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.future: Optional[Future] = None
+        self.started = 0.0
+        self.tasks_done = 0
+
+    def assign(self, future: Future, function_code: str, test_code: str, timeout_sec: float):
+        self.future = future
+        self.started = time.monotonic()
+        self.conn.send((function_code, test_code, timeout_sec))
+
+    def stop(self, kill: bool = False):
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                kill = True
+        if kill and self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    N long-lived worker processes that execute untrusted samples.
+
+    - per-sample wall-clock limit: SIGALRM inside the worker, plus a hard kill
+      from the parent if the worker does not answer in time
+    - per-worker memory limit via RLIMIT_AS
+    - crashed / killed workers are replaced transparently, and every worker is
+      recycled after `max_tasks_per_worker` samples
+
+    Usage:
+        with SandboxPool(workers=8) as pool:
+            results = pool.map([(code, test_code), ...])
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout_sec: float = DEFAULT_TIMEOUT_SEC,
+        memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+        max_tasks_per_worker: int = DEFAULT_MAX_TASKS_PER_WORKER,
+    ):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.timeout_sec = timeout_sec
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+
+        self._ctx = mp.get_context()
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # public API
+    # ------------------------------------------------------------------
+    def submit(self, function_code: str, test_code: str) -> Future:
+        """Schedule one sample; the returned future resolves to a SampleResult."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SandboxPool is shut down")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, name="sandbox-pool", daemon=True)
+                self._thread.start()
+            self._jobs.put((future, function_code, test_code))
+        return future
+
+    def map(self, jobs: Sequence[Tuple[str, str]]) -> List[SampleResult]:
+        """Run (function_code, test_code) pairs in parallel, results in input order."""
+        futures = [self.submit(code, test_code) for code, test_code in jobs]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._jobs.put(None)
+        if thread is not None:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    # ------------------------------------------------------------------
+    # dispatcher thread
+    # ------------------------------------------------------------------
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.memory_limit_mb)
+
+    def _finish(self, worker: _Worker, result: SampleResult):
+        future, worker.future = worker.future, None
+        worker.tasks_done += 1
+        if not future.done():
+            future.set_result(result)
+
+    def _dispatch_loop(self):
+        idle: List[_Worker] = [self._spawn() for _ in range(self.workers)]
+        busy: List[_Worker] = []
+        closing = False
+
+        while True:
+            # 1. hand queued samples to idle workers (block only when nothing is running)
+            while idle and not closing:
+                try:
+                    item = self._jobs.get(block=not busy, timeout=None if not busy else 0)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                future, function_code, test_code = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                worker = idle.pop()
+                try:
+                    worker.assign(future, function_code, test_code, self.timeout_sec)
+                except (OSError, BrokenPipeError):
+                    worker.stop(kill=True)
+                    worker = self._spawn()
+                    worker.assign(future, function_code, test_code, self.timeout_sec)
+                busy.append(worker)
+
+            if not busy:
+                if closing:
+                    break
+                continue
+
+            # 2. collect finished samples, detect crashes and hard timeouts
+            ready = wait_connections([w.conn for w in busy], timeout=_POLL_INTERVAL_SEC)
+            now = time.monotonic()
+            for worker in list(busy):
+                replace = False
+                if worker.conn in ready:
+                    try:
+                        self._finish(worker, worker.conn.recv())
+                    except (EOFError, OSError):
+                        worker.process.join(timeout=1)
+                        self._finish(
+                            worker,
+                            SampleResult(
+                                status=STATUS_ERROR,
+                                error=f"worker crashed (exit code {worker.process.exitcode})",
+                                duration_sec=now - worker.started,
+                            ),
+                        )
+                        replace = True
+                elif now - worker.started > self.timeout_sec + _HARD_KILL_GRACE_SEC:
+                    self._finish(
+                        worker,
+                        SampleResult(
+                            status=STATUS_TIMEOUT,
+                            error=f"killed after {self.timeout_sec}s",
+                            duration_sec=now - worker.started,
+                        ),
+                    )
+                    replace = True
+                else:
+                    continue
+
+                busy.remove(worker)
+                if replace:
+                    worker.stop(kill=True)
+                    worker = self._spawn()
+                elif worker.tasks_done >= self.max_tasks_per_worker:
+                    worker.stop()
+                    worker = self._spawn()
+                idle.append(worker)
+
+        for worker in idle:
+            worker.stop()
+
+
+_DEFAULT_POOL: Optional[SandboxPool] = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def get_default_pool() -> SandboxPool:
+    """Lazily created module-wide pool, used when callers don't pass their own."""
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = SandboxPool()
+            atexit.register(_DEFAULT_POOL.shutdown)
+        return _DEFAULT_POOL
+
+
 # ============================================================
 # New helpers for HumanEval pipeline
 # ============================================================
 
-def check_solution(code: str, entry_point: str, test_code: str):
+def check_solution(code: str, entry_point: str, test_code: str, pool: Optional[SandboxPool] = None):
     """
     兼容 humaneval_pipeline 的接口：
     - code: 模型生成的完整函数代码
@@ -48,22 +365,23 @@ def check_solution(code: str, entry_point: str, test_code: str):
     - test_code: HumanEval 自带的测试代码（assert ...）
 
     返回:
-        {"passed": bool, "error": Optional[str]}
+        {"passed": bool, "error": Optional[str], "status": str, "duration_sec": float}
+    """
+    pool = pool or get_default_pool()
+    return pool.submit(code, test_code).result().to_dict()
+
+
+def evaluate_samples_detailed(entry_point: str, samples, test_code: str, pool: Optional[SandboxPool] = None):
+    """
+    对多次采样的代码并行评测，返回 SampleResult 列表（顺序与 samples 一致）。
     """
-    ok, details = execute_code_with_tests(code, test_code)
-    if ok:
-        return {"passed": True, "error": None}
-    else:
-        return {"passed": False, "error": details}
+    pool = pool or get_default_pool()
+    return pool.map([(code, test_code) for code in samples])
 
 
-def evaluate_samples(entry_point: str, samples, test_code: str):
+def evaluate_samples(entry_point: str, samples, test_code: str, pool: Optional[SandboxPool] = None):
     """
     对多次采样的代码进行评测，返回一个 bool 列表：
     [True, False, True, ...]
     """
-    results = []
-    for code in samples:
-        res = check_solution(code, entry_point, test_code)
-        results.append(res["passed"])
-    return results
+    return [r.passed for r in evaluate_samples_detailed(entry_point, samples, test_code, pool=pool)]
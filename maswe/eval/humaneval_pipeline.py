@@ -1,8 +1,16 @@
 import json
+import os
 import asyncio
-from typing import List, Dict, Any
-from maswe.eval.humaneval_execute import check_solution, evaluate_samples
+from typing import List, Dict, Any, Optional, Tuple
+from maswe.eval.humaneval_execute import (
+    SampleResult,
+    SandboxPool,
+    check_solution,
+    evaluate_samples_detailed,
+    get_default_pool,
+)
 from maswe.eval.eval_utils import compute_pass_at_k
+from metagpt.provider.base_llm import cache_sample
 def load_humaneval(max_problems=None):
     return load_humaneval_dataset(max_problems=max_problems)
 
@@ -25,8 +33,9 @@ def load_humaneval_dataset(path="maswe/eval/humaneval.jsonl", max_problems=None)
 # ================================================================
 async def generate_code_samples(model, prompt: str, n_samples: int):
     samples = []
-    for _ in range(n_samples):
-        out = await model.run(prompt)
+    for sample_id in range(n_samples):
+        with cache_sample(sample_id):  # one cached reply per sample, not n copies of the first
+            out = await model.run(prompt)
         samples.append(out)
     return samples
 
@@ -34,8 +43,9 @@ async def generate_code_samples(model, prompt: str, n_samples: int):
 # ================================================================
 # Evaluate pass@k for one HumanEval problem
 # ================================================================
-def evaluate_problem_passk(entry_point: str, samples: List[str], test_code: str, k=3):
-    results = evaluate_samples(entry_point, samples, test_code)
+def summarize_passk(records, k=3):
+    """Turn a list of SampleResult records into the pass@k summary dict."""
+    results = [r.passed for r in records]
     num_correct = sum(results)
     num_total = len(results)
     pass_k = compute_pass_at_k(num_total, num_correct, k)
@@ -43,10 +53,236 @@ def evaluate_problem_passk(entry_point: str, samples: List[str], test_code: str,
         "num_correct": num_correct,
         "num_total": num_total,
         "results": results,
+        "records": [r.to_dict() for r in records],
         "pass@k": pass_k,
     }
 
 
+def evaluate_problem_passk(entry_point: str, samples: List[str], test_code: str, k=3, pool: Optional[SandboxPool] = None):
+    records = evaluate_samples_detailed(entry_point, samples, test_code, pool=pool)
+    return summarize_passk(records, k=k)
+
+
+# ================================================================
+# Resumable runs: per-sample checkpoint keyed by run_id
+# ================================================================
+class HumanEvalCheckpoint:
+    """
+    Append-only checkpoint of one HumanEval run.
+
+        <root>/<run_id>/meta.json          run configuration (model, n_samples, ...)
+        <root>/<run_id>/generations.jsonl  {"task_id", "sample_id", "code"}
+        <root>/<run_id>/results.jsonl      {"task_id", "sample_id", "status", "error", "duration_sec"}
+
+    Records are flushed as soon as they are produced, so after a crash a
+    re-run with the same run_id only pays for the missing (task_id, sample_id)
+    pairs. A torn last line (crash mid-write) is ignored on load and truncated
+    before the next append.
+    """
+
+    GENERATIONS = "generations.jsonl"
+    RESULTS = "results.jsonl"
+    META = "meta.json"
+
+    def __init__(self, root: str, run_id: str):
+        self.run_id = run_id
+        self.run_dir = os.path.join(root, run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        self.generations: Dict[Tuple[str, int], str] = {
+            key: rec["code"] for key, rec in self._load(self.GENERATIONS).items()
+        }
+        self.results: Dict[Tuple[str, int], SampleResult] = {
+            key: SampleResult(status=rec["status"], error=rec.get("error"), duration_sec=rec.get("duration_sec", 0.0))
+            for key, rec in self._load(self.RESULTS).items()
+        }
+        self._files = {}
+
+    def _load(self, filename: str) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        records = {}
+        path = os.path.join(self.run_dir, filename)
+        if not os.path.exists(path):
+            return records
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[(rec["task_id"], int(rec["sample_id"]))] = rec
+        return records
+
+    @staticmethod
+    def _drop_torn_tail(path: str, chunk_size: int = 4096):
+        """Truncate a file to its last newline, so a record torn by a crash is not merged with the next one."""
+        if not os.path.exists(path):
+            return
+        with open(path, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(0, pos - chunk_size)
+                f.seek(start)
+                idx = f.read(pos - start).rfind(b"\n")
+                if idx >= 0:
+                    pos = start + idx + 1
+                    break
+                pos = start
+            if pos < end:
+                f.truncate(pos)
+
+    def _append(self, filename: str, record: Dict[str, Any]):
+        f = self._files.get(filename)
+        if f is None:
+            path = os.path.join(self.run_dir, filename)
+            self._drop_torn_tail(path)
+            f = self._files[filename] = open(path, "a", encoding="utf-8")
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+
+    def check_meta(self, meta: Dict[str, Any]):
+        """Store the run configuration, or verify it matches the one being resumed."""
+        path = os.path.join(self.run_dir, self.META)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            diff = {k: (saved.get(k), v) for k, v in meta.items() if saved.get(k) != v}
+            if diff:
+                raise ValueError(f"run_id {self.run_id!r} was started with a different config: {diff}")
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def record_generation(self, task_id: str, sample_id: int, code: str):
+        self.generations[(task_id, sample_id)] = code
+        self._append(self.GENERATIONS, {"task_id": task_id, "sample_id": sample_id, "code": code})
+
+    def record_result(self, task_id: str, sample_id: int, result: SampleResult):
+        self.results[(task_id, sample_id)] = result
+        self._append(
+            self.RESULTS,
+            {
+                "task_id": task_id,
+                "sample_id": sample_id,
+                "status": result.status,
+                "error": result.error,
+                "duration_sec": result.duration_sec,
+            },
+        )
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+# ================================================================
+# Pipelined generate -> evaluate (producer / consumer)
+# ================================================================
+async def run_humaneval_pipeline(
+    generate,
+    dataset,
+    n_samples: int,
+    k: Optional[int] = None,
+    pool: Optional[SandboxPool] = None,
+    concurrency: int = 1,
+    queue_size: Optional[int] = None,
+    on_problem_done=None,
+    checkpoint: Optional[HumanEvalCheckpoint] = None,
+):
+    """
+    Generate and evaluate HumanEval samples as two overlapping stages.
+
+    - producers: one per (task_id, sample_id), at most `concurrency` LLM calls
+      in flight; each finished generation is pushed into a bounded queue
+    - consumers: one per sandbox worker, pull generations from the queue and
+      run them on the process pool while further generations are in flight
+
+    A producer keeps its generation slot until its sample is queued, so a full
+    queue (slow tests) throttles the LLM stage instead of buffering unboundedly.
+
+    Args:
+        generate: async callable (problem, sample_id) -> code str
+        on_problem_done: optional callable (problem, summary_entry), invoked as
+            soon as all samples of a problem are scored (completion order)
+        checkpoint: optional HumanEvalCheckpoint; samples already scored in it
+            are skipped, already generated ones are only re-evaluated, and
+            every new generation / result is persisted as it completes
+
+    Returns the same summary entries as `evaluate_humaneval_solutions`,
+    in dataset order.
+    """
+    pool = pool or get_default_pool()
+    k = k or n_samples
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or 2 * pool.workers)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    records = {p["task_id"]: [None] * n_samples for p in dataset}
+    remaining = {p["task_id"]: n_samples for p in dataset}
+    summary: Dict[str, Dict[str, Any]] = {}
+
+    def complete(problem):
+        task_id = problem["task_id"]
+        summary[task_id] = {"task_id": task_id, **summarize_passk(records[task_id], k=k)}
+        if on_problem_done is not None:
+            on_problem_done(problem, summary[task_id])
+
+    # restore already-scored samples from the checkpoint
+    jobs = []
+    for problem in dataset:
+        task_id = problem["task_id"]
+        for sample_id in range(n_samples):
+            done = checkpoint.results.get((task_id, sample_id)) if checkpoint is not None else None
+            if done is None:
+                jobs.append((problem, sample_id))
+                continue
+            records[task_id][sample_id] = done
+            remaining[task_id] -= 1
+        if n_samples and remaining[task_id] == 0:
+            complete(problem)
+
+    async def produce(problem, sample_id):
+        key = (problem["task_id"], sample_id)
+        if checkpoint is not None and key in checkpoint.generations:
+            await queue.put((problem, sample_id, checkpoint.generations[key]))
+            return
+        async with semaphore:
+            code = await generate(problem, sample_id)
+            if checkpoint is not None:
+                checkpoint.record_generation(problem["task_id"], sample_id, code)
+            await queue.put((problem, sample_id, code))
+
+    async def produce_all():
+        await asyncio.gather(*(produce(p, i) for p, i in jobs))
+        for _ in consumers:
+            await queue.put(None)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            problem, sample_id, code = item
+            task_id = problem["task_id"]
+            result = await asyncio.wrap_future(pool.submit(code, problem["test"]))
+            if checkpoint is not None:
+                checkpoint.record_result(task_id, sample_id, result)
+            records[task_id][sample_id] = result
+            remaining[task_id] -= 1
+            if remaining[task_id] == 0:
+                complete(problem)
+
+    consumers = [asyncio.ensure_future(consume()) for _ in range(pool.workers)]
+    producer = asyncio.ensure_future(produce_all())
+    try:
+        await asyncio.gather(producer, *consumers)
+    finally:
+        for t in (producer, *consumers):
+            t.cancel()
+
+    return [summary[p["task_id"]] for p in dataset if p["task_id"] in summary]
+
+
 # ================================================================
 # Single agent wrapper for HumanEval
 # ================================================================
@@ -159,7 +395,7 @@ async def run_humaneval_multi_agent(team, dataset, n_samples: int):
 # ================================================================
 # Backward compatibility: evaluate_humaneval_solutions
 # ================================================================
-def evaluate_humaneval_solutions(all_results, k=3):
+def evaluate_humaneval_solutions(all_results, k=3, pool: Optional[SandboxPool] = None):
     """
     Evaluate a list of:
         {
@@ -169,6 +405,9 @@ def evaluate_humaneval_solutions(all_results, k=3):
             "test": test_code
         }
 
+    Every sample of every problem is submitted to the sandbox pool up front,
+    so execution is parallel across problems as well as samples.
+
     Returns:
         [
             {
@@ -176,24 +415,22 @@ def evaluate_humaneval_solutions(all_results, k=3):
                 "pass@k": float,
                 "num_correct": int,
                 "num_total": int,
-                "results": [True/False,...]
+                "results": [True/False,...],
+                "records": [{"status": "passed"|"failed"|"timeout"|"error", ...}, ...]
             },
             ...
         ]
     """
-    summary = []
+    pool = pool or get_default_pool()
+    pending = [
+        (item, [pool.submit(code, item["test"]) for code in item["samples"]])
+        for item in all_results
+    ]
 
-    for item in all_results:
-        entry_point = item["entry_point"]
-        samples = item["samples"]
-        test_code = item["test"]
+    summary = []
 
-        eval_res = evaluate_problem_passk(
-            entry_point=entry_point,
-            samples=samples,
-            test_code=test_code,
-            k=k,
-        )
+    for item, futures in pending:
+        eval_res = summarize_passk([f.result() for f in futures], k=k)
 
         summary.append(
             {
@@ -202,6 +439,7 @@ def evaluate_humaneval_solutions(all_results, k=3):
                 "num_correct": eval_res["num_correct"],
                 "num_total": eval_res["num_total"],
                 "results": eval_res["results"],
+                "records": eval_res["records"],
             }
         )
 
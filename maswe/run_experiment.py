@@ -10,12 +10,16 @@ import re
 
 from metagpt.configs.llm_config import LLMConfig
 from metagpt.llm import LLM
+from metagpt.provider.base_llm import cache_sample
+from metagpt.provider.general_api_base import close_sessions
 
 # HumanEval pipeline
 from maswe.eval.humaneval_pipeline import (
+    HumanEvalCheckpoint,
     load_humaneval,
-    evaluate_humaneval_solutions,
+    run_humaneval_pipeline,
 )
+from maswe.eval.humaneval_execute import SandboxPool
 
 # Optional: logging adapter (if you enable --log-agent)
 try:
@@ -24,6 +28,9 @@ except Exception:
     AgentLogger = None
 
 
+DEFAULT_CHECKPOINT_DIR = "/workspace/checkpoints"
+
+
 # ============================================================
 # Utility
 # ============================================================
@@ -55,6 +62,36 @@ def extract_code(text: str) -> str:
     return text.strip()
 
 
+# ============================================================
+# Sample generation
+# ============================================================
+
+async def generate_sample(llm, ex, sample_id: int, log_dir=None) -> str:
+    """Ask the LLM once for `ex` and return the extracted Python code."""
+    prompt = ex["prompt"]
+
+    # LLM call, cached per sample so pass@k does not reuse one reply
+    with cache_sample(sample_id):
+        resp = await llm.aask(prompt)
+    code_raw = resp if isinstance(resp, str) else getattr(resp, "text", str(resp))
+
+    # 只保留真正的 Python 代码
+    code_clean = extract_code(code_raw)
+
+    # Optional logging：把原始输出也一起记下来
+    if log_dir:
+        with open(os.path.join(log_dir, "llm_calls.jsonl"), "a", encoding="utf8") as f:
+            f.write(json.dumps({
+                "task_id": ex["task_id"],
+                "sample_id": sample_id,
+                "prompt": prompt,
+                "response_raw": code_raw,
+                "response_code": code_clean,
+            }) + "\n")
+
+    return code_clean
+
+
 # ============================================================
 # HumanEval Runner
 # ============================================================
@@ -63,16 +100,18 @@ async def run_humaneval(args):
     print("\n🧪 STARTING HumanEval evaluation")
     print(f"   Model       : {args.model}")
     print(f"   n_samples   : {args.n_samples}")
+    print(f"   concurrency : {args.concurrency}")
     print("============================================================")
 
     # Load dataset
     dataset = load_humaneval(max_problems=args.max_problems)
     print(f"[HumanEval] Loaded {len(dataset)} problems.\n")
 
+    run_id = args.run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+
     # Setup logging directory
     log_dir = None
     if args.log_agent:
-        run_id = args.run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
         log_dir = ensure_dir(f"/workspace/agent_logs/{run_id}")
 
         if AgentLogger:
@@ -88,66 +127,69 @@ async def run_humaneval(args):
         base_url="http://host.docker.internal:11434", # 
         api_key="EMPTY",                              
         temperature=0.0,
-        max_tokens=2048,
+        max_token=2048,
+        keep_alive=args.keep_alive,
     )
     llm = LLM(llm_config=llm_config)
     print(f"[DEBUG] api_type  = {llm_config.api_type}")
     print(f"[DEBUG] model     = {llm_config.model}")
     print(f"[DEBUG] base_url  = {llm_config.base_url}")
 
-    # Generate solutions
-    all_results = []
+    # Checkpoint (opt-in): re-running with the same --run-id only does the missing work
+    checkpoint = None
+    if args.run_id or args.checkpoint_dir:
+        checkpoint = HumanEvalCheckpoint(args.checkpoint_dir or DEFAULT_CHECKPOINT_DIR, run_id)
+        # resuming with other sampling settings would mix samples of two different runs
+        checkpoint.check_meta({
+            "model": args.model,
+            "n_samples": args.n_samples,
+            "k": args.n_samples,
+            "temperature": llm_config.temperature,
+            "max_token": llm_config.max_token,
+        })
+        print(f"💾 Checkpoint → {checkpoint.run_dir} "
+              f"({len(checkpoint.generations)} generated, {len(checkpoint.results)} scored)")
+
+    # Sandboxed test execution (process pool, per-sample time/memory limits)
+    pool = SandboxPool(
+        workers=args.eval_workers,
+        timeout_sec=args.eval_timeout,
+        memory_limit_mb=args.eval_memory_mb,
+    )
 
+    # Generate + evaluate as an overlapping pipeline
     print(" Loaded HumanEval problems")
     print(" Starting HumanEval generation...\n")
 
-    for ex in dataset:
+    async def generate(ex, sample_id):
+        return await generate_sample(llm, ex, sample_id, log_dir)
+
+    def report(ex, res):
         print("=" * 28)
         print(f" Problem {ex['task_id']}")
         print("=" * 28)
-
-        # 对当前这个 task 采样多次，收集纯代码字符串
-        code_samples = []
-
-        for i in range(args.n_samples):
-            prompt = ex["prompt"]
-
-            # LLM call
-            resp = await llm.aask(prompt)
-            code_raw = resp if isinstance(resp, str) else getattr(resp, "text", str(resp))
-
-            # 只保留真正的 Python 代码
-            code_clean = extract_code(code_raw)
-            code_samples.append(code_clean)
-
-            # Optional logging：把原始输出也一起记下来
-            if log_dir:
-                with open(os.path.join(log_dir, "llm_calls.jsonl"), "a", encoding="utf8") as f:
-                    f.write(json.dumps({
-                        "task_id": ex["task_id"],
-                        "sample_id": i,
-                        "prompt": prompt,
-                        "response_raw": code_raw,
-                        "response_code": code_clean,
-                    }) + "\n")
-
-        # 按 humaneval_pipeline 的接口格式包装
-        formatted = [{
-            "task_id": ex["task_id"],
-            "entry_point": ex["entry_point"],
-            "samples": code_samples,  # 只传纯代码字符串进去
-            "test": ex["test"],
-        }]
-
-        # Evaluate
-        summary = evaluate_humaneval_solutions(formatted, k=args.n_samples)
-        pass_list = summary[0]["results"]
-        score = summary[0]["pass@k"]
-
-        print(f"  pass@{args.n_samples}: {score:.2f}")
-        print(f"  sample results: {pass_list}\n")
-
-        all_results.append(score)
+        print(f"  pass@{args.n_samples}: {res['pass@k']:.2f}")
+        print(f"  sample results: {res['results']}")
+        print(f"  sample status : {[r['status'] for r in res['records']]}\n")
+
+    try:
+        summary = await run_humaneval_pipeline(
+            generate,
+            dataset,
+            n_samples=args.n_samples,
+            k=args.n_samples,
+            pool=pool,
+            concurrency=args.concurrency,
+            on_problem_done=report,
+            checkpoint=checkpoint,
+        )
+    finally:
+        pool.shutdown()
+        if checkpoint is not None:
+            checkpoint.close()
+        await close_sessions()
+
+    all_results = [res["pass@k"] for res in summary]
 
     print("========================================")
     if all_results:
@@ -168,10 +210,33 @@ def parse_args():
     parser.add_argument("--model", type=str, default="qwen2.5-coder:7b")
     parser.add_argument("--n-samples", type=int, default=1)
     parser.add_argument("--max-problems", type=int, default=None)
+    parser.add_argument(
+        "--keep-alive",
+        type=lambda v: int(v) if v.lstrip("-").isdigit() else v,
+        default=None,
+        help='ollama keep_alive, e.g. "30m", or -1 to keep the model loaded',
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="max in-flight LLM requests across all (task_id, sample_id) pairs; 1 = sequential",
+    )
+
+    # Sandboxed test execution
+    parser.add_argument("--eval-workers", type=int, default=None, help="test worker processes (default: CPU count)")
+    parser.add_argument("--eval-timeout", type=float, default=5.0, help="per-sample wall-clock limit in seconds")
+    parser.add_argument("--eval-memory-mb", type=int, default=1024, help="per-worker address-space limit in MB")
 
     # Logging
     parser.add_argument("--log-agent", action="store_true")
-    parser.add_argument("--run-id", type=str, default=None)
+    parser.add_argument("--run-id", type=str, default=None, help="checkpoint the run; reuse to resume it")
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=None,
+        help=f"checkpoint the run under this dir (default with --run-id: {DEFAULT_CHECKPOINT_DIR})",
+    )
 
     return parser.parse_args()
 
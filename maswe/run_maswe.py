@@ -3,15 +3,19 @@
 
 import argparse
 import asyncio
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 
 from metagpt.llm import LLM
-from metagpt.configs.llm_config import LLMConfig, LLMType
+from metagpt.provider.general_api_base import close_sessions
+from metagpt.configs.llm_config import LLMBackendConfig, LLMConfig, LLMType
+from metagpt.environment.base_env import RoleScheduler, has_pending_messages
 from metagpt.team import Team
 from metagpt.schema import Message
 from metagpt.context import Context
 from metagpt.utils.git_repository import GitRepository
+from metagpt.utils.script_runner import close_script_runner
 
 # Roles
 from metagpt.roles.product_manager import ProductManager
@@ -24,14 +28,17 @@ from metagpt.roles.qa_engineer import QaEngineer
 OLLAMA_URL = "http://host.docker.internal:11434"
 
 
-def build_local_llm(model: str):
+def build_local_llm(model: str, backends: list[str] = None):
+    """One Ollama server, or a router spreading requests over several when `backends` has more than one url."""
+    backends = backends or [OLLAMA_URL]
     cfg = LLMConfig(
-        api_type=LLMType.OLLAMA,
+        api_type=LLMType.OLLAMA if len(backends) == 1 else LLMType.ROUTER,
         model=model,
-        base_url=OLLAMA_URL,
+        base_url=backends[0],
         api_key="EMPTY",
         temperature=0.1,
-        max_tokens=2048,
+        max_token=2048,
+        backends=[LLMBackendConfig(base_url=url) for url in backends] if len(backends) > 1 else None,
     )
     return LLM(llm_config=cfg)
 
@@ -44,7 +51,7 @@ class SimpleMessageEnv:
         self.desc = ""
         self.roles = {}
         self.member_addrs = {}
-        self.history = ""
+        self._history = deque(maxlen=100)  # recent messages only, for debugging
 
         # Prepare project workspace folder
         workspace_root = Path("/app/workspace")
@@ -72,15 +79,23 @@ class SimpleMessageEnv:
 
     # -------- broadcast messages ----------
     def publish_message(self, msg):
-        self.history += f"\n{msg}"
+        self._history.append(msg)
         for role in self.roles.values():
             role.put_message(msg)
 
-    # -------- execute each round ----------
+    @property
+    def history(self):
+        return "".join(f"\n{m}" for m in self._history)
+
+    # -------- execute each round (only roles with pending messages) ----------
     async def step(self):
-        tasks = [role.run() for role in self.roles.values()]
+        tasks = [role.run() for role in self.roles.values() if has_pending_messages(role)]
         await asyncio.gather(*tasks)
 
+    # -------- event-driven run until no role has pending messages ----------
+    async def run_until_idle(self, max_round=100, concurrency=None, outputs=None):
+        return await RoleScheduler(self.roles.values(), max_round=max_round, concurrency=concurrency).run(outputs)
+
     # -------- required by role.set_env ----------
     def set_addresses(self, role, addresses):
         self.member_addrs[role] = addresses
@@ -100,24 +115,25 @@ class SimpleMessageEnv:
 # ----------------------------------------------------------------------
 # Main MASWE runner
 # ----------------------------------------------------------------------
-async def run_maswe(mode: str, task: str):
+async def run_maswe(mode: str, task: str, backends: list[str] = None, code_concurrency: int = 1):
     print(f"\n🧪 STARTING MASWE | MODE: {mode.upper()} | TASK: {task}")
     print("=" * 60)
 
     pm = ProductManager()
-    pm.llm = build_local_llm("qwen2.5:7b-instruct")
+    pm.llm = build_local_llm("qwen2.5:7b-instruct", backends)
 
     arch = Architect()
-    arch.llm = build_local_llm("deepseek-coder:6.7b")
+    arch.llm = build_local_llm("deepseek-coder:6.7b", backends)
 
     coord = ProjectManager()
-    coord.llm = build_local_llm("qwen2.5:7b-instruct")
+    coord.llm = build_local_llm("qwen2.5:7b-instruct", backends)
 
     dev = Developer()
-    dev.llm = build_local_llm("qwen2.5-coder:7b")
+    dev.llm = build_local_llm("qwen2.5-coder:7b", backends)
+    dev.code_concurrency = code_concurrency
 
     qa = QaEngineer()
-    qa.llm = build_local_llm("qwen2.5-coder:7b")
+    qa.llm = build_local_llm("qwen2.5-coder:7b", backends)
 
     roles = [pm, arch, coord, dev, qa]
 
@@ -130,7 +146,11 @@ async def run_maswe(mode: str, task: str):
     print("🚀 Running multi-agent workflow...\n")
     start = datetime.now()
 
-    await team.run()
+    try:
+        await team.run()
+    finally:
+        await close_sessions()
+        await close_script_runner()
 
     end = datetime.now()
     print("=" * 60)
@@ -142,9 +162,21 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--mode", type=str, default="local")
     parser.add_argument("--task", type=str, default="Build a CLI Snake game in Python")
+    parser.add_argument(
+        "--backends",
+        type=lambda v: [u.strip() for u in v.split(",") if u.strip()],
+        default=None,
+        help="comma-separated Ollama urls to load-balance the roles across",
+    )
+    parser.add_argument(
+        "--code-concurrency",
+        type=int,
+        default=1,
+        help="files the developer writes at once (independent files only)",
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    asyncio.run(run_maswe(args.mode, args.task))
+    asyncio.run(run_maswe(args.mode, args.task, args.backends, args.code_concurrency))
@@ -8,20 +8,25 @@
 NOTE: You should use typing.List instead of list to do type annotation. Because in the markdown extraction process,
   we can use typing to extract the type of the node, but we cannot use built-in list to extract.
 """
+import asyncio
 import json
+import time
 import typing
 from enum import Enum
+from functools import partial
 from typing import Any, Dict, List, Optional, Tuple, Type, Union
 
 from pydantic import BaseModel, Field, create_model, model_validator
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
-from metagpt.actions.action_outcls_registry import register_action_outcls
+from metagpt.actions.action_outcls_registry import get_outcls_schema, register_action_outcls
 from metagpt.llm import BaseLLM
 from metagpt.logs import logger
+from metagpt.provider.base_llm import constrain_output, observe_stream
 from metagpt.provider.postprocess.llm_output_postprocess import llm_output_postprocess
 from metagpt.utils.common import OutputParser, general_after_log
 from metagpt.utils.human_interaction import HumanInteraction
+from metagpt.utils.stream_parser import StreamingJSONParser
 
 
 class ReviewMode(Enum):
@@ -142,6 +147,9 @@ class ActionNode:
     content: str
     instruct_content: BaseModel
 
+    fill_stats: Dict[str, dict]  # per child of the last complex fill: latency (seconds) and attempts
+    parse_stats: Dict[str, int]  # structured outputs asked, LLM attempts, failed parses, schema-constrained attempts
+
     # For ActionGraph
     prevs: List["ActionNode"]  # previous nodes
     nexts: List["ActionNode"]  # next nodes
@@ -165,6 +173,8 @@ class ActionNode:
         self.schema = schema
         self.prevs = []
         self.nexts = []
+        self.fill_stats = {}
+        self.parse_stats = {"calls": 0, "attempts": 0, "parse_failures": 0, "constrained": 0}
 
     def __str__(self):
         return (
@@ -235,8 +245,9 @@ class ActionNode:
     def create_model_class(cls, class_name: str, mapping: Dict[str, Tuple[Type, Any]]):
         """基于pydantic v2的模型动态生成，用来检验结果类型正确性"""
 
+        required_fields = frozenset(mapping.keys())
+
         def check_fields(cls, values):
-            required_fields = set(mapping.keys())
             missing_fields = required_fields - set(values.keys())
             if missing_fields:
                 raise ValueError(f"Missing fields: {missing_fields}")
@@ -423,16 +434,13 @@ class ActionNode:
         # =============================================================
         # 1. JSON 强制系统消息（即使 schema="markdown"，也不影响正常解析）
         # =============================================================
-        json_force_sys = {
-            "role": "system",
-            "content": (
-                "You MUST respond ONLY with a valid JSON object.\n"
-                "NO markdown.\n"
-                "NO code fences.\n"
-                "NO explanation.\n"
-                "If unsure, respond with {}.\n"
-            )
-        }
+        json_force_sys = (
+            "You MUST respond ONLY with a valid JSON object.\n"
+            "NO markdown.\n"
+            "NO code fences.\n"
+            "NO explanation.\n"
+            "If unsure, respond with {}.\n"
+        )
 
         # prepend the forced message
         syslist = system_msgs or []
@@ -441,8 +449,21 @@ class ActionNode:
         # =============================================================
         # 2. 调用 LLM（保持原逻辑）
         # =============================================================
-        content = await self.llm.aask(prompt, system_msgs, images=images, timeout=timeout)
+        output_class = self.create_model_class(output_class_name, output_data_mapping)
+        self.parse_stats["attempts"] += 1
+        # json answers are checked while they stream: generation stops once the object closes or can't validate.
+        # Providers that support it also constrain decoding to the schema; others fall back to the repair below.
+        output_schema = get_outcls_schema(output_class) if schema == "json" else None
+        if output_schema and self.llm.constrains_output:
+            self.parse_stats["constrained"] += 1
+        factory = partial(StreamingJSONParser, output_schema) if output_schema else None
+        with observe_stream(factory) as stream, constrain_output(output_schema):
+            content = await self.llm.aask(prompt, system_msgs, images=images, timeout=timeout)
+        parser = stream.observer  # of the attempt that produced `content`; None when the provider did not stream
         logger.debug(f"llm raw output:\n{content}")
+        if parser and parser.error:
+            self.parse_stats["parse_failures"] += 1
+            raise ValueError(f"unusable {output_class_name} output, stopped early: {parser.error}")
 
         # =============================================================
         # 3. 清洗常见脏输出（Qwen 会输出这些）
@@ -476,22 +497,30 @@ class ActionNode:
         # =============================================================
         # 4. 根据 schema 解析（保持原始 MetaGPT 行为）
         # =============================================================
-        output_class = self.create_model_class(output_class_name, output_data_mapping)
-
-        if schema == "json":
-            parsed_data = llm_output_postprocess(
-                output=cleaned,
-                schema=output_class.model_json_schema(),
-                req_key=f"[/{TAG}]",
-            )
-        else:
-            parsed_data = OutputParser.parse_data_with_mapping(cleaned, output_data_mapping)
+        try:
+            if parser and parser.complete and parser.exact:
+                parsed_data = parser.fields  # well-formed as streamed, nothing to repair
+            elif schema == "json":
+                parsed_data = llm_output_postprocess(output=cleaned, schema=output_schema, req_key=f"[/{TAG}]")
+            else:
+                parsed_data = OutputParser.parse_data_with_mapping(cleaned, output_data_mapping)
 
-        logger.debug(f"parsed_data:\n{parsed_data}")
+            logger.debug(f"parsed_data:\n{parsed_data}")
 
-        instruct_content = output_class(**parsed_data)
+            instruct_content = output_class(**parsed_data)
+        except Exception:
+            self.parse_stats["parse_failures"] += 1
+            raise
         return content, instruct_content
 
+    def parse_rates(self) -> Dict[str, float]:
+        """Share of LLM attempts whose output did not parse, and retries per structured output asked."""
+        stats = self.parse_stats
+        return {
+            "parse_failure_rate": stats["parse_failures"] / stats["attempts"] if stats["attempts"] else 0.0,
+            "retry_rate": (stats["attempts"] - stats["calls"]) / stats["calls"] if stats["calls"] else 0.0,
+        }
+
 
     def get(self, key):
         return self.instruct_content.model_dump()[key]
@@ -513,9 +542,12 @@ class ActionNode:
         if schema != "raw":
             mapping = self.get_mapping(mode, exclude=exclude)
             class_name = f"{self.key}_AN"
+            self.parse_stats["calls"] += 1
             content, scontent = await self._aask_v1(
                 prompt, class_name, mapping, images=images, schema=schema, timeout=timeout
             )
+            if self.parse_stats["attempts"] > self.parse_stats["calls"]:
+                logger.debug(f"{self.key} parse stats: {self.parse_stats}, {self.parse_rates()}")
             self.content = content
             self.instruct_content = scontent
         else:
@@ -524,6 +556,23 @@ class ActionNode:
 
         return self
 
+    async def _fill_child(
+        self, child: "ActionNode", semaphore: asyncio.Semaphore, attempts: int, **kwargs
+    ) -> "ActionNode":
+        """Fill one child, retrying it alone up to `attempts` times; records its latency in `fill_stats`."""
+        async with semaphore:
+            start = time.perf_counter()
+            for attempt in range(1, attempts + 1):
+                try:
+                    await child.simple_fill(**kwargs)
+                    break
+                except Exception as e:
+                    if attempt == attempts:
+                        raise
+                    logger.warning(f"Filling {child.key} failed ({e!r}), retry {attempt}/{attempts - 1}")
+            self.fill_stats[child.key] = {"latency": time.perf_counter() - start, "attempts": attempt}
+        return child
+
     async def fill(
         self,
         context,
@@ -534,6 +583,8 @@ class ActionNode:
         images: Optional[Union[str, list[str]]] = None,
         timeout=3,
         exclude=[],
+        concurrency: int = 1,
+        child_attempts: int = 1,
     ):
         """Fill the node(s) with mode.
 
@@ -553,6 +604,9 @@ class ActionNode:
         :param images: the list of image url or base64 for gpt4-v
         :param timeout: Timeout for llm invocation.
         :param exclude: The keys of ActionNode to exclude.
+        :param concurrency: complex only, how many children to fill at once; by default one after the other.
+        :param child_attempts: complex only, how many times to fill a failing child before giving up; its siblings
+         are not filled again. By default a child is only retried by the LLM call's own retries.
         :return: self
         """
         self.set_llm(llm)
@@ -564,12 +618,26 @@ class ActionNode:
             return await self.simple_fill(schema=schema, mode=mode, images=images, timeout=timeout, exclude=exclude)
         elif strgy == "complex":
             # 这里隐式假设了拥有children
+            children = [i for i in self.children.values() if not (exclude and i.key in exclude)]
+            semaphore = asyncio.Semaphore(max(1, concurrency))
+            self.fill_stats = {}
+            kwargs = dict(schema=schema, mode=mode, images=images, timeout=timeout, exclude=exclude)
+            tasks = [asyncio.create_task(self._fill_child(i, semaphore, child_attempts, **kwargs)) for i in children]
+            try:
+                filled = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            # merge in children order, whichever finished first
             tmp = {}
-            for _, i in self.children.items():
-                if exclude and i.key in exclude:
-                    continue
-                child = await i.simple_fill(schema=schema, mode=mode, images=images, timeout=timeout, exclude=exclude)
+            for child in filled:
                 tmp.update(child.instruct_content.model_dump())
+            self.fill_stats = {child.key: self.fill_stats[child.key] for child in filled}
+            logger.info(
+                f"Filled {len(filled)} children of {self.key}: "
+                + ", ".join(f"{k} {v['latency']:.2f}s" for k, v in self.fill_stats.items())
+            )
             cls = self._create_children_class()
             self.instruct_content = cls(**tmp)
             return self
@@ -622,7 +690,7 @@ class ActionNode:
         output_class_name = f"{self.key}_AN_REVIEW"
         output_class = self.create_class(class_name=output_class_name, exclude=exclude_keys)
         parsed_data = llm_output_postprocess(
-            output=content, schema=output_class.model_json_schema(), req_key=f"[/{TAG}]"
+            output=content, schema=get_outcls_schema(output_class), req_key=f"[/{TAG}]"
         )
         instruct_content = output_class(**parsed_data)
         return instruct_content.model_dump()
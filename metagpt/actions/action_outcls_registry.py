@@ -3,9 +3,125 @@
 # @Desc   : registry to store Dynamic Model from ActionNode.create_model_class to keep it as same Class
 #           with same class name and mapping
 
+import inspect
+import threading
+from collections import OrderedDict
 from functools import wraps
+from typing import Any, Dict, Hashable, Type
 
-action_outcls_registry = dict()
+from pydantic import BaseModel
+
+DEFAULT_MAX_CLASSES = 1024
+
+
+def _type_name(tp: Any) -> str:
+    # eliminate typing influence, `typing.List[str]` and `list[str]` are the same field type
+    return str(tp).replace("typing.List", "list").replace("typing.Dict", "dict")
+
+
+class ActionOutclsRegistry:
+    """Bounded LRU of generated classes keyed by a canonical, hashable form of the creating call's arguments.
+
+    The types and values of field specs such as `(list[str], ...)` are turned into names once each and memoized in
+    an LRU of the same size, so building the key of a mapping seen before costs a few dict lookups per field. The
+    JSON schema of each class is cached next to it.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_CLASSES):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._classes: OrderedDict[Hashable, Type[BaseModel]] = OrderedDict()
+        self._spec_names: OrderedDict[Any, Hashable] = OrderedDict()
+        self._schemas: Dict[Type[BaseModel], dict] = {}
+        self._lock = threading.Lock()
+
+    def canonical(self, value: Any) -> Hashable:
+        if isinstance(value, str):
+            return value
+        if isinstance(value, dict):
+            return ("dict", tuple((k, self.canonical(value[k])) for k in sorted(value)))
+        if isinstance(value, (tuple, list)):
+            # not memoized as a whole: (int, 1) == (int, True), only their items tell them apart
+            return (type(value).__name__,) + tuple(self.canonical(v) for v in value)
+        try:
+            key = (type(value), value)  # the type keeps 1 and True apart
+            with self._lock:
+                name = self._spec_names.get(key)
+                if name is not None:
+                    self._spec_names.move_to_end(key)
+        except TypeError:  # unhashable
+            key = name = None
+        if name is None:
+            name = _type_name(value)
+            if key is not None:
+                with self._lock:
+                    self._spec_names[key] = name
+                    if len(self._spec_names) > self.max_size:
+                        self._spec_names.popitem(last=False)
+        return name
+
+    def get(self, key: Hashable):
+        with self._lock:
+            out_cls = self._classes.get(key)
+            if out_cls is None:
+                self.misses += 1
+                return None
+            self._classes.move_to_end(key)
+            self.hits += 1
+            return out_cls
+
+    def put(self, key: Hashable, out_cls: Type[BaseModel]):
+        with self._lock:
+            self._classes[key] = out_cls
+            self._classes.move_to_end(key)
+            while len(self._classes) > self.max_size:
+                _, evicted = self._classes.popitem(last=False)
+                self._schemas.pop(evicted, None)
+                self.evictions += 1
+
+    def json_schema(self, out_cls: Type[BaseModel]) -> dict:
+        """`out_cls.model_json_schema()`, computed once per class; do not modify the result."""
+        schema = self._schemas.get(out_cls)
+        if schema is None:
+            schema = out_cls.model_json_schema()
+            with self._lock:
+                if len(self._schemas) >= self.max_size:
+                    self._schemas.pop(next(iter(self._schemas)))
+                self._schemas[out_cls] = schema
+        return schema
+
+    def clear(self):
+        with self._lock:
+            self._classes.clear()
+            self._spec_names.clear()
+            self._schemas.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "classes": len(self._classes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._classes
+
+    def __len__(self) -> int:
+        return len(self._classes)
+
+
+action_outcls_registry = ActionOutclsRegistry()
+
+
+def get_outcls_schema(out_cls: Type[BaseModel]) -> dict:
+    """Cached JSON schema of an instruct_content class."""
+    return action_outcls_registry.json_schema(out_cls)
 
 
 def register_action_outcls(func):
@@ -13,30 +129,24 @@ def register_action_outcls(func):
     Due to `create_model` return different Class even they have same class name and mapping.
     In order to do a comparison, use outcls_id to identify same Class with same class name and field definition
     """
+    params = list(inspect.signature(func).parameters)
 
     @wraps(func)
     def decorater(*args, **kwargs):
         """
-        arr example
-            [<class 'metagpt.actions.action_node.ActionNode'>, 'test', {'field': (str, Ellipsis)}]
-        """
-        arr = list(args) + list(kwargs.values())
-        """
-        outcls_id example
-            "<class 'metagpt.actions.action_node.ActionNode'>_test_{'field': (str, Ellipsis)}"
+        outcls_id example, for args [<class 'metagpt.actions.action_node.ActionNode'>, 'test', {'field': (str, ...)}]
+            ("<class 'metagpt.actions.action_node.ActionNode'>", 'test', ('dict', (('field', ('tuple', "<class 'str'>",
+            'Ellipsis')),)))
         """
-        for idx, item in enumerate(arr):
-            if isinstance(item, dict):
-                arr[idx] = dict(sorted(item.items()))
-        outcls_id = "_".join([str(i) for i in arr])
-        # eliminate typing influence
-        outcls_id = outcls_id.replace("typing.List", "list").replace("typing.Dict", "dict")
+        values = list(args) + [kwargs[p] for p in params[len(args) :] if p in kwargs]
+        outcls_id = tuple(action_outcls_registry.canonical(i) for i in values)
 
-        if outcls_id in action_outcls_registry:
-            return action_outcls_registry[outcls_id]
+        out_cls = action_outcls_registry.get(outcls_id)
+        if out_cls is not None:
+            return out_cls
 
         out_cls = func(*args, **kwargs)
-        action_outcls_registry[outcls_id] = out_cls
+        action_outcls_registry.put(outcls_id, out_cls)
         return out_cls
 
     return decorater
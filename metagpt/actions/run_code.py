@@ -15,8 +15,6 @@
             5. Merged the `Config` class of send18:dev branch to take over the set/get operations of the Environment
             class.
 """
-import subprocess
-from pathlib import Path
 from typing import Tuple
 
 from pydantic import Field
@@ -24,7 +22,7 @@ from pydantic import Field
 from metagpt.actions.action import Action
 from metagpt.logs import logger
 from metagpt.schema import RunCodeContext, RunCodeResult
-from metagpt.utils.exceptions import handle_exception
+from metagpt.utils.script_runner import script_runner
 
 PROMPT_TEMPLATE = """
 Role: You are a senior development and qa engineer, your role is summarize the code running result.
@@ -100,22 +98,17 @@ class RunCode(Action):
         additional_python_paths = [working_directory] + additional_python_paths
         additional_python_paths = ":".join(additional_python_paths)
         env["PYTHONPATH"] = additional_python_paths + ":" + env.get("PYTHONPATH", "")
-        RunCode._install_dependencies(working_directory=working_directory, env=env)
-
-        # Start the subprocess
-        process = subprocess.Popen(
-            command, cwd=working_directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env
+        await script_runner.install_dependencies(working_directory=working_directory, env=env)
+
+        run_config = self.config.run_code
+        return await script_runner.run(
+            command,
+            working_directory=working_directory,
+            env=env,
+            timeout=run_config.timeout,
+            max_output=run_config.max_output_bytes,
+            warm=run_config.warm_workers,
         )
-        logger.info(" ".join(command))
-
-        try:
-            # Wait for the process to complete, with a timeout
-            stdout, stderr = process.communicate(timeout=10)
-        except subprocess.TimeoutExpired:
-            logger.info("The command did not complete within the given timeout.")
-            process.kill()  # Kill the process if it times out
-            stdout, stderr = process.communicate()
-        return stdout.decode("utf-8"), stderr.decode("utf-8")
 
     async def run(self, *args, **kwargs) -> RunCodeResult:
         logger.info(f"Running {' '.join(self.i_context.command)}")
@@ -144,30 +137,3 @@ class RunCode(Action):
         prompt = PROMPT_TEMPLATE.format(context=context)
         rsp = await self._aask(prompt)
         return RunCodeResult(summary=rsp, stdout=outs, stderr=errs)
-
-    @staticmethod
-    @handle_exception(exception_type=subprocess.CalledProcessError)
-    def _install_via_subprocess(cmd, check, cwd, env):
-        return subprocess.run(cmd, check=check, cwd=cwd, env=env)
-
-    @staticmethod
-    def _install_requirements(working_directory, env):
-        file_path = Path(working_directory) / "requirements.txt"
-        if not file_path.exists():
-            return
-        if file_path.stat().st_size == 0:
-            return
-        install_command = ["python", "-m", "pip", "install", "-r", "requirements.txt"]
-        logger.info(" ".join(install_command))
-        RunCode._install_via_subprocess(install_command, check=True, cwd=working_directory, env=env)
-
-    @staticmethod
-    def _install_pytest(working_directory, env):
-        install_pytest_command = ["python", "-m", "pip", "install", "pytest"]
-        logger.info(" ".join(install_pytest_command))
-        RunCode._install_via_subprocess(install_pytest_command, check=True, cwd=working_directory, env=env)
-
-    @staticmethod
-    def _install_dependencies(working_directory, env):
-        RunCode._install_requirements(working_directory, env)
-        RunCode._install_pytest(working_directory, env)
@@ -16,6 +16,7 @@
 """
 
 import json
+from typing import Dict, Optional
 
 from pydantic import Field
 from tenacity import retry, stop_after_attempt, wait_random_exponential
@@ -31,6 +32,7 @@ from metagpt.const import (
 from metagpt.logs import logger
 from metagpt.schema import CodingContext, Document, RunCodeResult
 from metagpt.utils.common import CodeParser
+from metagpt.utils.file_repository import source_cache
 from metagpt.utils.project_repo import ProjectRepo
 
 PROMPT_TEMPLATE = """
@@ -87,6 +89,8 @@ ATTENTION: Use '##' to SPLIT SECTIONS, not '#'. Output format carefully referenc
 class WriteCode(Action):
     name: str = "WriteCode"
     i_context: Document = Field(default_factory=Document)
+    # source contents to build the code context from instead of the workspace, see `Engineer._act_parallel_with_cr`
+    code_snapshot: Optional[Dict[str, str]] = Field(default=None, exclude=True)
 
     @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
     async def write_code(self, prompt) -> str:
@@ -113,13 +117,18 @@ class WriteCode(Action):
             code_context = coding_context.code_doc.content
         elif code_plan_and_change:
             code_context = await self.get_codes(
-                coding_context.task_doc, exclude=self.i_context.filename, project_repo=self.repo, use_inc=True
+                coding_context.task_doc,
+                exclude=self.i_context.filename,
+                project_repo=self.repo,
+                use_inc=True,
+                snapshot=self.code_snapshot,
             )
         else:
             code_context = await self.get_codes(
                 coding_context.task_doc,
                 exclude=self.i_context.filename,
                 project_repo=self.repo.with_src_path(self.context.src_workspace),
+                snapshot=self.code_snapshot,
             )
 
         if code_plan_and_change:
@@ -154,7 +163,13 @@ class WriteCode(Action):
         return coding_context
 
     @staticmethod
-    async def get_codes(task_doc: Document, exclude: str, project_repo: ProjectRepo, use_inc: bool = False) -> str:
+    async def get_codes(
+        task_doc: Document,
+        exclude: str,
+        project_repo: ProjectRepo,
+        use_inc: bool = False,
+        snapshot: Optional[Dict[str, str]] = None,
+    ) -> str:
         """
         Get codes for generating the exclude file in various scenarios.
 
@@ -163,6 +178,8 @@ class WriteCode(Action):
             exclude (str): The file to be generated. Specifies the filename to be excluded from the code snippets.
             project_repo (ProjectRepo): ProjectRepo object of the project.
             use_inc (bool): Indicates whether the scenario involves incremental development. Defaults to False.
+            snapshot (Dict[str, str], optional): Source file contents by filename to use instead of reading the src
+                workspace; files not in it are treated as missing. Defaults to None.
 
         Returns:
             str: Codes for generating the exclude file.
@@ -176,14 +193,20 @@ class WriteCode(Action):
         codes = []
         src_file_repo = project_repo.srcs
 
+        async def get_src(filename: str) -> Optional[str]:
+            if snapshot is not None:
+                return snapshot.get(filename)
+            doc = await src_file_repo.get(filename=filename)
+            return doc.content if doc else None
+
         # Incremental development scenario
         if use_inc:
-            src_files = src_file_repo.all_files
+            src_files = list(snapshot) if snapshot is not None else src_file_repo.all_files
             # Get the old workspace contained the old codes and old workspace are created in previous CodePlanAndChange
             old_file_repo = project_repo.git_repo.new_file_repository(relative_path=project_repo.old_workspace)
             old_files = old_file_repo.all_files
-            # Get the union of the files in the src and old workspaces
-            union_files_list = list(set(src_files) | set(old_files))
+            # Get the union of the files in the src and old workspaces, in a stable order
+            union_files_list = sorted(set(src_files) | set(old_files))
             for filename in union_files_list:
                 # Exclude the current file from the all code snippets
                 if filename == exclude:
@@ -199,11 +222,11 @@ class WriteCode(Action):
                     codes.insert(0, f"-----Now, {filename} to be rewritten\n```{doc.content}```\n=====")
                 # The code snippets are generated from the src workspace
                 else:
-                    doc = await src_file_repo.get(filename=filename)
+                    content = await get_src(filename)
                     # If the file does not exist in the src workspace, skip it
-                    if not doc:
+                    if content is None:
                         continue
-                    codes.append(f"----- {filename}\n```{doc.content}```")
+                    codes.append(f"----- {filename}\n```{content}```")
 
         # Normal scenario
         else:
@@ -211,9 +234,13 @@ class WriteCode(Action):
                 # Exclude the current file to get the code snippets for generating the current file
                 if filename == exclude:
                     continue
-                doc = await src_file_repo.get(filename=filename)
-                if not doc:
+                content = await get_src(filename)
+                if content is None:
                     continue
-                codes.append(f"----- {filename}\n```{doc.content}```")
+                codes.append(f"----- {filename}\n```{content}```")
 
-        return "\n".join(codes)
+        context = "\n".join(codes)
+        nbytes = len(context.encode("utf-8"))
+        source_cache.record_context(exclude, nbytes)
+        logger.info(f"Code context for {exclude}: {len(codes)} files, {nbytes} bytes")
+        return context
@@ -8,6 +8,8 @@
         WriteCode object, rather than passing them in when calling the run function.
 """
 
+from typing import Dict, Optional
+
 from pydantic import Field
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
@@ -121,6 +123,8 @@ REWRITE_CODE_TEMPLATE = """
 class WriteCodeReview(Action):
     name: str = "WriteCodeReview"
     i_context: CodingContext = Field(default_factory=CodingContext)
+    # see `WriteCode.code_snapshot`
+    code_snapshot: Optional[Dict[str, str]] = Field(default=None, exclude=True)
 
     @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
     async def write_code_review_and_rewrite(self, context_prompt, cr_prompt, filename):
@@ -147,6 +151,7 @@ class WriteCodeReview(Action):
                 exclude=self.i_context.filename,
                 project_repo=self.repo.with_src_path(self.context.src_workspace),
                 use_inc=self.config.inc,
+                snapshot=self.code_snapshot,
             )
 
             if not self.config.inc:
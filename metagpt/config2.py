@@ -15,6 +15,7 @@ from metagpt.configs.browser_config import BrowserConfig
 from metagpt.configs.llm_config import LLMConfig, LLMType
 from metagpt.configs.mermaid_config import MermaidConfig
 from metagpt.configs.redis_config import RedisConfig
+from metagpt.configs.run_code_config import RunCodeConfig
 from metagpt.configs.s3_config import S3Config
 from metagpt.configs.search_config import SearchConfig
 from metagpt.configs.workspace_config import WorkspaceConfig
@@ -55,6 +56,7 @@ class Config(CLIParams, YamlModel):
     browser: BrowserConfig = BrowserConfig()
     mermaid: MermaidConfig = MermaidConfig()
     mermaid.engine = "none"
+    run_code: RunCodeConfig = RunCodeConfig()
 
 
     # Storage Parameters
@@ -6,9 +6,9 @@
 @File    : llm_config.py
 """
 from enum import Enum
-from typing import Optional
+from typing import List, Optional, Union
 
-from pydantic import field_validator
+from pydantic import BaseModel, field_validator
 
 from metagpt.utils.yaml_model import YamlModel
 
@@ -24,11 +24,21 @@ class LLMType(Enum):
     METAGPT = "metagpt"
     AZURE = "azure"
     OLLAMA = "ollama"
+    ROUTER = "router"  # dispatch across several backends, see LLMBackendConfig
 
     def __missing__(self, key):
         return self.OPENAI
 
 
+class LLMBackendConfig(BaseModel):
+    """One backend served to the router provider (LLMType.ROUTER)"""
+
+    base_url: str
+    api_type: LLMType = LLMType.OLLAMA
+    models: List[str] = []  # models this backend serves; empty means any model
+    max_concurrency: int = 4
+
+
 class LLMConfig(YamlModel):
     """Config for LLM
 
@@ -48,6 +58,14 @@ class LLMConfig(YamlModel):
     api_secret: Optional[str] = None
     domain: Optional[str] = None
 
+    # For Ollama
+    ollama_endpoint: str = "chat"  # "chat": /api/chat with role-structured messages; "generate": flattened prompt
+    num_ctx: Optional[int] = None  # context window, None keeps the model default
+    keep_alive: Optional[Union[str, int]] = None  # e.g. "30m", or -1 to keep the model pinned in memory
+
+    # For Router
+    backends: Optional[List[LLMBackendConfig]] = None
+
     # For Chat Completion
     max_token: int = 4096
     temperature: float = 0.0
@@ -63,13 +81,26 @@ class LLMConfig(YamlModel):
     logprobs: Optional[bool] = None  # https://cookbook.openai.com/examples/using_logprobs
     top_logprobs: Optional[int] = None
     timeout: int = 60
+    # Pass the JSON schema of structured outputs to providers that can constrain decoding with it (Ollama `format`,
+    # OpenAI `response_format`). None: on for Ollama, and for OpenAI only on api.openai.com models known to accept it.
+    constrained_output: Optional[bool] = None
 
     # For Network
     proxy: Optional[str] = None
+    connection_limit: Optional[int] = None  # max pooled connections per base_url (http-based providers)
 
     # Cost Control
     calc_usage: bool = True
 
+    # Response Cache (opt-in). Identical requests (same provider, model, messages and sampling
+    # params) are answered from cache, so only enable it where reusing a response is acceptable.
+    # With temperature > 0, only calls tagged with `cache_sample(sample_id)` are cached, one reply per sample.
+    cache: bool = False
+    cache_path: Optional[str] = None  # SQLite file for the disk tier; None keeps the cache in memory only
+    cache_max_entries: int = 1024  # in-memory LRU tier
+    cache_max_size_mb: int = 512  # disk tier, least recently used entries are evicted beyond this
+    cache_ttl: Optional[int] = None  # seconds; None never expires
+
     @field_validator("api_key")
     @classmethod
     def check_llm_key(cls, v):
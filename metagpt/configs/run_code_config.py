@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : run_code_config.py
+"""
+from metagpt.utils.yaml_model import YamlModel
+
+
+class RunCodeConfig(YamlModel):
+    """Config for running the test scripts of QaEngineer"""
+
+    timeout: float = 10  # seconds per script
+    max_output_bytes: int = 1024 * 1024  # per stream; the rest is dropped
+    concurrency: int = 4  # test scripts run at once by QaEngineer
+    warm_workers: bool = True  # fork `python <script>` runs from a warm interpreter per workspace
@@ -3,11 +3,21 @@
 # @Desc   : base env of executing environment
 
 import asyncio
+from collections import Counter, deque
+from contextvars import ContextVar
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set, Union
-
-from pydantic import BaseModel, ConfigDict, Field, SerializeAsAny, model_validator
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional, Set, Union
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    SerializeAsAny,
+    model_validator,
+)
 
+from metagpt.const import MESSAGE_ROUTE_TO_ALL
 from metagpt.context import Context
 from metagpt.environment.api.env_api import (
     EnvAPIAbstract,
@@ -16,7 +26,7 @@ from metagpt.environment.api.env_api import (
 )
 from metagpt.logs import logger
 from metagpt.schema import Message
-from metagpt.utils.common import get_function_schema, is_coroutine_func, is_send_to
+from metagpt.utils.common import get_function_schema, is_coroutine_func
 
 if TYPE_CHECKING:
     from metagpt.roles.role import Role  # noqa: F401
@@ -95,6 +105,101 @@ class ExtEnv(BaseModel):
         return res
 
 
+# round of the role run that is currently publishing; messages pushed from outside a run wake roles for round 1
+_SCHEDULER_ROUND: ContextVar[int] = ContextVar("scheduler_round", default=0)
+
+
+def has_pending_messages(role: "Role") -> bool:
+    """A role has work to observe if its buffer is not empty, or it was recovered with an unprocessed message"""
+    if not role.rc.msg_buffer.empty():
+        return True
+    return bool(getattr(role, "recovered", False) and getattr(role, "latest_observed_msg", None))
+
+
+class RoleScheduler:
+    """Event-driven replacement for running every role every round.
+
+    A role is ready when its `rc.msg_buffer` receives a message and only ready roles are run. A role woken by a
+    message published in round r runs in round r + 1 as soon as the publisher finishes, without waiting for the
+    rest of round r. Messages that arrive while a role is running wake it again once that run is done. The run
+    ends when no role is running or ready (quiescence), or when the only wakes left are past `max_round`.
+    """
+
+    def __init__(self, roles: Iterable["Role"], max_round: int = 100, concurrency: Optional[int] = None):
+        self.roles = list(roles)
+        self.max_round = max_round
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self.round_wakes: Counter = Counter()  # round -> number of role runs
+        self.dropped_wakes = 0  # wakes past max_round
+        self._ready: Dict["Role", int] = {}  # role -> round it was woken for
+        self._running: Dict[asyncio.Task, "Role"] = {}
+
+    def _wake(self, role: "Role", round_: int):
+        if round_ > self.max_round:
+            self.dropped_wakes += 1
+            return
+        self._ready.setdefault(role, round_)
+
+    def _listener(self, role: "Role"):
+        def on_push(_msg: Message):
+            self._wake(role, _SCHEDULER_ROUND.get() + 1)
+
+        return on_push
+
+    async def _run_role(self, role: "Role", round_: int) -> Optional[Message]:
+        _SCHEDULER_ROUND.set(round_)  # the task runs in a copy of the context
+        if self.semaphore is None:
+            return await role.run()
+        async with self.semaphore:
+            return await role.run()
+
+    def _start_ready(self):
+        busy = set(self._running.values())
+        for role, round_ in list(self._ready.items()):
+            if role in busy:
+                continue
+            del self._ready[role]
+            self.round_wakes[round_] += 1
+            self._running[asyncio.create_task(self._run_role(role, round_))] = role
+
+    async def run(self, outputs: Optional[List[Message]] = None) -> List[Message]:
+        """Run until quiescence and return the messages produced by the role runs, in completion order.
+
+        They are appended to `outputs` as the runs complete, so a caller passing it keeps them if a run fails.
+        """
+        outputs = [] if outputs is None else outputs
+        for role in self.roles:
+            role.rc.msg_buffer.set_push_listener(self._listener(role))
+            if has_pending_messages(role):
+                self._wake(role, 1)
+        try:
+            while True:
+                self._start_ready()
+                if not self._running:
+                    break
+                done, _ = await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._running.pop(task)
+                    rsp = task.result()
+                    if rsp:
+                        outputs.append(rsp)
+        finally:
+            for task in self._running:
+                task.cancel()
+            for role in self.roles:
+                role.rc.msg_buffer.set_push_listener(None)
+        logger.info(f"Scheduler finished: {self.stats()}")
+        return outputs
+
+    def stats(self) -> dict:
+        return {
+            "rounds": max(self.round_wakes, default=0),
+            "role_runs": sum(self.round_wakes.values()),
+            "wakes_per_round": dict(sorted(self.round_wakes.items())),
+            "dropped_wakes": self.dropped_wakes,
+        }
+
+
 class Environment(ExtEnv):
     """环境，承载一批角色，角色可以向环境发布消息，可以被其他角色观察到
     Environment, hosting a batch of roles, roles can publish messages to the environment, and can be observed by other roles
@@ -105,14 +210,38 @@ class Environment(ExtEnv):
     desc: str = Field(default="")  # 环境描述
     roles: dict[str, SerializeAsAny["Role"]] = Field(default_factory=dict, validate_default=True)
     member_addrs: Dict["Role", Set] = Field(default_factory=dict, exclude=True)
-    history: str = ""  # For debug
+    history_size: int = 100  # number of recent messages kept in `history` for debugging, 0 disables it
     context: Context = Field(default_factory=Context, exclude=True)
 
+    _routes: Dict[str, Dict["Role", None]] = PrivateAttr(default_factory=dict)  # address -> roles, ordered
+    _history: Deque[Message] = PrivateAttr(default_factory=deque)
+
     @model_validator(mode="after")
     def init_roles(self):
+        self._history = deque(maxlen=self.history_size)
         self.add_roles(self.roles.values())
         return self
 
+    @property
+    def history(self) -> str:
+        """The most recent `history_size` published messages, for debugging"""
+        return "".join(f"\n{message}" for message in self._history)
+
+    def _record_history(self, message: Message):
+        if self.history_size:
+            self._history.append(message)
+
+    def _recipients(self, message: Message) -> list["Role"]:
+        if MESSAGE_ROUTE_TO_ALL in message.send_to:
+            return list(self.member_addrs)
+        if len(message.send_to) == 1:
+            return list(self._routes.get(next(iter(message.send_to)), ()))
+        matched = {}
+        for addr in message.send_to:
+            matched.update(self._routes.get(addr, {}))
+        order = {role: i for i, role in enumerate(self.member_addrs)}
+        return sorted(matched, key=order.__getitem__)
+
     def add_role(self, role: "Role"):
         """增加一个在当前环境的角色
         Add a role in the current environment
@@ -142,30 +271,33 @@ class Environment(ExtEnv):
         in RFC 113.
         """
         logger.debug(f"publish_message: {message.dump()}")
-        found = False
-        # According to the routing feature plan in Chapter 2.2.3.2 of RFC 113
-        for role, addrs in self.member_addrs.items():
-            if is_send_to(message, addrs):
-                role.put_message(message)
-                found = True
-        if not found:
+        # According to the routing feature plan in Chapter 2.2.3.2 of RFC 113; routes are kept by `set_addresses`
+        recipients = self._recipients(message)
+        for role in recipients:
+            role.put_message(message)
+        if not recipients:
             logger.warning(f"Message no recipients: {message.dump()}")
-        self.history += f"\n{message}"  # For debug
+        self._record_history(message)  # For debug
 
         return True
 
     async def run(self, k=1):
         """处理一次所有信息的运行
-        Process all Role runs at once
+        Process all Role runs at once; roles without pending messages are skipped
         """
-        for _ in range(k):
-            futures = []
-            for role in self.roles.values():
-                future = role.run()
-                futures.append(future)
-
-            await asyncio.gather(*futures)
-            logger.debug(f"is idle: {self.is_idle}")
+        for i in range(k):
+            ready = [role for role in self.roles.values() if has_pending_messages(role)]
+            if not ready:
+                logger.debug(f"no pending messages, stop after {i} rounds")
+                break
+            await asyncio.gather(*[role.run() for role in ready])
+            logger.debug(f"round {i + 1}: woke {len(ready)}/{len(self.roles)} roles, is idle: {self.is_idle}")
+
+    async def run_until_idle(
+        self, max_round: int = 100, concurrency: Optional[int] = None, outputs: Optional[List[Message]] = None
+    ) -> List[Message]:
+        """Run roles event-driven with `RoleScheduler` until no role has pending messages or `max_round` is hit"""
+        return await RoleScheduler(self.roles.values(), max_round=max_round, concurrency=concurrency).run(outputs)
 
     def get_roles(self) -> dict[str, "Role"]:
         """获得环境内的所有角色
@@ -195,8 +327,16 @@ class Environment(ExtEnv):
         return self.member_addrs.get(obj, {})
 
     def set_addresses(self, obj, addresses):
-        """Set the addresses of the object"""
+        """Set the addresses of the object and update the routing table"""
+        for addr in self.member_addrs.get(obj, ()):
+            routed = self._routes.get(addr)
+            if routed is not None:
+                routed.pop(obj, None)
+                if not routed:
+                    del self._routes[addr]
         self.member_addrs[obj] = addresses
+        for addr in addresses:
+            self._routes.setdefault(addr, {})[obj] = None
 
     def archive(self, auto_archive=True):
         if auto_archive and self.context.git_repo:
@@ -21,6 +21,8 @@ from metagpt.provider import MetaGPTLLM
 from metagpt.provider.base_llm import BaseLLM
 from metagpt.schema import Message, SimpleMessage
 from metagpt.utils.redis import Redis
+from metagpt.utils.text import iter_text_chunks
+from metagpt.utils.token_counter import count_tokens
 
 
 class BrainMemory(BaseModel):
@@ -265,14 +267,15 @@ class BrainMemory(BaseModel):
         text_length = len(text)
         if limit > 0 and text_length < limit:
             return text
+        model = getattr(self.llm, "model", None)
         summary = ""
         while max_count > 0:
-            if text_length < max_token_count:
+            if count_tokens(text, model) < max_token_count:
                 summary = await self._get_summary(text=text, max_words=max_words, keep_language=keep_language)
                 break
 
             padding_size = 20 if max_token_count > 20 else 0
-            text_windows = self.split_texts(text, window_size=max_token_count - padding_size)
+            text_windows = self.split_texts(text, window_size=max_token_count - padding_size, model=model)
             part_max_words = min(int(max_words / len(text_windows)) + 1, 100)
             summaries = []
             for ws in text_windows:
@@ -284,7 +287,6 @@ class BrainMemory(BaseModel):
 
             # Merged and retry
             text = "\n".join(summaries)
-            text_length = len(text)
 
             max_count -= 1  # safeguard
         return summary
@@ -304,28 +306,10 @@ class BrainMemory(BaseModel):
         return response
 
     @staticmethod
-    def split_texts(text: str, window_size) -> List[str]:
-        """Splitting long text into sliding windows text"""
+    def split_texts(text: str, window_size, model: Optional[str] = None) -> List[str]:
+        """Splitting long text into sliding windows of at most `window_size` tokens, cut at line or sentence ends"""
         if window_size <= 0:
             window_size = DEFAULT_TOKEN_SIZE
-        total_len = len(text)
-        if total_len <= window_size:
-            return [text]
-
+        # consecutive windows share up to padding_size tokens
         padding_size = 20 if window_size > 20 else 0
-        windows = []
-        idx = 0
-        data_len = window_size - padding_size
-        while idx < total_len:
-            if window_size + idx > total_len:  # 不足一个滑窗
-                windows.append(text[idx:])
-                break
-            # 每个窗口少算padding_size自然就可实现滑窗功能, 比如: [1, 2, 3, 4, 5, 6, 7, ....]
-            # window_size=3, padding_size=1：
-            # [1, 2, 3], [3, 4, 5], [5, 6, 7], ....
-            #   idx=2,  |  idx=5   |  idx=8  | ...
-            w = text[idx : idx + window_size]
-            windows.append(w)
-            idx += data_len
-
-        return windows
+        return list(iter_text_chunks(text, window_size, model, overlap=padding_size)) or [text]
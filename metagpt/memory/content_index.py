@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : content_index.py
+@Desc    : Inverted indexes over message contents, used by `Memory` when `index_content` is on.
+    The trigram index narrows substring queries (`get_by_content`, `try_remember`) to the messages containing every
+    trigram of the query, which are then verified with `in`, so results equal a full scan. The token index answers
+    word queries (`Memory.search`).
+"""
+import re
+from collections import defaultdict
+from typing import DefaultDict, Dict, Hashable, Iterable, List, Optional, Set
+
+from metagpt.schema import Message
+
+TOKEN_PATTERN = re.compile(r"\w+")
+GRAM_SIZE = 3
+# when even the rarest trigram of a query is in more than this share of the messages, a plain scan is cheaper
+SCAN_RATIO = 0.25
+
+
+def tokenize(text: str) -> Set[str]:
+    return {t.lower() for t in TOKEN_PATTERN.findall(text)}
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _intersect(postings: Iterable[Set[int]]) -> Set[int]:
+    postings = sorted(postings, key=len)
+    if not postings:
+        return set()
+    result = set(postings[0])
+    for posting in postings[1:]:
+        result &= posting
+        if not result:
+            break
+    return result
+
+
+class ContentIndex:
+    """Token and trigram postings of message contents. Documents are numbered in insertion order."""
+
+    def __init__(self):
+        self._next_doc = 0
+        self._doc_of: Dict[Hashable, int] = {}
+        self._docs: Dict[int, Message] = {}
+        self._grams: DefaultDict[str, Set[int]] = defaultdict(set)
+        self._tokens: DefaultDict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, key: Hashable, message: Message):
+        if key in self._doc_of:
+            return
+        doc = self._next_doc
+        self._next_doc += 1
+        self._doc_of[key] = doc
+        self._docs[doc] = message
+        for gram in trigrams(message.content):
+            self._grams[gram].add(doc)
+        for token in tokenize(message.content):
+            self._tokens[token].add(doc)
+
+    def remove(self, key: Hashable):
+        doc = self._doc_of.pop(key, None)
+        if doc is None:
+            return
+        message = self._docs.pop(doc)
+        for postings, terms in ((self._grams, trigrams(message.content)), (self._tokens, tokenize(message.content))):
+            for term in terms:
+                posting = postings.get(term)
+                if posting is None:
+                    continue
+                posting.discard(doc)
+                if not posting:
+                    del postings[term]
+
+    def clear(self):
+        self.__init__()
+
+    def _messages(self, docs: Iterable[int]) -> List[Message]:
+        return [self._docs[doc] for doc in sorted(docs)]
+
+    def find_substring(self, text: str) -> Optional[List[Message]]:
+        """Messages whose content contains `text`, in insertion order.
+
+        Returns None when the index does not help (query shorter than a trigram, or too common) and the caller
+        should scan instead.
+        """
+        if len(text) < GRAM_SIZE:
+            return None
+        postings = []
+        for gram in trigrams(text):
+            posting = self._grams.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        if min(len(p) for p in postings) > SCAN_RATIO * len(self._docs):
+            return None
+        return [m for m in self._messages(_intersect(postings)) if text in m.content]
+
+    def find_tokens(self, query: str) -> List[Message]:
+        """Messages containing every word of `query` (case-insensitive), in insertion order."""
+        postings = []
+        for token in tokenize(query):
+            posting = self._tokens.get(token)
+            if not posting:
+                return []
+            postings.append(posting)
+        if not postings:
+            return []
+        return self._messages(_intersect(postings))
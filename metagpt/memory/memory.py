@@ -7,50 +7,124 @@
 @Modified By: mashenquan, 2023-11-1. According to RFC 116: Updated the type of index key.
 """
 from collections import defaultdict
-from typing import DefaultDict, Iterable, Set
+from typing import Any, DefaultDict, Dict, Hashable, Iterable, List, Optional, Set
 
-from pydantic import BaseModel, Field, SerializeAsAny
+from pydantic import BaseModel, Field, PrivateAttr, SerializeAsAny
 
 from metagpt.const import IGNORED_MESSAGE_ID
+from metagpt.memory.content_index import ContentIndex, tokenize
 from metagpt.schema import Message
 from metagpt.utils.common import any_to_str, any_to_str_set
 
 
+def _remove_identical(messages: List[Message], message: Message):
+    """Remove `message` itself (not an equal copy) from the list, searching from the newest end."""
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i] is message:
+            del messages[i]
+            return
+
+
 class Memory(BaseModel):
-    """The most basic memory: super-memory"""
+    """The most basic memory: super-memory
+
+    `storage` keeps the messages in arrival order and `index` groups them by `cause_by`; both are serialized.
+    Private indexes keyed by `Message.id` (by role and by `send_to` address as well) are rebuilt from `storage`
+    on load, so membership tests and news detection do not scan the storage. With `index_content`, contents are
+    indexed too and substring/keyword lookups no longer scan every message either.
+    """
 
     storage: list[SerializeAsAny[Message]] = []
     index: DefaultDict[str, list[SerializeAsAny[Message]]] = Field(default_factory=lambda: defaultdict(list))
     ignore_id: bool = False
+    index_content: bool = False
+
+    _by_key: Dict[Hashable, Message] = PrivateAttr(default_factory=dict)
+    _by_role: DefaultDict[str, List[Message]] = PrivateAttr(default_factory=lambda: defaultdict(list))
+    _by_send_to: DefaultDict[str, List[Message]] = PrivateAttr(default_factory=lambda: defaultdict(list))
+    _content_index: Optional[ContentIndex] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any):
+        self._rebuild_indexes()
+
+    @staticmethod
+    def _key(message: Message) -> Hashable:
+        """Messages are told apart by id; with ignored ids, by their routing fields and content."""
+        if message.id != IGNORED_MESSAGE_ID:
+            return message.id
+        return message.role, message.content, message.cause_by, message.sent_from, frozenset(message.send_to)
+
+    def _rebuild_indexes(self):
+        storage, self.storage = self.storage, []
+        self.index = defaultdict(list)
+        self._by_key.clear()
+        self._by_role.clear()
+        self._by_send_to.clear()
+        self._content_index = ContentIndex() if self.index_content else None
+        for message in storage:
+            self._index_message(message)
+
+    def _index_message(self, message: Message) -> bool:
+        key = self._key(message)
+        if key in self._by_key:
+            return False
+        self._by_key[key] = message
+        self.storage.append(message)
+        if message.cause_by:
+            self.index[message.cause_by].append(message)
+        self._by_role[message.role].append(message)
+        for addr in message.send_to:
+            self._by_send_to[addr].append(message)
+        if self._content_index is not None:
+            self._content_index.add(key, message)
+        return True
+
+    def _unindex_message(self, message: Message):
+        key = self._key(message)
+        self._by_key.pop(key, None)
+        if self._content_index is not None:
+            self._content_index.remove(key)
+        buckets = [self.index.get(message.cause_by), self._by_role.get(message.role)]
+        buckets += [self._by_send_to.get(addr) for addr in message.send_to]
+        for bucket in buckets:
+            if bucket:
+                _remove_identical(bucket, message)
 
     def add(self, message: Message):
         """Add a new message to storage, while updating the index"""
         if self.ignore_id:
             message.id = IGNORED_MESSAGE_ID
-        if message in self.storage:
-            return
-        self.storage.append(message)
-        if message.cause_by:
-            self.index[message.cause_by].append(message)
+        self._index_message(message)
 
     def add_batch(self, messages: Iterable[Message]):
         for message in messages:
             self.add(message)
 
+    def contains(self, message: Message) -> bool:
+        """Whether the message (by id) is already stored"""
+        return self._key(message) in self._by_key
+
     def get_by_role(self, role: str) -> list[Message]:
         """Return all messages of a specified role"""
-        return [message for message in self.storage if message.role == role]
+        return list(self._by_role.get(role, []))
+
+    def get_by_send_to(self, addr: str) -> list[Message]:
+        """Return all messages addressed to `addr`"""
+        return list(self._by_send_to.get(addr, []))
 
     def get_by_content(self, content: str) -> list[Message]:
         """Return all messages containing a specified content"""
+        if self._content_index is not None:
+            found = self._content_index.find_substring(content)
+            if found is not None:
+                return found
         return [message for message in self.storage if content in message.content]
 
     def delete_newest(self) -> "Message":
         """delete the newest message from the storage"""
         if len(self.storage) > 0:
             newest_msg = self.storage.pop()
-            if newest_msg.cause_by and newest_msg in self.index[newest_msg.cause_by]:
-                self.index[newest_msg.cause_by].remove(newest_msg)
+            self._unindex_message(newest_msg)
         else:
             newest_msg = None
         return newest_msg
@@ -59,14 +133,16 @@ class Memory(BaseModel):
         """Delete the specified message from storage, while updating the index"""
         if self.ignore_id:
             message.id = IGNORED_MESSAGE_ID
-        self.storage.remove(message)
-        if message.cause_by and message in self.index[message.cause_by]:
-            self.index[message.cause_by].remove(message)
+        stored = self._by_key.get(self._key(message))
+        if stored is None:
+            raise ValueError(f"Message {message.id} not in memory")
+        _remove_identical(self.storage, stored)
+        self._unindex_message(stored)
 
     def clear(self):
         """Clear storage and index"""
         self.storage = []
-        self.index = defaultdict(list)
+        self._rebuild_indexes()
 
     def count(self) -> int:
         """Return the number of messages in storage"""
@@ -74,7 +150,16 @@ class Memory(BaseModel):
 
     def try_remember(self, keyword: str) -> list[Message]:
         """Try to recall all messages containing a specified keyword"""
-        return [message for message in self.storage if keyword in message.content]
+        return self.get_by_content(keyword)
+
+    def search(self, query: str) -> list[Message]:
+        """Return all messages containing every word of the query, ignoring case"""
+        if self._content_index is not None:
+            return self._content_index.find_tokens(query)
+        words = tokenize(query)
+        if not words:
+            return []
+        return [message for message in self.storage if words <= tokenize(message.content)]
 
     def get(self, k=0) -> list[Message]:
         """Return the most recent k memories, return all when k=0"""
@@ -82,13 +167,10 @@ class Memory(BaseModel):
 
     def find_news(self, observed: list[Message], k=0) -> list[Message]:
         """find news (previously unseen messages) from the the most recent k memories, from all memories when k=0"""
-        already_observed = self.get(k)
-        news: list[Message] = []
-        for i in observed:
-            if i in already_observed:
-                continue
-            news.append(i)
-        return news
+        if k == 0:
+            return [i for i in observed if not self.contains(i)]
+        already_observed = {self._key(i) for i in self.get(k)}
+        return [i for i in observed if self._key(i) not in already_observed]
 
     def get_by_action(self, action) -> list[Message]:
         """Return all messages triggered by a specified Action"""
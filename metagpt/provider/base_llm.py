@@ -8,14 +8,152 @@
 """
 import json
 from abc import ABC, abstractmethod
-from typing import Optional, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Union
 
 from openai import AsyncOpenAI
 
 from metagpt.configs.llm_config import LLMConfig
-from metagpt.logs import logger
+from metagpt.logs import log_llm_stream, logger
 from metagpt.schema import Message
 from metagpt.utils.cost_manager import CostManager
+from metagpt.utils.response_cache import (
+    SAMPLING_PARAMS,
+    ResponseCache,
+    get_response_cache,
+    make_cache_key,
+)
+
+
+@dataclass
+class LLMCallMetrics:
+    """Usage and timing of one completion call, as reported by the provider
+
+    queue_sec: time before the backend started working on the prompt (client-side waits + server queue)
+    prefill_sec: prompt processing (incl. model load) before the first token
+    generation_sec: decoding time from first to last token
+    """
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    usage_source: str = "provider"  # "provider" | "tokenizer" (counted locally)
+    total_sec: float = 0.0
+    ttft_sec: Optional[float] = None
+    queue_sec: Optional[float] = None
+    prefill_sec: Optional[float] = None
+    generation_sec: Optional[float] = None
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        if not self.generation_sec:
+            return None
+        return self.completion_tokens / self.generation_sec
+
+
+# Metrics of the latest call made in the current asyncio task. A ContextVar instead of an attribute,
+# so concurrent calls on one LLM instance don't overwrite each other.
+_CALL_METRICS: ContextVar[Optional[LLMCallMetrics]] = ContextVar("llm_call_metrics", default=None)
+
+
+def pop_call_metrics() -> Optional[LLMCallMetrics]:
+    """Return and clear the metrics of the latest completion call awaited in this task"""
+    metrics = _CALL_METRICS.get()
+    _CALL_METRICS.set(None)
+    return metrics
+
+
+# Number of tokens streamed by the calls awaited in the current task
+_STREAMED_TOKENS: ContextVar[int] = ContextVar("llm_streamed_tokens", default=0)
+
+
+def streamed_token_count() -> int:
+    """Tokens streamed so far by the calls awaited in this task; a call that streamed any cannot be re-run unseen"""
+    return _STREAMED_TOKENS.get()
+
+
+class ObservedStream:
+    """Observers of the streams of an `observe_stream` block, a new one from `factory` for each streamed attempt.
+
+    An observer has a `feed(token)` method, returning False to stop the generation. An observer whose `complete` is
+    then true stopped on a whole reply (e.g. a closed JSON object), which is kept like any other; other stops abort
+    the reply. Retries and failovers re-stream from the start, so each attempt begins with a fresh observer;
+    `observer` is the one of the latest attempt, None when nothing was streamed.
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Any]]):
+        self.factory = factory
+        self.observer = None
+
+    def begin(self):
+        if self.factory is not None:
+            self.observer = self.factory()
+
+    def feed(self, token: str) -> bool:
+        if self.observer is None:
+            self.begin()
+        return self.observer is None or self.observer.feed(token) is not False
+
+    @property
+    def finished(self) -> bool:
+        """Whether the latest observer stopped its stream on a complete reply"""
+        return bool(getattr(self.observer, "complete", False))
+
+
+# Observers of the tokens streamed by the calls made in the current task, see `observe_stream`
+_STREAM_OBSERVER: ContextVar[Optional[ObservedStream]] = ContextVar("llm_stream_observer", default=None)
+# Set when an observer aborted the latest stream before a complete reply, which is then not cached
+_STREAM_ABORTED: ContextVar[bool] = ContextVar("llm_stream_aborted", default=False)
+
+
+# Sample the calls made in the current task stand for, see `cache_sample`
+_CACHE_SAMPLE: ContextVar[Optional[Hashable]] = ContextVar("llm_cache_sample", default=None)
+
+
+@contextmanager
+def cache_sample(sample_id: Optional[Hashable]):
+    """Cache the replies of the LLM calls made inside the block per `sample_id` (e.g. the sample index of pass@k).
+
+    Without a sample id, calls sampled with temperature > 0 bypass the response cache, since repeating a request
+    is then meant to give a different reply.
+    """
+    token = _CACHE_SAMPLE.set(sample_id)
+    try:
+        yield
+    finally:
+        _CACHE_SAMPLE.reset(token)
+
+
+# JSON schema the replies of the calls made in the current task must follow, see `constrain_output`
+_RESPONSE_SCHEMA: ContextVar[Optional[dict]] = ContextVar("llm_response_schema", default=None)
+
+
+@contextmanager
+def constrain_output(schema: Optional[dict]):
+    """Have providers that support it constrain the replies of the LLM calls made inside the block to `schema`.
+
+    Other providers ignore it, their replies still have to be parsed and repaired by the caller.
+    """
+    token = _RESPONSE_SCHEMA.set(schema)
+    try:
+        yield
+    finally:
+        _RESPONSE_SCHEMA.reset(token)
+
+
+@contextmanager
+def observe_stream(factory: Optional[Callable[[], Any]]):
+    """Let observers made by `factory` see the tokens streamed by the LLM calls inside the block, and stop them early.
+
+    Yields the `ObservedStream`, whose `observer` saw the latest streamed attempt.
+    """
+    stream = ObservedStream(factory)
+    token = _STREAM_OBSERVER.set(stream)
+    try:
+        yield stream
+    finally:
+        _STREAM_OBSERVER.reset(token)
 
 
 class BaseLLM(ABC):
@@ -29,6 +167,8 @@ class BaseLLM(ABC):
     aclient: Optional[Union[AsyncOpenAI]] = None
     cost_manager: Optional[CostManager] = None
     model: Optional[str] = None
+    _response_cache: Optional[ResponseCache] = None
+    supports_response_schema: bool = False  # can constrain decoding to the schema set by `constrain_output`
 
     @abstractmethod
     def __init__(self, config: LLMConfig):
@@ -64,6 +204,41 @@ class BaseLLM(ABC):
     def _system_msgs(self, msgs: list[str]) -> list[dict[str, str]]:
         return [self._system_msg(msg) for msg in msgs]
 
+    def _report_call_metrics(self, metrics: LLMCallMetrics):
+        """Providers publish per-call usage/timings here; read them back with `pop_call_metrics()`"""
+        _CALL_METRICS.set(metrics)
+
+    @property
+    def sampling_temperature(self) -> float:
+        """Temperature the provider samples with"""
+        return self.config.temperature or 0.0
+
+    @property
+    def constrains_output(self) -> bool:
+        """Whether replies follow the schema set by `constrain_output`"""
+        return self.supports_response_schema and getattr(self.config, "constrained_output", None) is not False
+
+    def _response_schema(self) -> Optional[dict]:
+        """The schema set by `constrain_output`, when this provider applies it"""
+        return _RESPONSE_SCHEMA.get() if self.constrains_output else None
+
+    def _stream_begin(self):
+        """Called by providers as each streamed attempt starts, so the stream observer starts afresh"""
+        stream = _STREAM_OBSERVER.get()
+        if stream is not None:
+            stream.begin()
+
+    def _stream_token(self, token: str) -> bool:
+        """Print a streamed token and pass it to the stream observer; False means the provider should stop reading."""
+        log_llm_stream(token)
+        _STREAMED_TOKENS.set(_STREAMED_TOKENS.get() + 1)
+        stream = _STREAM_OBSERVER.get()
+        if stream is None or stream.feed(token):
+            return True
+        if not stream.finished:
+            _STREAM_ABORTED.set(True)
+        return False
+
     def _default_system_msg(self):
         return self._system_msg(self.system_prompt)
 
@@ -86,7 +261,7 @@ class BaseLLM(ABC):
             message.extend(format_msgs)
         message.append(self._user_msg(msg, images=images))
         logger.debug(message)
-        rsp = await self.acompletion_text(message, stream=stream, timeout=timeout)
+        rsp = await self.acompletion_text_cached(message, stream=stream, timeout=timeout)
         return rsp
 
     def _extract_assistant_rsp(self, context):
@@ -98,7 +273,7 @@ class BaseLLM(ABC):
         for msg in msgs:
             umsg = self._user_msg(msg)
             context.append(umsg)
-            rsp_text = await self.acompletion_text(context, timeout=timeout)
+            rsp_text = await self.acompletion_text_cached(context, timeout=timeout)
             context.append(self._assistant_msg(rsp_text))
         return self._extract_assistant_rsp(context)
 
@@ -121,6 +296,44 @@ class BaseLLM(ABC):
     async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
         """Asynchronous version of completion. Return str. Support stream-print"""
 
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Response cache configured by `config.cache`, None when disabled"""
+        if self._response_cache is None and getattr(self.config, "cache", False):
+            self._response_cache = get_response_cache(self.config)
+        return self._response_cache
+
+    def _cache_key(self, messages: list[dict]) -> str:
+        provider = self.config.api_type.value if self.config.api_type else type(self).__name__
+        params = {name: getattr(self.config, name, None) for name in SAMPLING_PARAMS}
+        schema = self._response_schema()
+        if schema is not None:
+            params["response_schema"] = schema
+        sample = _CACHE_SAMPLE.get()
+        if sample is not None:
+            params["sample"] = sample
+        return make_cache_key(provider, self.model or self.config.model, messages, params)
+
+    async def acompletion_text_cached(self, messages: list[dict], stream=False, timeout=3) -> str:
+        """`acompletion_text` behind the opt-in response cache"""
+        cache = self.response_cache
+        if cache is None or (self.sampling_temperature > 0 and _CACHE_SAMPLE.get() is None):
+            return await self.acompletion_text(messages, stream=stream, timeout=timeout)
+
+        key = self._cache_key(messages)
+        rsp = cache.get(key)
+        if rsp is not None:
+            if stream:
+                self._stream_begin()
+                self._stream_token(rsp)
+                log_llm_stream("\n")
+            return rsp
+        _STREAM_ABORTED.set(False)
+        rsp = await self.acompletion_text(messages, stream=stream, timeout=timeout)
+        if rsp and not _STREAM_ABORTED.get():
+            cache.set(key, rsp)
+        return rsp
+
     def get_choice_text(self, rsp: dict) -> str:
         """Required to provide the first text of choice"""
         return rsp.get("choices")[0]["message"]["content"]
@@ -72,6 +72,8 @@ class FireworksCostManager(CostManager):
 
 @register_provider(LLMType.FIREWORKS)
 class FireworksLLM(OpenAILLM):
+    supports_response_schema = False
+
     def __init__(self, config: LLMConfig):
         super().__init__(config=config)
         self.auto_max_tokens = False
@@ -10,11 +10,9 @@ import re
 import sys
 import threading
 import time
-from contextlib import asynccontextmanager
 from enum import Enum
 from typing import (
     AsyncGenerator,
-    AsyncIterator,
     Dict,
     Iterator,
     Optional,
@@ -43,6 +41,11 @@ TIMEOUT_SECS = 600
 MAX_SESSION_LIFETIME_SECS = 180
 MAX_CONNECTION_RETRIES = 2
 
+# Pooled aiohttp sessions (see AiohttpSessionPool)
+POOL_MAX_CONNECTIONS = int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", 32))
+POOL_DNS_CACHE_TTL_SECS = 300
+POOL_KEEPALIVE_SECS = 60
+
 # Has one attribute per thread, 'session'.
 _thread_context = threading.local()
 
@@ -232,8 +235,10 @@ class APIRequestor:
         api_type=None,
         api_version=None,
         organization=None,
+        connection_limit: Optional[int] = None,
     ):
         self.base_url = base_url or openai.base_url
+        self.connection_limit = connection_limit
         self.api_key = key or openai.api_key
         self.api_type = ApiType.from_str(api_type) if api_type else ApiType.from_str("openai")
         self.api_version = api_version or openai.api_version
@@ -388,8 +393,8 @@ class APIRequestor:
         request_id: Optional[str] = None,
         request_timeout: Optional[Union[float, Tuple[float, float]]] = None,
     ) -> Tuple[Union[OpenAIResponse, AsyncGenerator[OpenAIResponse, None]], bool, str]:
-        ctx = aiohttp_session()
-        session = await ctx.__aenter__()
+        session = await session_pool.get(self.base_url, limit=self.connection_limit)
+        result = None
         try:
             result = await self.arequest_raw(
                 method.lower(),
@@ -403,7 +408,8 @@ class APIRequestor:
             )
             resp, got_stream = await self._interpret_async_response(result, stream)
         except Exception:
-            await ctx.__aexit__(None, None, None)
+            if result is not None:
+                result.release()
             raise
         if got_stream:
 
@@ -413,11 +419,12 @@ class APIRequestor:
                     async for r in resp:
                         yield r
                 finally:
-                    await ctx.__aexit__(None, None, None)
+                    # hand the keep-alive connection back to the pool
+                    result.release()
 
             return wrap_resp(), got_stream, self.api_key
         else:
-            await ctx.__aexit__(None, None, None)
+            result.release()
             return resp, got_stream, self.api_key
 
     def request_headers(self, method: str, extra, request_id: Optional[str]) -> Dict[str, str]:
@@ -616,7 +623,60 @@ class APIRequestor:
         ...
 
 
-@asynccontextmanager
-async def aiohttp_session() -> AsyncIterator[aiohttp.ClientSession]:
-    async with aiohttp.ClientSession() as session:
-        yield session
+class AiohttpSessionPool:
+    """Long-lived aiohttp sessions, one per base_url, reusing keep-alive connections across requests.
+
+    aiohttp sessions are bound to the event loop that created them, so a session created under a
+    previous `asyncio.run` is replaced instead of reused.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def get(self, base_url: str, limit: Optional[int] = None) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        stats = self._stats.setdefault(base_url, {"requests": 0, "sessions_created": 0})
+        stats["requests"] += 1
+
+        entry = self._sessions.get(base_url)
+        if entry is not None and entry[0] is loop and not entry[1].closed:
+            return entry[1]
+
+        connector = aiohttp.TCPConnector(
+            limit=limit or POOL_MAX_CONNECTIONS,
+            ttl_dns_cache=POOL_DNS_CACHE_TTL_SECS,
+            keepalive_timeout=POOL_KEEPALIVE_SECS,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        self._sessions[base_url] = (loop, session)
+        stats["sessions_created"] += 1
+        return session
+
+    async def close(self):
+        """Close every session owned by the running loop; call before the loop shuts down."""
+        loop = asyncio.get_running_loop()
+        for base_url, (owner, session) in list(self._sessions.items()):
+            if owner is loop:
+                await session.close()
+            if owner is loop or owner.is_closed():
+                del self._sessions[base_url]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per base_url request / session counters and the connection limit of the open session."""
+        result = {}
+        for base_url, stats in self._stats.items():
+            item = dict(stats)
+            entry = self._sessions.get(base_url)
+            if entry is not None and not entry[1].closed:
+                item["limit"] = entry[1].connector.limit
+            result[base_url] = item
+        return result
+
+
+session_pool = AiohttpSessionPool()
+
+
+async def close_sessions():
+    """Close pooled HTTP sessions of the running event loop."""
+    await session_pool.close()
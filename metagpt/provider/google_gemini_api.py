@@ -49,6 +49,8 @@ class GeminiLLM(BaseLLM):
     Refs to `https://ai.google.dev/tutorials/python_quickstart`
     """
 
+    sampling_temperature = 0.3
+
     def __init__(self, config: LLMConfig):
         self.use_system_prompt = False  # google gemini has no system prompt when use api
 
@@ -69,7 +71,7 @@ class GeminiLLM(BaseLLM):
         return {"role": "model", "parts": [msg]}
 
     def _const_kwargs(self, messages: list[dict], stream: bool = False) -> dict:
-        kwargs = {"contents": messages, "generation_config": GenerationConfig(temperature=0.3), "stream": stream}
+        kwargs = {"contents": messages, "generation_config": GenerationConfig(temperature=self.sampling_temperature), "stream": stream}
         return kwargs
 
     def _update_costs(self, usage: dict):
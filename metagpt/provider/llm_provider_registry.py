@@ -41,6 +41,8 @@ def create_llm_instance(config: LLMConfig) -> BaseLLM:
     # 触发 @register_provider(LLMType.OLLAMA)
     if config.api_type == _LLMType.OLLAMA and _LLMType.OLLAMA not in LLM_REGISTRY.providers:
         from metagpt.provider import ollama_api  # noqa: F401
+    if config.api_type == _LLMType.ROUTER and _LLMType.ROUTER not in LLM_REGISTRY.providers:
+        from metagpt.provider import router_api  # noqa: F401
 
     return LLM_REGISTRY.get_provider(config.api_type)(config)
 
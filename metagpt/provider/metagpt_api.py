@@ -12,4 +12,4 @@ from metagpt.provider.llm_provider_registry import register_provider
 
 @register_provider(LLMType.METAGPT)
 class MetaGPTLLM(OpenAILLM):
-    pass
+    supports_response_schema = False
@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
+from dataclasses import asdict
+from typing import Optional
+
 from requests import ConnectionError
 from tenacity import (
     retry, stop_after_attempt, wait_random_exponential,
@@ -11,7 +15,7 @@ from tenacity import (
 from metagpt.configs.llm_config import LLMConfig, LLMType
 from metagpt.const import LLM_API_TIMEOUT
 from metagpt.logs import logger, log_llm_stream
-from metagpt.provider.base_llm import BaseLLM
+from metagpt.provider.base_llm import BaseLLM, LLMCallMetrics
 from metagpt.provider.general_api_requestor import GeneralAPIRequestor
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.provider.openai_api import log_and_reraise
@@ -20,20 +24,75 @@ from metagpt.utils.cost_manager import TokenCostManager
 
 @register_provider(LLMType.OLLAMA)
 class OllamaLLM(BaseLLM):
+    supports_response_schema = True
 
     def __init__(self, config: LLMConfig):
         assert config.base_url, "ollama base url is required!"
 
         self.model = config.model
         self.config = config
-        self.client = GeneralAPIRequestor(base_url=config.base_url)
+        self.client = GeneralAPIRequestor(base_url=config.base_url, connection_limit=config.connection_limit)
 
         self.http_method = "post"
-        self.suffix_url = "/api/generate"
+        self.use_chat = config.ollama_endpoint != "generate"
+        self.suffix_url = "/api/chat" if self.use_chat else "/api/generate"
         self._cost_manager = TokenCostManager()
+        self.last_call_stats: dict = {}
+
+    def _options(self) -> dict:
+        """Sampling options passed through from LLMConfig."""
+        options = {
+            "temperature": self.config.temperature,
+            "num_predict": self.config.max_token,
+        }
+        if self.config.num_ctx:
+            options["num_ctx"] = self.config.num_ctx
+        if self.config.top_p != 1.0:
+            options["top_p"] = self.config.top_p
+        if self.config.top_k:
+            options["top_k"] = self.config.top_k
+        if self.config.repetition_penalty != 1.0:
+            options["repeat_penalty"] = self.config.repetition_penalty
+        if self.config.stop:
+            options["stop"] = [self.config.stop]
+        return options
+
+    @staticmethod
+    def _chat_message(m: dict) -> dict:
+        """OpenAI-style message -> Ollama chat message (images go to a separate base64 list)."""
+        content = m["content"]
+        if isinstance(content, str):
+            return {"role": m["role"], "content": content}
+        texts, images = [], []
+        for part in content:
+            if part.get("type") == "text":
+                texts.append(part["text"])
+            elif part.get("type") == "image_url":
+                url = part["image_url"] if isinstance(part["image_url"], str) else part["image_url"].get("url", "")
+                if url.startswith("data:"):
+                    images.append(url.split(",", 1)[-1])
+        msg = {"role": m["role"], "content": "\n".join(texts)}
+        if images:
+            msg["images"] = images
+        return msg
 
     def _payload(self, messages, stream=False):
-        """Convert OpenAI-style messages into a string prompt."""
+        payload = {
+            "model": self.model,
+            "stream": stream,
+            "options": self._options(),
+        }
+        if self.config.keep_alive is not None:
+            payload["keep_alive"] = self.config.keep_alive
+        schema = self._response_schema()
+        if schema is not None:
+            payload["format"] = schema  # grammar-constrained decoding, needs ollama >= 0.5
+
+        if self.use_chat:
+            payload["messages"] = [self._chat_message(m) for m in messages]
+            return payload
+
+        # legacy /api/generate: convert OpenAI-style messages into a string prompt
         prompt = ""
         for m in messages:
             if m["role"] == "system":
@@ -42,13 +101,39 @@ class OllamaLLM(BaseLLM):
                 prompt += f"{m['content']}\n"
             elif m["role"] == "assistant":
                 prompt += f"{m['content']}\n"
+        payload["prompt"] = prompt
+        return payload
 
+    def _chunk_text(self, data: dict) -> str:
+        if self.use_chat:
+            return data.get("message", {}).get("content", "")
+        return data.get("response", "")
+
+    def _record_stats(self, data: dict, started: float, first_token_at: Optional[float] = None) -> dict:
+        """Turn the server-side timings of the final response (ns) into LLMCallMetrics and return the usage."""
+        ns = 1e9
+        total_sec = time.perf_counter() - started
+        eval_sec = data.get("eval_duration", 0) / ns
+        prefill_sec = (data.get("load_duration", 0) + data.get("prompt_eval_duration", 0)) / ns
+        # without a streamed first token, decoding is assumed to end when the response arrives
+        ttft_sec = first_token_at - started if first_token_at is not None else max(0.0, total_sec - eval_sec)
+        metrics = LLMCallMetrics(
+            prompt_tokens=data.get("prompt_eval_count", 0),
+            completion_tokens=data.get("eval_count", 0),
+            total_sec=total_sec,
+            ttft_sec=ttft_sec,
+            queue_sec=max(0.0, ttft_sec - prefill_sec),
+            prefill_sec=prefill_sec,
+            generation_sec=eval_sec,
+        )
+        self._report_call_metrics(metrics)
+        self.last_call_stats = {**asdict(metrics), "tokens_per_sec": metrics.tokens_per_sec}
+        logger.debug(f"ollama call stats: {self.last_call_stats}")
         return {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": stream,
-            "options": {"temperature": 0.2}
+            "prompt_tokens": metrics.prompt_tokens,
+            "completion_tokens": metrics.completion_tokens,
         }
+
     def _update_costs(self, usage: dict):
         """Update token usage cost (MetaGPT expects this function)."""
         # Ollama does not provide token cost; we only store raw counts.
@@ -68,77 +153,90 @@ class OllamaLLM(BaseLLM):
     # -------------------
     # Non-Stream
     # -------------------
-    async def _achat_completion(self, messages):
+    def _request_timeout(self, timeout=3) -> float:
+        # like OpenAILLM, the caller's timeout can only extend the configured one; local models load slowly
+        return max(LLM_API_TIMEOUT, self.config.timeout, timeout)
+
+    async def _achat_completion(self, messages, timeout=3):
         """One-shot non-stream completion"""
         payload = self._payload(messages, stream=False)
+        started = time.perf_counter()
 
         resp, _, _ = await self.client.arequest(
             method=self.http_method,
             url=self.suffix_url,
             params=payload,
-            request_timeout=LLM_API_TIMEOUT,
+            request_timeout=self._request_timeout(timeout),
         )
 
         text = resp.decode("utf-8")
         data = json.loads(text)
 
-        usage = {
-            "prompt_tokens": data.get("prompt_eval_count", 0),
-            "completion_tokens": data.get("eval_count", 0)
-        }
+        usage = self._record_stats(data, started)
         self._update_costs(usage)
 
-        return data.get("response", "")
+        return self._chunk_text(data)
 
     # -------------------
     # Stream
     # -------------------
-    async def _achat_completion_stream(self, messages):
+    async def _achat_completion_stream(self, messages, timeout=3):
+        self._stream_begin()
         payload = self._payload(messages, stream=True)
+        started = time.perf_counter()
+        first_token_at = None
 
         stream_resp, _, _ = await self.client.arequest(
             method=self.http_method,
             url=self.suffix_url,
             stream=True,
             params=payload,
-            request_timeout=LLM_API_TIMEOUT,
+            request_timeout=self._request_timeout(timeout),
         )
 
         full = []
         total_usage = {}
 
-        async for raw in stream_resp:
-            line = raw.decode("utf-8").strip()
-
-            if not line:
-                continue
-
-            try:
-                data = json.loads(line)
-            except:
-                continue
-
-            # token
-            if "response" in data and not data.get("done", False):
-                token = data["response"]
-                full.append(token)
-                log_llm_stream(token)
-
-            # final stats
-            if data.get("done", False):
-                total_usage = {
-                    "prompt_tokens": data.get("prompt_eval_count", 0),
-                    "completion_tokens": data.get("eval_count", 0)
-                }
-
+        try:
+            async for raw in stream_resp:
+                line = raw.decode("utf-8").strip()
+
+                if not line:
+                    continue
+
+                try:
+                    data = json.loads(line)
+                except:
+                    continue
+
+                # token
+                token = self._chunk_text(data)
+                if token:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    full.append(token)
+                    if not self._stream_token(token):
+                        break  # closing the response below makes the server stop generating
+
+                # final stats
+                if data.get("done", False):
+                    total_usage = self._record_stats(data, started, first_token_at)
+        finally:
+            aclose = getattr(stream_resp, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        if not total_usage:
+            # stopped early: no final stats, count one token per chunk
+            total_usage = self._record_stats({"eval_count": len(full)}, started, first_token_at)
         log_llm_stream("\n")
         self._update_costs(total_usage)
 
         return "".join(full)
 
     # main entry
-    async def acompletion(self, messages):
-        return await self._achat_completion(messages)
+    async def acompletion(self, messages, timeout=3):
+        return await self._achat_completion(messages, timeout=timeout)
 
     @retry(
         stop=stop_after_attempt(3),
@@ -149,5 +247,5 @@ class OllamaLLM(BaseLLM):
     )
     async def acompletion_text(self, messages, stream=False, timeout=3):
         if stream:
-            return await self._achat_completion_stream(messages)
-        return await self._achat_completion(messages)
+            return await self._achat_completion_stream(messages, timeout=timeout)
+        return await self._achat_completion(messages, timeout=timeout)
@@ -14,6 +14,8 @@ from metagpt.utils.token_counter import count_message_tokens, count_string_token
 
 @register_provider(LLMType.OPEN_LLM)
 class OpenLLM(OpenAILLM):
+    supports_response_schema = False  # `response_format` json_schema support varies between self-hosted servers
+
     def __init__(self, config: LLMConfig):
         super().__init__(config)
         self._cost_manager = TokenCostManager()
@@ -9,9 +9,10 @@
 
 import json
 import re
+import time
 from typing import AsyncIterator, Optional, Union
 
-from openai import APIConnectionError, AsyncOpenAI, AsyncStream
+from openai import APIConnectionError, AsyncOpenAI, AsyncStream, BadRequestError
 from openai._base_client import AsyncHttpxClientWrapper
 from openai.types import CompletionUsage
 from openai.types.chat import ChatCompletion, ChatCompletionChunk
@@ -25,7 +26,7 @@ from tenacity import (
 
 from metagpt.configs.llm_config import LLMConfig, LLMType
 from metagpt.logs import log_llm_stream, logger
-from metagpt.provider.base_llm import BaseLLM
+from metagpt.provider.base_llm import BaseLLM, LLMCallMetrics
 from metagpt.provider.constant import GENERAL_FUNCTION_SCHEMA
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.schema import Message
@@ -34,7 +35,7 @@ from metagpt.utils.cost_manager import CostManager, Costs
 from metagpt.utils.exceptions import handle_exception
 from metagpt.utils.token_counter import (
     count_message_tokens,
-    count_string_tokens,
+    count_tokens,
     get_max_completion_tokens,
 )
 
@@ -54,6 +55,15 @@ See FAQ 5.8
 class OpenAILLM(BaseLLM):
     """Check https://platform.openai.com/examples for examples"""
 
+    supports_response_schema = True
+    sampling_temperature = 0.3
+    # OpenAI models accepting a json_schema `response_format`; others need `constrained_output: true` to get it
+    JSON_SCHEMA_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o3", "o4")
+    JSON_SCHEMA_EXCLUDED = ("gpt-4o-2024-05-13",)
+    # request parameters some OpenAI-compatible endpoints answer with a 400; dropped for good once one does
+    OPTIONAL_PARAMS = ("response_format", "stream_options")
+    _rejected_params: frozenset = frozenset()
+
     def __init__(self, config: LLMConfig):
         self.config = config
         self._init_model()
@@ -61,6 +71,42 @@ class OpenAILLM(BaseLLM):
         self.auto_max_tokens = False
         self.cost_manager: Optional[CostManager] = None
 
+    @property
+    def constrains_output(self) -> bool:
+        if (
+            not self.supports_response_schema
+            or "response_format" in self._rejected_params
+            or self.config.constrained_output is False
+        ):
+            return False
+        if self.config.constrained_output:
+            return True
+        model = self.model or ""
+        return (
+            self.config.api_type == LLMType.OPENAI
+            and "api.openai.com" in (self.config.base_url or "")
+            and model.startswith(self.JSON_SCHEMA_MODELS)
+            and not model.startswith(self.JSON_SCHEMA_EXCLUDED)
+        )
+
+    async def _create_completion(self, **kwargs):
+        """`chat.completions.create`, retried without the OPTIONAL_PARAMS when the endpoint rejects the request"""
+        kwargs = {k: v for k, v in kwargs.items() if k not in self._rejected_params}
+        try:
+            return await self.aclient.chat.completions.create(**kwargs)
+        except BadRequestError as e:
+            optional = [k for k in self.OPTIONAL_PARAMS if k in kwargs]
+            if not optional:
+                raise
+            for k in optional:
+                kwargs.pop(k)
+            rsp = await self.aclient.chat.completions.create(**kwargs)
+            # only those parameters were the problem: stop sending them. Without `response_format` the caller repairs
+            # unconstrained output as before, without `stream_options` streamed usage is counted locally.
+            self._rejected_params = self._rejected_params.union(optional)
+            logger.warning(f"{self.model} rejected {', '.join(optional)} ({e}), no longer sending it")
+            return rsp
+
     def _init_model(self):
         self.model = self.config.model  # Used in _calc_usage & _cons_kwargs
 
@@ -87,14 +133,24 @@ class OpenAILLM(BaseLLM):
 
         return params
 
-    async def _achat_completion_stream(self, messages: list[dict], timeout=3) -> AsyncIterator[str]:
-        response: AsyncStream[ChatCompletionChunk] = await self.aclient.chat.completions.create(
-            **self._cons_kwargs(messages, timeout=timeout), stream=True
+    async def _achat_completion_stream(
+        self, messages: list[dict], timeout=3, usage_out: Optional[list] = None
+    ) -> AsyncIterator[str]:
+        response: AsyncStream[ChatCompletionChunk] = await self._create_completion(
+            **self._cons_kwargs(messages, timeout=timeout),
+            stream=True,
+            stream_options={"include_usage": True},  # usage arrives on a final chunk without choices
         )
 
-        async for chunk in response:
-            chunk_message = chunk.choices[0].delta.content or "" if chunk.choices else ""  # extract the message
-            yield chunk_message
+        try:
+            async for chunk in response:
+                if usage_out is not None and getattr(chunk, "usage", None):
+                    usage_out.append(chunk.usage)  # servers that report usage on the final chunk
+                chunk_message = chunk.choices[0].delta.content or "" if chunk.choices else ""  # extract the message
+                yield chunk_message
+        finally:
+            # closing the HTTP response when the consumer stops early makes the server stop generating
+            await response.close()
 
     def _cons_kwargs(self, messages: list[dict], timeout=3, **extra_kwargs) -> dict:
         kwargs = {
@@ -102,17 +158,21 @@ class OpenAILLM(BaseLLM):
             "max_tokens": self._get_max_tokens(messages),
             "n": 1,
             # "stop": None,  # default it's None and gpt4-v can't have this one
-            "temperature": 0.3,
+            "temperature": self.sampling_temperature,
             "model": self.model,
             "timeout": max(self.config.timeout, timeout),
         }
+        schema = self._response_schema()
+        if schema is not None and "tools" not in extra_kwargs:
+            name = re.sub(r"[^a-zA-Z0-9_-]", "_", schema.get("title", "output"))[:64]
+            kwargs["response_format"] = {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
         if extra_kwargs:
             kwargs.update(extra_kwargs)
         return kwargs
 
     async def _achat_completion(self, messages: list[dict], timeout=3) -> ChatCompletion:
         kwargs = self._cons_kwargs(messages, timeout=timeout)
-        rsp: ChatCompletion = await self.aclient.chat.completions.create(**kwargs)
+        rsp: ChatCompletion = await self._create_completion(**kwargs)
         self._update_costs(rsp.usage)
         return rsp
 
@@ -128,22 +188,56 @@ class OpenAILLM(BaseLLM):
     )
     async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
         """when streaming, print each token in place."""
+        started = time.perf_counter()
         if stream:
-            resp = self._achat_completion_stream(messages, timeout=timeout)
+            self._stream_begin()
+            reported = []
+            resp = self._achat_completion_stream(messages, timeout=timeout, usage_out=reported)
 
             collected_messages = []
-            async for i in resp:
-                log_llm_stream(i)
-                collected_messages.append(i)
+            first_token_at = None
+            try:
+                async for i in resp:
+                    if i and first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    collected_messages.append(i)
+                    if not self._stream_token(i):
+                        break
+            finally:
+                await resp.aclose()
             log_llm_stream("\n")
 
             full_reply_content = "".join(collected_messages)
-            usage = self._calc_usage(messages, full_reply_content)
+            usage = reported[-1] if reported else self._calc_usage(messages, full_reply_content)
             self._update_costs(usage)
+            self._report_usage(usage, started, first_token_at, source="provider" if reported else "tokenizer")
             return full_reply_content
 
         rsp = await self._achat_completion(messages, timeout=timeout)
-        return self.get_choice_text(rsp)
+        text = self.get_choice_text(rsp)
+        if rsp.usage is None:
+            # OpenAI-compatible servers may not report usage
+            usage = self._calc_usage(messages, text)
+            self._update_costs(usage)
+            self._report_usage(usage, started, source="tokenizer")
+        else:
+            self._report_usage(rsp.usage, started)
+        return text
+
+    def _report_usage(
+        self, usage: Optional[CompletionUsage], started: float, first_token_at: float = None, source="provider"
+    ):
+        finished = time.perf_counter()
+        self._report_call_metrics(
+            LLMCallMetrics(
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+                usage_source=source,
+                total_sec=finished - started,
+                ttft_sec=first_token_at - started if first_token_at is not None else None,
+                generation_sec=finished - first_token_at if first_token_at is not None else None,
+            )
+        )
 
     def _func_configs(self, messages: list[dict], timeout=3, **kwargs) -> dict:
         """Note: Keep kwargs consistent with https://platform.openai.com/docs/api-reference/chat/create"""
@@ -266,7 +360,7 @@ class OpenAILLM(BaseLLM):
 
         try:
             usage.prompt_tokens = count_message_tokens(messages, self.model)
-            usage.completion_tokens = count_string_tokens(rsp, self.model)
+            usage.completion_tokens = count_tokens(rsp, self.model)
         except Exception as e:
             logger.warning(f"usage calculation failed: {e}")
 
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : route requests of one model across several backends (e.g. multiple Ollama hosts)
+
+import asyncio
+import time
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+import aiohttp
+from openai import APIConnectionError, APITimeoutError
+
+from metagpt.configs.llm_config import LLMBackendConfig, LLMConfig, LLMType
+from metagpt.logs import logger
+from metagpt.provider.base_llm import BaseLLM, pop_call_metrics, streamed_token_count
+from metagpt.provider.llm_provider_registry import create_llm_instance, register_provider
+
+BACKEND_COOLDOWN_SECS = 30
+# failing over re-runs the request elsewhere: only for backends that could not be reached, not for slow ones
+CONNECTION_ERRORS = (APIConnectionError, aiohttp.ClientConnectionError, ConnectionError)
+TIMEOUT_ERRORS = (APITimeoutError, aiohttp.ServerTimeoutError, asyncio.TimeoutError)
+
+
+class _Backend:
+    """Load and health of one backend, shared by every RouterLLM that uses it."""
+
+    def __init__(self, config: LLMBackendConfig):
+        self.config = config
+        self._semaphores: WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = WeakKeyDictionary()
+        self.in_flight = 0  # running + waiting for a slot
+        self.served = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Slots of the running event loop: an asyncio.Semaphore is bound to the loop it is first awaited in."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.config.max_concurrency)
+        return semaphore
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / max(1, self.config.max_concurrency)
+
+    def serves(self, model: Optional[str]) -> bool:
+        return not self.config.models or model in self.config.models
+
+    def is_up(self, now: float) -> bool:
+        return now >= self.down_until
+
+
+_BACKENDS: dict[str, _Backend] = {}
+
+
+def _shared_backend(config: LLMBackendConfig) -> _Backend:
+    backend = _BACKENDS.get(config.base_url)
+    if backend is not None and backend.config != config:
+        if backend.in_flight:
+            # requests in flight hold its semaphore and counters, a second one would double the url's concurrency
+            raise ValueError(f"Backend {config.base_url} is in use with another configuration: {backend.config}")
+        backend = None
+    if backend is None:
+        backend = _BACKENDS[config.base_url] = _Backend(config)
+    return backend
+
+
+def router_stats() -> dict:
+    """Per backend url: requests in flight, served, connection failures and whether it is cooling down."""
+    now = time.monotonic()
+    return {
+        url: {
+            "in_flight": b.in_flight,
+            "served": b.served,
+            "failures": b.failures,
+            "up": b.is_up(now),
+        }
+        for url, b in _BACKENDS.items()
+    }
+
+
+@register_provider(LLMType.ROUTER)
+class RouterLLM(BaseLLM):
+    """Dispatch each request to the least-loaded live backend serving `config.model`.
+
+    A backend that fails with a connection error is skipped for BACKEND_COOLDOWN_SECS and the
+    request fails over to the next candidate, unless it already streamed tokens. Timeouts are
+    raised, not failed over. Backends are shared process-wide by base_url, so several roles
+    using RouterLLM instances balance against the same load counters.
+    """
+
+    def __init__(self, config: LLMConfig):
+        assert config.backends, "router requires at least one backend"
+        self.config = config
+        self.model = config.model
+        self.backends = [_shared_backend(b) for b in config.backends]
+        self._clients = {
+            b.config.base_url: create_llm_instance(
+                config.model_copy(update={"api_type": b.config.api_type, "base_url": b.config.base_url, "backends": None})
+            )
+            for b in self.backends
+        }
+        self.last_backend: Optional[str] = None
+        self.last_call_stats: dict = {}
+
+    @property
+    def supports_response_schema(self) -> bool:
+        return any(client.supports_response_schema for client in self._clients.values())
+
+    def _candidates(self) -> list[_Backend]:
+        serving = [b for b in self.backends if b.serves(self.model)]
+        if not serving:
+            raise ValueError(f"No backend serves model {self.model}")
+        now = time.monotonic()
+        up = [b for b in serving if b.is_up(now)]
+        # when every backend is cooling down, try them all anyway
+        return sorted(up or serving, key=lambda b: b.load)
+
+    async def _dispatch(self, method: str, *args, **kwargs):
+        last_exc = None
+        for backend in self._candidates():
+            url = backend.config.base_url
+            client = self._clients[url]
+            backend.in_flight += 1
+            waited_from = time.perf_counter()
+            streamed = streamed_token_count()
+            try:
+                async with backend.semaphore:
+                    waited = time.perf_counter() - waited_from
+                    rsp = await getattr(client, method)(*args, **kwargs)
+            except CONNECTION_ERRORS as e:
+                if isinstance(e, TIMEOUT_ERRORS):
+                    raise  # a slow generation, re-running it elsewhere would only add load
+                backend.failures += 1
+                backend.down_until = time.monotonic() + BACKEND_COOLDOWN_SECS
+                if streamed_token_count() != streamed:
+                    raise  # dropped mid-stream: its tokens were already emitted
+                logger.warning(f"Backend {url} failed: {e!r}, failing over")
+                last_exc = e
+                continue
+            finally:
+                backend.in_flight -= 1
+
+            backend.served += 1
+            self.last_backend = url
+            self.last_call_stats = getattr(client, "last_call_stats", {})
+            metrics = pop_call_metrics()
+            if metrics is not None:
+                # waiting for a backend slot counts as queueing
+                metrics.queue_sec = (metrics.queue_sec or 0.0) + waited
+                metrics.total_sec += waited
+                if metrics.ttft_sec is not None:
+                    metrics.ttft_sec += waited
+                self._report_call_metrics(metrics)
+            return rsp
+        raise last_exc
+
+    async def acompletion(self, messages: list[dict], timeout=3):
+        return await self._dispatch("acompletion", messages, timeout=timeout)
+
+    async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
+        return await self._dispatch("acompletion_text", messages, stream=stream, timeout=timeout)
@@ -38,6 +38,8 @@ class ZhiPuAILLM(BaseLLM):
     From now, support glm-3-turbo、glm-4, and also system_prompt.
     """
 
+    sampling_temperature = 0.3
+
     def __init__(self, config: LLMConfig):
         self.config = config
         self.__init_zhipuai()
@@ -50,7 +52,7 @@ class ZhiPuAILLM(BaseLLM):
         self.llm = ZhiPuModelAPI(api_key=self.api_key)
 
     def _const_kwargs(self, messages: list[dict], stream: bool = False) -> dict:
-        kwargs = {"model": self.model, "messages": messages, "stream": stream, "temperature": 0.3}
+        kwargs = {"model": self.model, "messages": messages, "stream": stream, "temperature": self.sampling_temperature}
         return kwargs
 
     def _update_costs(self, usage: dict):
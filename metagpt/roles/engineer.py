@@ -19,15 +19,22 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import re
 from collections import defaultdict
 from pathlib import Path
-from typing import Set
+from typing import Dict, List, Set
 
 from metagpt.actions import Action, WriteCode, WriteCodeReview, WriteTasks
 from metagpt.actions.fix_bug import FixBug
-from metagpt.actions.project_management_an import REFINED_TASK_LIST, TASK_LIST
+from metagpt.actions.project_management_an import (
+    LOGIC_ANALYSIS,
+    REFINED_LOGIC_ANALYSIS,
+    REFINED_TASK_LIST,
+    TASK_LIST,
+)
 from metagpt.actions.summarize_code import SummarizeCode
 from metagpt.actions.write_code_plan_and_change_an import WriteCodePlanAndChange
 from metagpt.const import (
@@ -70,6 +77,7 @@ class Engineer(Role):
         constraints (str): Constraints for the engineer.
         n_borg (int): Number of borgs.
         use_code_review (bool): Whether to use code review.
+        code_concurrency (int): How many files to write at once; files are still saved in task order.
     """
 
     name: str = "Alex"
@@ -81,6 +89,7 @@ class Engineer(Role):
     )
     n_borg: int = 1
     use_code_review: bool = False
+    code_concurrency: int = 1
     code_todos: list = []
     summarize_todos: list = []
     next_todo_action: str = ""
@@ -101,6 +110,8 @@ class Engineer(Role):
         return m.get(TASK_LIST.key) or m.get(REFINED_TASK_LIST.key)
 
     async def _act_sp_with_cr(self, review=False) -> Set[str]:
+        if self.code_concurrency > 1 and len(self.code_todos) > 1:
+            return await self._act_parallel_with_cr(review=review)
         changed_files = set()
         for todo in self.code_todos:
             """
@@ -116,28 +127,101 @@ class Engineer(Role):
                 action = WriteCodeReview(i_context=coding_context, context=self.context, llm=self.llm)
                 self._init_action(action)
                 coding_context = await action.run()
-
-            dependencies = {coding_context.design_doc.root_relative_path, coding_context.task_doc.root_relative_path}
-            if self.config.inc:
-                dependencies.add(os.path.join(CODE_PLAN_AND_CHANGE_FILE_REPO, CODE_PLAN_AND_CHANGE_FILENAME))
-            await self.project_repo.srcs.save(
-                filename=coding_context.filename,
-                dependencies=dependencies,
-                content=coding_context.code_doc.content,
-            )
-            msg = Message(
-                content=coding_context.model_dump_json(),
-                instruct_content=coding_context,
-                role=self.profile,
-                cause_by=WriteCode,
-            )
-            self.rc.memory.add(msg)
-
+            await self._commit_coding_context(coding_context)
             changed_files.add(coding_context.code_doc.filename)
         if not changed_files:
             logger.info("Nothing has changed.")
         return changed_files
 
+    async def _act_parallel_with_cr(self, review=False) -> Set[str]:
+        """Write independent files concurrently, at most `code_concurrency` at once.
+
+        A file waits for the files it depends on (see `_code_dependencies`). Its code context is the source files as
+        they were before this round plus the new code of its dependencies, so the result does not depend on which
+        sibling finishes first. Files are saved and added to memory in task order.
+        """
+        filenames = [todo.i_context.filename for todo in self.code_todos]
+        dependencies = await self._code_dependencies(self.code_todos)
+        base_snapshot = {}
+        for filename in self.project_repo.srcs.all_files:
+            doc = await self.project_repo.srcs.get(filename)
+            if doc:
+                base_snapshot[str(filename)] = doc.content
+        written: Dict[str, asyncio.Future] = {f: asyncio.get_running_loop().create_future() for f in filenames}
+        semaphore = asyncio.Semaphore(self.code_concurrency)
+
+        async def write(todo: WriteCode) -> CodingContext:
+            filename = todo.i_context.filename
+            snapshot = dict(base_snapshot)
+            for dep in dependencies[filename]:
+                snapshot[dep] = (await written[dep]).code_doc.content
+            async with semaphore:
+                todo.code_snapshot = snapshot
+                coding_context = await todo.run()
+                if review:
+                    action = WriteCodeReview(i_context=coding_context, context=self.context, llm=self.llm)
+                    action.code_snapshot = snapshot
+                    self._init_action(action)
+                    coding_context = await action.run()
+            written[filename].set_result(coding_context)
+            return coding_context
+
+        logger.info(f"Writing {len(filenames)} files, {self.code_concurrency} at a time, dependencies: {dependencies}")
+        tasks = [asyncio.create_task(write(todo)) for todo in self.code_todos]
+        changed_files = set()
+        try:
+            for task in tasks:
+                coding_context = await task
+                await self._commit_coding_context(coding_context)
+                changed_files.add(coding_context.code_doc.filename)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return changed_files
+
+    async def _code_dependencies(self, todos: List[WriteCode]) -> Dict[str, Set[str]]:
+        """Map each file to the earlier files of `todos` it depends on.
+
+        A file depends on an earlier one when its "Logic Analysis" entry in the task document mentions the earlier
+        file's module name (e.g. "from game import Game"), or when the dependency file records it. The task list is
+        ordered by dependency, so edges only point backwards and the graph is acyclic.
+        """
+        filenames = [todo.i_context.filename for todo in todos]
+        dependency_file = await self.git_repo.get_dependency()
+        graph = {}
+        for idx, todo in enumerate(todos):
+            filename = filenames[idx]
+            earlier = filenames[:idx]
+            coding_context = CodingContext.loads(todo.i_context.content)
+            analysis = ""
+            if coding_context.task_doc and coding_context.task_doc.content:
+                m = json.loads(coding_context.task_doc.content)
+                for item in m.get(LOGIC_ANALYSIS.key) or m.get(REFINED_LOGIC_ANALYSIS.key) or []:
+                    if len(item) > 1 and item[0] == filename:
+                        analysis += " ".join(item[1:])
+            deps = {f for f in earlier if re.search(rf"\b{re.escape(Path(f).stem)}\b", analysis)}
+            recorded = await dependency_file.get(self.project_repo.src_relative_path / filename)
+            deps |= {f for f in earlier if str(self.project_repo.src_relative_path / f) in recorded}
+            graph[filename] = deps
+        return graph
+
+    async def _commit_coding_context(self, coding_context: CodingContext):
+        dependencies = {coding_context.design_doc.root_relative_path, coding_context.task_doc.root_relative_path}
+        if self.config.inc:
+            dependencies.add(os.path.join(CODE_PLAN_AND_CHANGE_FILE_REPO, CODE_PLAN_AND_CHANGE_FILENAME))
+        await self.project_repo.srcs.save(
+            filename=coding_context.filename,
+            dependencies=dependencies,
+            content=coding_context.code_doc.content,
+        )
+        msg = Message(
+            content=coding_context.model_dump_json(),
+            instruct_content=coding_context,
+            role=self.profile,
+            cause_by=WriteCode,
+        )
+        self.rc.memory.add(msg)
+
     async def _act(self) -> Message | None:
         """Determines the mode of action based on whether code review is used."""
         if self.rc.todo is None:
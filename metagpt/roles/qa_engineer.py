@@ -14,6 +14,9 @@
 @Modified By: mashenquan, 2023-12-5. Enhance the workflow to navigate to WriteCode or QaEngineer based on the results
     of SummarizeCode.
 """
+import asyncio
+from collections import defaultdict
+from typing import Optional
 
 from metagpt.actions import DebugError, RunCode, WriteTest
 from metagpt.actions.summarize_code import SummarizeCode
@@ -91,16 +94,16 @@ class QaEngineer(Role):
 
         logger.info(f"Done {str(self.project_repo.tests.workdir)} generating.")
 
-    async def _run_code(self, msg):
+    async def _run_code(self, msg) -> Optional[Message]:
         run_code_context = RunCodeContext.loads(msg.content)
         src_doc = await self.project_repo.with_src_path(self.context.src_workspace).srcs.get(
             run_code_context.code_filename
         )
         if not src_doc:
-            return
+            return None
         test_doc = await self.project_repo.tests.get(run_code_context.test_filename)
         if not test_doc:
-            return
+            return None
         run_code_context.code = src_doc.content
         run_code_context.test_code = test_doc.content
         result = await RunCode(i_context=run_code_context, context=self.context, llm=self.llm).run()
@@ -115,31 +118,53 @@ class QaEngineer(Role):
         # the recipient might be Engineer or myself
         recipient = parse_recipient(result.summary)
         mappings = {"Engineer": "Alex", "QaEngineer": "Edward"}
-        self.publish_message(
-            Message(
-                content=run_code_context.model_dump_json(),
-                role=self.profile,
-                cause_by=RunCode,
-                sent_from=self,
-                send_to=mappings.get(recipient, MESSAGE_ROUTE_TO_NONE),
-            )
+        return Message(
+            content=run_code_context.model_dump_json(),
+            role=self.profile,
+            cause_by=RunCode,
+            sent_from=self,
+            send_to=mappings.get(recipient, MESSAGE_ROUTE_TO_NONE),
         )
 
-    async def _debug_error(self, msg):
+    async def _debug_error(self, msg) -> Message:
         run_code_context = RunCodeContext.loads(msg.content)
         code = await DebugError(i_context=run_code_context, context=self.context, llm=self.llm).run()
         await self.project_repo.tests.save(filename=run_code_context.test_filename, content=code)
         run_code_context.output = None
-        self.publish_message(
-            Message(
-                content=run_code_context.model_dump_json(),
-                role=self.profile,
-                cause_by=DebugError,
-                sent_from=self,
-                send_to=self,
-            )
+        return Message(
+            content=run_code_context.model_dump_json(),
+            role=self.profile,
+            cause_by=DebugError,
+            sent_from=self,
+            send_to=self,
         )
 
+    async def _run_and_debug(self, msgs: list) -> None:
+        """Run written tests and debug failed ones, `config.run_code.concurrency` at a time.
+
+        Messages about the same test file are handled in order; different test files are independent and run
+        concurrently. Results are published in the order of `msgs`.
+        """
+        test_filters = any_to_str_set({WriteTest, DebugError})
+        semaphore = asyncio.Semaphore(self.config.run_code.concurrency)
+        by_test_file = defaultdict(list)
+        for idx, msg in enumerate(msgs):
+            by_test_file[RunCodeContext.loads(msg.content).test_filename].append(idx)
+        results = [None] * len(msgs)
+
+        async def handle(indices):
+            for idx in indices:
+                msg = msgs[idx]
+                # I wrote or debugged my test code, time to run it; or I ran it, time to fix bugs, if any
+                handler = self._run_code if msg.cause_by in test_filters else self._debug_error
+                async with semaphore:
+                    results[idx] = await handler(msg)
+
+        await asyncio.gather(*(handle(indices) for indices in by_test_file.values()))
+        for result in results:
+            if result:
+                self.publish_message(result)
+
     async def _act(self) -> Message:
         if self.test_round > self.test_round_allowed:
             result_msg = Message(
@@ -154,18 +179,16 @@ class QaEngineer(Role):
         code_filters = any_to_str_set({SummarizeCode})
         test_filters = any_to_str_set({WriteTest, DebugError})
         run_filters = any_to_str_set({RunCode})
+        test_msgs = []
         for msg in self.rc.news:
             # Decide what to do based on observed msg type, currently defined by human,
             # might potentially be moved to _think, that is, let the agent decides for itself
             if msg.cause_by in code_filters:
                 # engineer wrote a code, time to write a test for it
                 await self._write_test(msg)
-            elif msg.cause_by in test_filters:
-                # I wrote or debugged my test code, time to run it
-                await self._run_code(msg)
-            elif msg.cause_by in run_filters:
-                # I ran my test code, time to fix bugs, if any
-                await self._debug_error(msg)
+            elif msg.cause_by in test_filters or msg.cause_by in run_filters:
+                test_msgs.append(msg)
+        await self._run_and_debug(test_msgs)
         self.test_round += 1
         return Message(
             content=f"Round {self.test_round} of tests done",
@@ -23,7 +23,7 @@ from abc import ABC
 from asyncio import Queue, QueueEmpty, wait_for
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Type, TypeVar, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type, TypeVar, Union
 
 from pydantic import (
     BaseModel,
@@ -238,7 +238,7 @@ class Message(BaseModel):
         ic_dict = None
         if ic:
             # compatible with custom-defined ActionOutput
-            schema = ic.model_json_schema()
+            schema = import_class("get_outcls_schema", "metagpt.actions.action_outcls_registry")(type(ic))
             ic_type = str(type(ic))
             if "<class 'metagpt.actions.action_node" in ic_type:
                 # instruct_content from AutoNode.create_model_class, for now, it's single level structure.
@@ -530,6 +530,11 @@ class MessageQueue(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     _queue: Queue = PrivateAttr(default_factory=Queue)
+    _on_push: Optional[Callable[[Message], None]] = PrivateAttr(default=None)
+
+    def set_push_listener(self, listener: Optional[Callable[[Message], None]]):
+        """Call `listener(msg)` after every push, e.g. to wake the owning role; None removes it."""
+        self._on_push = listener
 
     def pop(self) -> Message | None:
         """Pop one message from the queue."""
@@ -554,6 +559,8 @@ class MessageQueue(BaseModel):
     def push(self, msg: Message):
         """Push a message into the queue."""
         self._queue.put_nowait(msg)
+        if self._on_push:
+            self._on_push(msg)
 
     def empty(self):
         """Return true if the queue is empty."""
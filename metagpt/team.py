@@ -52,8 +52,20 @@ class Team:
             return None
 
     async def run(self) -> List[Message]:
-        """Run full team workflow for max_round turns."""
+        """Run full team workflow until the env is idle, at most max_round turns."""
         logger.info("🚀 Team starting workflow...")
+
+        if hasattr(self.env, "run_until_idle"):
+            # Event-driven: only roles with new messages run, and the run ends once nobody has any
+            outputs = []
+            try:
+                await self.env.run_until_idle(max_round=self.max_round, outputs=outputs)
+            except Exception:
+                # keep what was produced before the failure, as the round loop below does
+                logger.exception(f"❌ Team run failed after {len(outputs)} messages")
+            logger.info("🏁 Team finished.")
+            return outputs
+
         outputs = []
 
         for i in range(self.max_round):
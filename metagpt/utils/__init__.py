@@ -12,6 +12,8 @@ from metagpt.utils.token_counter import (
     TOKEN_COSTS,
     count_message_tokens,
     count_string_tokens,
+    count_tokens,
+    count_tokens_batch,
 )
 
 
@@ -21,4 +23,6 @@ __all__ = [
     "TOKEN_COSTS",
     "count_message_tokens",
     "count_string_tokens",
+    "count_tokens",
+    "count_tokens_batch",
 ]
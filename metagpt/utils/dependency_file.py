@@ -8,10 +8,13 @@
 """
 from __future__ import annotations
 
+import asyncio
 import json
+import os
 import re
+from collections import defaultdict
 from pathlib import Path
-from typing import Set
+from typing import DefaultDict, Dict, List, Optional, Set, Tuple
 
 import aiofiles
 
@@ -22,84 +25,181 @@ from metagpt.utils.exceptions import handle_exception
 class DependencyFile:
     """A class representing a DependencyFile for managing dependencies.
 
+    The dependencies stay resident after the first load, together with a reverse index answering which files depend
+    on a given one. Updates mark the graph dirty and are written back, atomically, `flush_delay` seconds after the
+    last one, so saving a batch of files rewrites `.dependencies.json` once. The file is read again only when it
+    was changed by someone else.
+
     :param workdir: The working directory path for the DependencyFile.
+    :param flush_delay: Seconds to wait for further updates before persisting.
     """
 
-    def __init__(self, workdir: Path | str):
+    def __init__(self, workdir: Path | str, flush_delay: float = 0.5):
         """Initialize a DependencyFile instance.
 
         :param workdir: The working directory path for the DependencyFile.
+        :param flush_delay: Seconds to wait for further updates before persisting.
         """
-        self._dependencies = {}
+        self._dependencies: Dict[str, List[str]] = {}
+        self._dependents: DefaultDict[str, Set[str]] = defaultdict(set)
         self._filename = Path(workdir) / ".dependencies.json"
+        self.flush_delay = flush_delay
+        self._loaded = False
+        self._dirty = False
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self._filename.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _reindex(self):
+        self._dependents = defaultdict(set)
+        for key, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                self._dependents[dependency].add(key)
 
     async def load(self):
         """Load dependencies from the file asynchronously."""
-        if not self._filename.exists():
+        self._loaded = True
+        stamp = self._file_stamp()
+        if stamp is None:
             return
         json_data = await aread(self._filename)
         json_data = re.sub(r"\\+", "/", json_data)  # Compatible with windows path
         self._dependencies = json.loads(json_data)
+        self._reindex()
+        self._stamp = stamp
+        self._dirty = False
+
+    async def _ensure_loaded(self):
+        # Pending updates win over the file; otherwise pick up changes made behind our back.
+        if not self._loaded or (not self._dirty and self._file_stamp() != self._stamp):
+            await self.load()
+
+    def _dump(self) -> str:
+        self._dirty = False
+        return json.dumps(self._dependencies)
+
+    def _replace(self, tmp_filename: Path):
+        os.replace(tmp_filename, self._filename)
+        self._stamp = self._file_stamp()
 
     @handle_exception
     async def save(self):
         """Save dependencies to the file asynchronously."""
-        data = json.dumps(self._dependencies)
-        async with aiofiles.open(str(self._filename), mode="w") as writer:
+        data = self._dump()
+        tmp_filename = self._filename.with_name(self._filename.name + ".tmp")
+        async with aiofiles.open(str(tmp_filename), mode="w") as writer:
             await writer.write(data)
+        self._replace(tmp_filename)
+
+    @handle_exception
+    def flush(self):
+        """Write pending updates now, synchronously."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self._dirty:
+            return
+        data = self._dump()
+        tmp_filename = self._filename.with_name(self._filename.name + ".tmp")
+        with open(str(tmp_filename), mode="w") as writer:
+            writer.write(data)
+        self._replace(tmp_filename)
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_delay)
+        except asyncio.CancelledError:
+            # the loop is shutting down (flush() clears the task before cancelling it)
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+                self.flush()
+            raise
+        self._flush_task = None
+        if self._dirty:
+            await self.save()
+
+    def _schedule_flush(self):
+        self._dirty = True
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def _key(self, filename: Path | str) -> str:
+        try:
+            key = Path(filename).relative_to(self._filename.parent).as_posix()
+        except ValueError:
+            key = filename
+        return str(key)
 
     async def update(self, filename: Path | str, dependencies: Set[Path | str], persist=True):
         """Update dependencies for a file asynchronously.
 
         :param filename: The filename or path.
         :param dependencies: The set of dependencies.
-        :param persist: Whether to persist the changes immediately.
+        :param persist: Whether to persist the changes; they are written after `flush_delay`.
         """
         if persist:
-            await self.load()
-
-        root = self._filename.parent
-        try:
-            key = Path(filename).relative_to(root).as_posix()
-        except ValueError:
-            key = filename
-        key = str(key)
+            await self._ensure_loaded()
+
+        key = self._key(filename)
+        for dependency in self._dependencies.get(key, []):
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
         if dependencies:
-            relative_paths = []
-            for i in dependencies:
-                try:
-                    s = str(Path(i).relative_to(root).as_posix())
-                except ValueError:
-                    s = str(i)
-                relative_paths.append(s)
-
+            relative_paths = [self._key(i) for i in dependencies]
             self._dependencies[key] = relative_paths
+            for dependency in relative_paths:
+                self._dependents[dependency].add(key)
         elif key in self._dependencies:
             del self._dependencies[key]
+        else:
+            return
 
         if persist:
-            await self.save()
+            self._schedule_flush()
+        else:
+            self._dirty = True
 
     async def get(self, filename: Path | str, persist=True):
         """Get dependencies for a file asynchronously.
 
         :param filename: The filename or path.
-        :param persist: Whether to load dependencies from the file immediately.
+        :param persist: Whether to pick up changes made to the file by others.
         :return: A set of dependencies.
         """
         if persist:
-            await self.load()
+            await self._ensure_loaded()
+        return set(self._dependencies.get(self._key(filename), {}))
 
-        root = self._filename.parent
-        try:
-            key = Path(filename).relative_to(root).as_posix()
-        except ValueError:
-            key = filename
-        return set(self._dependencies.get(str(key), {}))
+    async def get_dependents(self, filename: Path | str, persist=True) -> Set[str]:
+        """Get the files that depend on a file.
+
+        :param filename: The filename or path.
+        :param persist: Whether to pick up changes made to the file by others.
+        :return: A set of dependent files, relative to the working directory.
+        """
+        if persist:
+            await self._ensure_loaded()
+        return set(self._dependents.get(self._key(filename), ()))
 
     def delete_file(self):
         """Delete the dependency file."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
         self._filename.unlink(missing_ok=True)
+        self._dependencies = {}
+        self._dependents = defaultdict(set)
+        self._dirty = False
+        self._stamp = None
 
     @property
     def exists(self):
@@ -10,9 +10,12 @@ from __future__ import annotations
 
 import json
 import os
+import stat
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 import aiofiles
 
@@ -22,6 +25,80 @@ from metagpt.utils.common import aread
 from metagpt.utils.json_to_markdown import json_to_markdown
 
 
+class SourceCache:
+    """Contents of files read or written through FileRepository, keyed by absolute path.
+
+    An entry is valid while the file keeps the (mtime_ns, size) it was cached with, so a file changed behind the
+    repository's back is read again. `FileRepository.save` refreshes the entry and `delete` drops it. The least recently
+    used entries are evicted once the cached contents exceed `max_chars`.
+    """
+
+    def __init__(self, max_chars: int = 64 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self.context_bytes: Dict[str, int] = {}
+        self._entries: OrderedDict[str, Tuple[Tuple[int, int], str]] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(st: os.stat_result) -> Tuple[int, int]:
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, pathname: Path, st: os.stat_result) -> Optional[str]:
+        key = str(pathname)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._stamp(st):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, pathname: Path, st: os.stat_result, content: str):
+        key = str(pathname)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= len(old[1])
+            self._entries[key] = (self._stamp(st), content)
+            self._chars += len(content)
+            while self._chars > self.max_chars and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def invalidate(self, pathname: Path):
+        with self._lock:
+            old = self._entries.pop(str(pathname), None)
+            if old is not None:
+                self._chars -= len(old[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+            self.context_bytes.clear()
+            self.hits = self.misses = 0
+
+    def record_context(self, filename: str, nbytes: int):
+        """Remember how many bytes of source context were assembled to generate `filename`."""
+        self.context_bytes[filename] = nbytes
+
+    def stats(self) -> Dict:
+        return {
+            "files": len(self._entries),
+            "chars": self._chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "context_bytes": dict(self.context_bytes),
+        }
+
+
+source_cache = SourceCache()
+
+
 class FileRepository:
     """A class representing a FileRepository associated with a Git repository.
 
@@ -57,6 +134,8 @@ class FileRepository:
         content = content if content else ""  # avoid `argument must be str, not None` to make it continue
         async with aiofiles.open(str(pathname), mode="w") as writer:
             await writer.write(content)
+        source_cache.put(pathname, pathname.stat(), content)
+        self._git_repo.record_change(pathname)
         logger.info(f"save to: {str(pathname)}")
 
         if dependencies is not None:
@@ -76,6 +155,16 @@ class FileRepository:
         dependency_file = await self._git_repo.get_dependency()
         return await dependency_file.get(pathname)
 
+    async def get_dependents(self, filename: Path | str) -> Set[str]:
+        """Get the files that depend on a file.
+
+        :param filename: The filename or path within the repository.
+        :return: Set of dependent filenames or paths, relative to the Git repository.
+        """
+        pathname = self.workdir / filename
+        dependency_file = await self._git_repo.get_dependency()
+        return await dependency_file.get_dependents(pathname)
+
     async def get_changed_dependency(self, filename: Path | str) -> Set[str]:
         """Get the dependencies of a file that have changed.
 
@@ -99,11 +188,17 @@ class FileRepository:
         """
         doc = Document(root_path=str(self.root_path), filename=str(filename))
         path_name = self.workdir / filename
-        if not path_name.exists():
+        try:
+            st = path_name.stat()
+        except (FileNotFoundError, NotADirectoryError):
             return None
-        if not path_name.is_file():
+        if not stat.S_ISREG(st.st_mode):
             return None
-        doc.content = await aread(path_name)
+        content = source_cache.get(path_name, st)
+        if content is None:
+            content = await aread(path_name)
+            source_cache.put(path_name, st, content)
+        doc.content = content
         return doc
 
     async def get_all(self, filter_ignored=True) -> List[Document]:
@@ -234,6 +329,8 @@ class FileRepository:
         if not pathname.exists():
             return
         pathname.unlink(missing_ok=True)
+        source_cache.invalidate(pathname)
+        self._git_repo.record_change(pathname)
 
         dependency_file = await self._git_repo.get_dependency()
         await dependency_file.update(filename=pathname, dependencies=None)
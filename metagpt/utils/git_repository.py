@@ -8,10 +8,12 @@
 """
 from __future__ import annotations
 
+import hashlib
+import os
 import shutil
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
 from git.repo import Repo
 from git.repo.fun import is_git_dir
@@ -36,6 +38,175 @@ class ChangeType(Enum):
     UNTRACTED = "U"  # File is untracked (not added to version control)
 
 
+class GitignoreMatcher:
+    """The rules of one .gitignore file, with memoized results.
+
+    Wraps `gitignore_parser.parse_gitignore`, so patterns keep their anchoring to the directory holding the
+    .gitignore. Pass directories with a trailing "/" for directory-only negations to apply. A missing file ignores
+    nothing.
+    """
+
+    def __init__(self, full_path: Path | str):
+        self._match = None
+        self._cache: Dict[str, bool] = {}
+        if os.path.exists(full_path):
+            self._match = parse_gitignore(full_path, base_dir=os.path.dirname(os.path.abspath(full_path)))
+
+    def __call__(self, file_path: Path | str) -> bool:
+        file_path = str(file_path)
+        ignored = self._cache.get(file_path)
+        if ignored is None:
+            ignored = bool(self._match and self._match(file_path))
+            self._cache[file_path] = ignored
+        return ignored
+
+
+class ChangeTracker:
+    """Keep `GitRepository.changed_files` current without running a full `git status` per query.
+
+    A full status is taken on first use and again after the index changes. Afterwards, like git's untracked cache,
+    only directories whose mtime moved are listed again, and like its index stat cache, only tracked files are
+    stat'ed. Files written through FileRepository (see `record`), added or removed in a listed directory, or tracked
+    with a new (mtime_ns, size) are classified again, tracked ones by comparing their blob hash with the index entry.
+    """
+
+    def __init__(self, git_repo: GitRepository):
+        self._git_repo = git_repo
+        self._stale = True
+        self._changed: Dict[str, ChangeType] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._tracked: Dict[str, bytes] = {}
+        self._tracked_dirs: Set[str] = set()
+        self._dirs: Dict[str, int] = {}
+        self._entries: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self._recorded: Set[str] = set()
+
+    def invalidate(self):
+        self._stale = True
+
+    def record(self, pathname: Path | str):
+        try:
+            self._recorded.add(Path(pathname).relative_to(self._git_repo.workdir).as_posix())
+        except ValueError:
+            pass
+
+    def _abspath(self, rel_path: str) -> str:
+        workdir = str(self._git_repo.workdir)
+        return os.path.join(workdir, rel_path) if rel_path else workdir
+
+    def _list(self, rel_dir: str, changes: Set[str]):
+        """List `rel_dir` and any directory new below it, adding files that appeared or vanished to `changes`."""
+        is_ignored = self._git_repo.is_ignored
+        pending = [rel_dir]
+        while pending:
+            rel = pending.pop()
+            directory = self._abspath(rel)
+            try:
+                # stat before listing, so that an entry racing with the listing moves the mtime for next time
+                mtime = os.stat(directory).st_mtime_ns
+                entries = list(os.scandir(directory))
+            except OSError:
+                self._forget(rel, changes)
+                continue
+            prefix = rel + "/" if rel else ""
+            files, subdirs = set(), set()
+            for entry in entries:
+                rel_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if rel_path == ".git":
+                        continue
+                    if rel_path in self._tracked_dirs or not is_ignored(entry.path + "/"):
+                        subdirs.add(rel_path)
+                elif rel_path in self._tracked or not is_ignored(entry.path):
+                    files.add(rel_path)
+            old_files, old_subdirs = self._entries.get(rel, (set(), set()))
+            changes.update(files ^ old_files)
+            for subdir in old_subdirs - subdirs:
+                self._forget(subdir, changes)
+            pending.extend(subdirs - old_subdirs)  # known ones are checked against their own mtime
+            self._dirs[rel] = mtime
+            self._entries[rel] = (files, subdirs)
+
+    def _forget(self, rel_dir: str, changes: Set[str]):
+        """Drop a directory that is gone or now ignored, adding the files it held to `changes`."""
+        self._dirs.pop(rel_dir, None)
+        files, subdirs = self._entries.pop(rel_dir, (set(), set()))
+        changes.update(files)
+        for subdir in subdirs:
+            self._forget(subdir, changes)
+
+    def _stat_tracked(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for rel_path in self._tracked:
+            try:
+                st = os.lstat(self._abspath(rel_path))
+            except OSError:
+                continue
+            stats[rel_path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def _refresh(self):
+        repository = self._git_repo._repository
+        self._tracked = {path: entry.binsha for (path, _), entry in repository.index.entries.items()}
+        self._tracked_dirs = {parent.as_posix() for path in self._tracked for parent in Path(path).parents}
+        # stat before asking git, so that a change racing with the status is seen as a stat change next time
+        self._dirs, self._entries = {}, {}
+        self._list("", set())
+        self._stats = self._stat_tracked()
+        files = {i: ChangeType.UNTRACTED for i in repository.untracked_files}
+        files.update({f.a_path: ChangeType(f.change_type) for f in repository.index.diff(None)})
+        self._changed = files
+        self._recorded.clear()
+        self._stale = False
+
+    def _blob_sha(self, rel_path: str) -> Optional[bytes]:
+        try:
+            data = (self._git_repo.workdir / rel_path).read_bytes()
+        except OSError:
+            return None
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).digest()
+
+    def _classify(self, rel_path: str) -> Optional[ChangeType]:
+        pathname = self._abspath(rel_path)
+        exists = os.path.lexists(pathname)
+        if rel_path in self._tracked:
+            if not exists:
+                return ChangeType.DELETED
+            return None if self._blob_sha(rel_path) == self._tracked[rel_path] else ChangeType.MODIFIED
+        if not exists or self._git_repo.is_ignored(pathname):
+            return None
+        parent = rel_path.rpartition("/")[0]
+        return ChangeType.UNTRACTED if parent in self._dirs else None
+
+    @property
+    def changed_files(self) -> Dict[str, ChangeType]:
+        if self._stale:
+            self._refresh()
+            return dict(self._changed)
+        changes = self._recorded
+        self._recorded = set()
+        for rel_dir, mtime in list(self._dirs.items()):
+            if rel_dir not in self._dirs:  # forgotten along with its parent
+                continue
+            try:
+                moved = os.stat(self._abspath(rel_dir)).st_mtime_ns != mtime
+            except OSError:
+                self._forget(rel_dir, changes)
+                continue
+            if moved:
+                self._list(rel_dir, changes)
+        stats = self._stat_tracked()
+        changes.update(p for p in self._tracked if stats.get(p) != self._stats.get(p))
+        self._stats = stats
+        for rel_path in changes:
+            change = self._classify(rel_path)
+            if change is None:
+                self._changed.pop(rel_path, None)
+            else:
+                self._changed[rel_path] = change
+        return dict(self._changed)
+
+
 class GitRepository:
     """A class representing a Git repository.
 
@@ -55,6 +226,7 @@ class GitRepository:
         self._repository = None
         self._dependency = None
         self._gitignore_rules = None
+        self._tracker = ChangeTracker(self)
         if local_path:
             self.open(local_path=local_path, auto_init=auto_init)
 
@@ -67,7 +239,8 @@ class GitRepository:
         local_path = Path(local_path)
         if self.is_git_dir(local_path):
             self._repository = Repo(local_path)
-            self._gitignore_rules = parse_gitignore(full_path=str(local_path / ".gitignore"))
+            self._gitignore_rules = GitignoreMatcher(full_path=local_path / ".gitignore")
+            self._tracker.invalidate()
             return
         if not auto_init:
             return
@@ -87,7 +260,8 @@ class GitRepository:
             writer.write("\n".join(ignores))
         self._repository.index.add([".gitignore"])
         self._repository.index.commit("Add .gitignore")
-        self._gitignore_rules = parse_gitignore(full_path=gitignore_filename)
+        self._gitignore_rules = GitignoreMatcher(full_path=gitignore_filename)
+        self._tracker.invalidate()
 
     def add_change(self, files: Dict):
         """Add or remove files from the staging area based on the provided changes.
@@ -99,6 +273,7 @@ class GitRepository:
 
         for k, v in files.items():
             self._repository.index.remove(k) if v is ChangeType.DELETED else self._repository.index.add([k])
+        self._tracker.invalidate()
 
     def commit(self, comments):
         """Commit the staged changes with the given comments.
@@ -107,6 +282,7 @@ class GitRepository:
         """
         if self.is_valid:
             self._repository.index.commit(comments)
+            self._tracker.invalidate()
 
     def delete_repository(self):
         """Delete the entire repository directory."""
@@ -122,10 +298,21 @@ class GitRepository:
 
         :return: A dictionary where keys are file paths and values are change types.
         """
-        files = {i: ChangeType.UNTRACTED for i in self._repository.untracked_files}
-        changed_files = {f.a_path: ChangeType(f.change_type) for f in self._repository.index.diff(None)}
-        files.update(changed_files)
-        return files
+        return self._tracker.changed_files
+
+    def record_change(self, pathname: Path | str):
+        """Note that a file was written or deleted in-process, so that the next `changed_files` re-checks it.
+
+        :param pathname: The absolute path of the file.
+        """
+        self._tracker.record(pathname)
+
+    def is_ignored(self, pathname: Path | str) -> bool:
+        """Check whether the .gitignore rules exclude a path.
+
+        :param pathname: The absolute path to check.
+        """
+        return bool(self._gitignore_rules and self._gitignore_rules(str(pathname)))
 
     @staticmethod
     def is_git_dir(local_path):
@@ -169,6 +356,8 @@ class GitRepository:
 
         :param comments: Comments for the archive commit.
         """
+        if self._dependency:
+            self._dependency.flush()
         logger.info(f"Archive: {list(self.changed_files.keys())}")
         self.add_change(self.changed_files)
         self.commit(comments)
@@ -255,15 +444,8 @@ class GitRepository:
             directory_path = Path(self.workdir) / relative_path
             if not directory_path.exists():
                 return []
-            for file_path in directory_path.iterdir():
-                if file_path.is_file():
-                    rpath = file_path.relative_to(root_relative_path)
-                    files.append(str(rpath))
-                else:
-                    subfolder_files = self.get_files(
-                        relative_path=file_path, root_relative_path=root_relative_path, filter_ignored=False
-                    )
-                    files.extend(subfolder_files)
+            root = str(root_relative_path)
+            self._collect_files(str(directory_path), os.path.relpath(directory_path, root), files)
         except Exception as e:
             logger.error(f"Error: {e}")
         if not filter_ignored:
@@ -271,6 +453,16 @@ class GitRepository:
         filtered_files = self.filter_gitignore(filenames=files, root_relative_path=root_relative_path)
         return filtered_files
 
+    @staticmethod
+    def _collect_files(directory: str, prefix: str, files: List[str]):
+        """Append the files under `directory`, depth first in directory order, as paths under `prefix`."""
+        for entry in os.scandir(directory):
+            rel_path = entry.name if prefix == "." else os.path.join(prefix, entry.name)
+            if entry.is_file():
+                files.append(rel_path)
+            elif entry.is_dir():
+                GitRepository._collect_files(entry.path, rel_path, files)
+
     def filter_gitignore(self, filenames: List[str], root_relative_path: Path | str = None) -> List[str]:
         """
         Filter a list of filenames based on .gitignore rules.
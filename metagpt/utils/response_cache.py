@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : response_cache.py
+@Desc    : Content-addressed cache of LLM text responses, enabled per `LLMConfig.cache`.
+    A request is keyed by (provider, model, normalized messages, sampling params, sample id); lookups go
+    through an in-memory LRU tier and then an optional on-disk SQLite tier. Requests sampled with
+    temperature > 0 are only cached under a sample id (`metagpt.provider.base_llm.cache_sample`).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.logs import logger
+
+SAMPLING_PARAMS = (
+    "max_token",
+    "temperature",
+    "top_p",
+    "top_k",
+    "repetition_penalty",
+    "stop",
+    "presence_penalty",
+    "frequency_penalty",
+    "best_of",
+    "n",
+)
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep only role/content and strip surrounding whitespace of text contents."""
+    normalized = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, str):
+            content = content.strip()
+        normalized.append({"role": m.get("role"), "content": content})
+    return normalized
+
+
+def make_cache_key(provider: str, model: Optional[str], messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    payload = {
+        "provider": provider,
+        "model": model,
+        "messages": normalize_messages(messages),
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Storage tier of a ResponseCache. Values are stored together with their creation time."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return (value, created_at) or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: str, created_at: float):
+        """Store value; may evict other entries"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Drop one entry if present"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop all entries"""
+
+    def close(self):
+        pass
+
+
+class MemoryLRUBackend(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key: str, value: str, created_at: float):
+        with self._lock:
+            self._data[key] = (value, created_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend(CacheBackend):
+    """Single-file disk tier; evicts least recently accessed entries once `max_size_bytes` is exceeded."""
+
+    def __init__(self, path: str | Path, max_size_bytes: int = 512 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def set(self, key: str, value: str, created_at: float):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, created_at, time.time()),
+            )
+            self._size += size - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_size_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+                if self._size <= self.max_size_bytes:
+                    return
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= row[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Tiered response cache: lookups go front to back, hits are promoted to the earlier tiers."""
+
+    def __init__(self, tiers: List[CacheBackend], ttl: Optional[float] = None):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits = [0] * len(tiers)
+
+    @classmethod
+    def from_config(cls, config: LLMConfig) -> "ResponseCache":
+        tiers: List[CacheBackend] = [MemoryLRUBackend(max_entries=config.cache_max_entries)]
+        if config.cache_path:
+            tiers.append(SQLiteBackend(config.cache_path, max_size_bytes=config.cache_max_size_mb * 1024 * 1024))
+        return cls(tiers, ttl=config.cache_ttl)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        for idx, tier in enumerate(self.tiers):
+            item = tier.get(key)
+            if item is None:
+                continue
+            value, created_at = item
+            if self._expired(created_at):
+                tier.delete(key)
+                continue
+            for front in self.tiers[:idx]:
+                front.set(key, value, created_at)
+            self.hits += 1
+            self.tier_hits[idx] += 1
+            return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        created_at = time.time()
+        for tier in self.tiers:
+            tier.set(key, value, created_at)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def close(self):
+        for tier in self.tiers:
+            tier.close()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "tiers": [
+                {"backend": type(tier).__name__, "hits": hits, "evictions": getattr(tier, "evictions", 0)}
+                for tier, hits in zip(self.tiers, self.tier_hits)
+            ],
+        }
+
+
+_SHARED_CACHES: Dict[Tuple, ResponseCache] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def get_response_cache(config: LLMConfig) -> ResponseCache:
+    """LLM instances with the same cache settings share one ResponseCache (and one SQLite connection)."""
+    cache_id = (config.cache_path, config.cache_max_entries, config.cache_max_size_mb, config.cache_ttl)
+    with _SHARED_LOCK:
+        cache = _SHARED_CACHES.get(cache_id)
+        if cache is None:
+            cache = _SHARED_CACHES[cache_id] = ResponseCache.from_config(config)
+            logger.debug(f"LLM response cache enabled: path={config.cache_path}, ttl={config.cache_ttl}")
+        return cache
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : script_runner.py
+@Desc    : Async execution of the scripts run by `RunCode`.
+    The dependencies of a workspace are installed once per hash of its requirements.txt. `python <script>` runs are
+    forked from a warm interpreter kept per (python, working directory, PYTHONPATH), which skips interpreter start-up
+    and has the test frameworks imported already; other commands, and platforms without fork, use a plain subprocess.
+    Output goes to files and is read back up to a size limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import signal
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from metagpt.logs import logger
+
+PYTHON_COMMANDS = {"python", "python3"}
+
+# Runs inside the warm interpreter: one JSON request per stdin line, each served by a forked child whose stdout and
+# stderr go to the files named in the request. Replies are `{"id", "pid"}` once forked and `{"id", "returncode"}`.
+WORKER_SOURCE = r"""
+import importlib, json, os, runpy, select, signal, sys, traceback
+
+for _name in ("unittest", "unittest.mock", "doctest", "pytest"):
+    try:
+        importlib.import_module(_name)
+    except Exception:
+        pass
+
+
+def _reply(**kwargs):
+    os.write(1, (json.dumps(kwargs) + "\n").encode())
+
+
+def _run(request):
+    code = 1
+    script = None
+    try:
+        os.setpgid(0, 0)
+        null = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null, 0)
+        os.close(null)
+        for fd, path in ((1, request["stdout"]), (2, request["stderr"])):
+            out = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(out, fd)
+            os.close(out)
+        os.chdir(request["cwd"])
+        script = request["argv"][0]
+        sys.argv = list(request["argv"])
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        importlib.invalidate_caches()
+        runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException as e:
+        # start the traceback at the script, as the interpreter would
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+
+children = {}
+buffer = b""
+while True:
+    ready, _, _ = select.select([0], [], [], 0.02 if children else None)
+    if ready:
+        chunk = os.read(0, 65536)
+        if not chunk:
+            break
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            request = json.loads(line)
+            pid = os.fork()
+            if pid == 0:
+                _run(request)
+            children[pid] = request["id"]
+            _reply(id=request["id"], pid=pid)
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            break
+        _reply(id=children.pop(pid), returncode=os.waitstatus_to_exitcode(status))
+for pid in children:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+"""
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def _reap(pid: int, timeout: float):
+    """Wait for a child without an event loop, killing it once `timeout` seconds have passed."""
+    deadline = time.monotonic() + timeout
+    try:
+        while not os.waitpid(pid, os.WNOHANG)[0]:
+            if time.monotonic() > deadline:
+                _kill_group(pid)
+                os.waitpid(pid, 0)
+                return
+            time.sleep(0.01)
+    except ChildProcessError:
+        pass  # reaped by the event loop's child watcher
+
+
+def _read_capped(path: Path, limit: int) -> str:
+    try:
+        size = path.stat().st_size
+        with open(path, "rb") as reader:
+            data = reader.read(limit)
+    except FileNotFoundError:
+        return ""
+    text = data.decode("utf-8", errors="replace")
+    if size > limit:
+        text += f"\n... [{size - limit} more bytes truncated]"
+    return text
+
+
+class _WarmWorker:
+    """A warm interpreter forking one child per script; requests may overlap."""
+
+    def __init__(self, python: str, cwd: str, env: Dict[str, str]):
+        self.python = python
+        self.cwd = cwd
+        self.env = env
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Dict[int, Tuple[asyncio.Future, asyncio.Future]] = {}
+        self._ids = count()
+        self._outdir = tempfile.mkdtemp(prefix="metagpt-run-")
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._process = await asyncio.create_subprocess_exec(
+            self.python,
+            "-c",
+            WORKER_SOURCE,
+            cwd=self.cwd,
+            env=self.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self._reader = asyncio.create_task(self._read_replies())
+
+    async def _read_replies(self):
+        while True:
+            line = await self._process.stdout.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            started, done = self._pending.get(reply["id"], (None, None))
+            if started is None:
+                continue
+            if "pid" in reply and not started.done():
+                started.set_result(reply["pid"])
+            elif "returncode" in reply and not done.done():
+                done.set_result(reply["returncode"])
+        for started, done in self._pending.values():
+            for future in (started, done):
+                if not future.done():
+                    future.set_exception(ConnectionError("warm worker exited"))
+
+    async def run(self, argv: List[str], timeout: float, max_output: int) -> Tuple[str, str]:
+        request_id = next(self._ids)
+        stdout_path = Path(self._outdir) / f"{request_id}.out"
+        stderr_path = Path(self._outdir) / f"{request_id}.err"
+        started, done = self.loop.create_future(), self.loop.create_future()
+        self._pending[request_id] = (started, done)
+        request = {"id": request_id, "argv": argv, "cwd": self.cwd, "stdout": str(stdout_path), "stderr": str(stderr_path)}
+        try:
+            self._process.stdin.write((json.dumps(request) + "\n").encode())
+            await self._process.stdin.drain()
+            pid = await started
+            try:
+                await asyncio.wait_for(asyncio.shield(done), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.info("The command did not complete within the given timeout.")
+                _kill_group(pid)
+                await done
+            return _read_capped(stdout_path, max_output), _read_capped(stderr_path, max_output)
+        finally:
+            if started.done() and not started.cancelled() and started.exception() is None and not done.done():
+                _kill_group(started.result())  # cancelled while running
+            self._pending.pop(request_id, None)
+            stdout_path.unlink(missing_ok=True)
+            stderr_path.unlink(missing_ok=True)
+
+    def close(self, timeout: float = 2):
+        if self.alive:
+            # on EOF the worker kills its running children and exits; the reader then fails pending runs
+            try:
+                self._process.stdin.close()
+            except RuntimeError:
+                # its event loop is closed (e.g. at exit), so nothing else will reap the worker
+                self._process.stdin.transport.get_extra_info("pipe").close()
+                _reap(self._process.pid, timeout)
+        shutil.rmtree(self._outdir, ignore_errors=True)
+
+    async def aclose(self, timeout: float = 2):
+        """Close the worker and wait for it to exit."""
+        if self.loop is not asyncio.get_running_loop():
+            self.close(timeout)
+            return
+        self.close()
+        if self._process is None:
+            return
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            _kill_group(self._process.pid)
+            await self._process.wait()
+        if self._reader is not None:
+            await self._reader
+
+
+class ScriptRunner:
+    """Run workspace scripts without blocking the event loop; shared process-wide as `script_runner`."""
+
+    def __init__(self):
+        self._workers: Dict[Tuple[str, str, str], _WarmWorker] = {}
+        self._installed: set = set()
+        self._install_locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def _requirements_key(working_directory: str, env: Dict[str, str]) -> str:
+        python = shutil.which("python", path=env.get("PATH")) or "python"
+        requirements = Path(working_directory) / "requirements.txt"
+        data = requirements.read_bytes() if requirements.exists() else b""
+        return f"{python}:{hashlib.sha256(data).hexdigest()}"
+
+    @staticmethod
+    async def _pip_install(args: List[str], working_directory: str, env: Dict[str, str]) -> bool:
+        command = ["python", "-m", "pip", "install"] + args
+        logger.info(" ".join(command))
+        process = await asyncio.create_subprocess_exec(*command, cwd=working_directory, env=env)
+        if await process.wait() != 0:
+            logger.error(f"{' '.join(command)} failed with exit code {process.returncode}")
+            return False
+        return True
+
+    async def install_dependencies(self, working_directory: str, env: Dict[str, str]):
+        """Install requirements.txt and pytest, once per interpreter and requirements.txt content."""
+        key = self._requirements_key(working_directory, env)
+        if key in self._installed:
+            return
+        lock = self._install_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._installed:
+                return
+            ok = True
+            requirements = Path(working_directory) / "requirements.txt"
+            if requirements.exists() and requirements.stat().st_size > 0:
+                ok = await self._pip_install(["-r", "requirements.txt"], working_directory, env)
+            ok = await self._pip_install(["pytest"], working_directory, env) and ok
+            # a failed install is retried by the next run, as before
+            if ok:
+                self._installed.add(key)
+                # warm interpreters of this workspace may hold modules imported before the install
+                self._close_workers(working_directory)
+
+    def _close_workers(self, cwd: str):
+        for key in [k for k in self._workers if k[1] == cwd]:
+            self._workers.pop(key).close()
+
+    async def _get_worker(self, python: str, cwd: str, env: Dict[str, str]) -> _WarmWorker:
+        key = (python, cwd, env.get("PYTHONPATH", ""))
+        worker = self._workers.get(key)
+        if worker is not None and (not worker.alive or worker.loop is not asyncio.get_running_loop()):
+            worker.close()
+            worker = None
+        if worker is None:
+            worker = _WarmWorker(python, cwd, env)
+            await worker.start()
+            self._workers[key] = worker
+        return worker
+
+    @staticmethod
+    async def _run_subprocess(
+        command: List[str], cwd: str, env: Dict[str, str], timeout: float, max_output: int
+    ) -> Tuple[str, str]:
+        with tempfile.TemporaryDirectory(prefix="metagpt-run-") as outdir:
+            stdout_path, stderr_path = Path(outdir) / "out", Path(outdir) / "err"
+            with open(stdout_path, "wb") as stdout, open(stderr_path, "wb") as stderr:
+                process = await asyncio.create_subprocess_exec(
+                    *command, cwd=cwd, env=env, stdout=stdout, stderr=stderr, start_new_session=os.name == "posix"
+                )
+            try:
+                await asyncio.wait_for(process.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.info("The command did not complete within the given timeout.")
+                if os.name == "posix":
+                    _kill_group(process.pid)
+                else:
+                    process.kill()
+                await process.wait()
+            return _read_capped(stdout_path, max_output), _read_capped(stderr_path, max_output)
+
+    async def run(
+        self,
+        command: List[str],
+        working_directory: str,
+        env: Dict[str, str],
+        timeout: float = 10,
+        max_output: int = 1024 * 1024,
+        warm: bool = True,
+    ) -> Tuple[str, str]:
+        """Run `command` in `working_directory` and return its (stdout, stderr), each cut at `max_output` bytes.
+
+        A command still running after `timeout` seconds is killed together with its children.
+        """
+        logger.info(" ".join(command))
+        forkable = warm and hasattr(os, "fork") and len(command) >= 2 and command[1].endswith(".py")
+        if forkable and Path(command[0]).name in PYTHON_COMMANDS:
+            try:
+                worker = await self._get_worker(command[0], working_directory, env)
+                return await worker.run(command[1:], timeout=timeout, max_output=max_output)
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Warm interpreter failed ({e!r}), running in a new process")
+        return await self._run_subprocess(command, working_directory, env, timeout, max_output)
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.close()
+        self._workers.clear()
+
+    async def aclose(self):
+        """Close the warm interpreters and wait for them to exit."""
+        workers = list(self._workers.values())
+        self._workers.clear()
+        await asyncio.gather(*(worker.aclose() for worker in workers))
+
+
+script_runner = ScriptRunner()
+atexit.register(script_runner.close)
+
+
+async def close_script_runner():
+    """Stop the warm interpreters of `script_runner` and remove their output dirs, e.g. when a run ends."""
+    await script_runner.aclose()
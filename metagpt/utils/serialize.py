@@ -4,6 +4,7 @@
 
 import copy
 import pickle
+from functools import lru_cache
 
 from metagpt.utils.common import import_class
 
@@ -47,14 +48,15 @@ def actionoutput_mapping_to_str(mapping: dict) -> dict:
     return new_mapping
 
 
+@lru_cache(maxsize=256)
+def _field_type_from_str(value: str):
+    if value == "(<class 'str'>, Ellipsis)":
+        return (str, ...)
+    return eval(value)  # `"'(list[str], Ellipsis)"` to `(list[str], ...)`
+
+
 def actionoutput_str_to_mapping(mapping: dict) -> dict:
-    new_mapping = {}
-    for key, value in mapping.items():
-        if value == "(<class 'str'>, Ellipsis)":
-            new_mapping[key] = (str, ...)
-        else:
-            new_mapping[key] = eval(value)  # `"'(list[str], Ellipsis)"` to `(list[str], ...)`
-    return new_mapping
+    return {key: _field_type_from_str(value) for key, value in mapping.items()}
 
 
 def serialize_message(message: "Message"):
@@ -62,7 +64,7 @@ def serialize_message(message: "Message"):
     ic = message_cp.instruct_content
     if ic:
         # model create by pydantic create_model like `pydantic.main.prd`, can't pickle.dump directly
-        schema = ic.model_json_schema()
+        schema = import_class("get_outcls_schema", "metagpt.actions.action_outcls_registry")(type(ic))
         mapping = actionoutout_schema_to_mapping(schema)
 
         message_cp.instruct_content = {"class": schema["title"], "mapping": mapping, "value": ic.model_dump()}
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : stream_parser.py
+@Desc    : Incremental parser for JSON objects streamed by an LLM.
+    Fed one chunk at a time (see `metagpt.provider.base_llm.observe_stream`), it tracks the top-level object and
+    checks each field against the JSON schema as soon as its value is complete. It tells the caller to stop the
+    generation once an object holding every required field, each of the schema type, is closed, so no tokens are
+    spent on trailing chatter. Anything less is left to the caller's repair and validation path.
+"""
+import json
+from typing import Any, Dict, Optional
+
+# JSON schema "type" -> the Python types json.loads produces for it
+JSON_TYPES = {
+    "string": (str,),
+    "array": (list,),
+    "object": (dict,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+
+
+class StreamingJSONParser:
+    """Scan streamed text for a top-level JSON object matching the schema, checking each field when its value ends.
+
+    `feed` returns False when the generation can stop: such an object is closed (`complete`), or `error` says why
+    the output cannot be JSON (only prose in the first `max_preamble` characters). An object that is not `exact`
+    (unquoted keys, a value of another type, required fields missing, ...) may still be repaired or coerced by the
+    caller; it does not stop the generation, and the scan goes on in case it was an echoed example.
+    """
+
+    def __init__(self, schema: dict, max_preamble: int = 2000):
+        self.properties: Dict[str, dict] = schema.get("properties", {})
+        self.required = set(schema.get("required", []))
+        self.max_preamble = max_preamble
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self.exact = True  # every field parsed as-is and named as in the schema
+        self.error: Optional[str] = None
+        self._lower_names = {name.lower(): name for name in self.properties}
+        self._text = ""
+        self._pos = 0
+        self._objects_seen = 0
+        self._reset_object()
+
+    def _reset_object(self):
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"  # key / colon / value, at depth 1
+        self._token_start = 0
+        self._key: Optional[str] = None
+        self.fields = {}
+        self.exact = True
+
+    @property
+    def done(self) -> bool:
+        return self.complete or self.error is not None
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk of the output; False means the generation should stop."""
+        if self.done:
+            return False
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            self._step(text, i)
+            if self.done:
+                self._pos = i + 1
+                return False
+        self._pos = len(text)
+        if not self._objects_seen and self._start is None and len(text.strip()) > self.max_preamble:
+            self.error = f"no JSON object in the first {self.max_preamble} characters"
+        return not self.done
+
+    def _step(self, text: str, i: int):
+        c = text[i]
+        if self._start is None:
+            if c == "{":
+                self._start = i
+                self._depth = 1
+                self._objects_seen += 1
+            return
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                if self._depth == 1 and self._expect == "key":
+                    self._key = self._parse(text[self._token_start : i + 1])
+                    self._expect = "colon"
+            return
+        if c == '"':
+            self._in_string = True
+            if self._depth == 1 and self._expect == "key":
+                self._token_start = i
+            return
+        if self._depth == 1:
+            if c == ":" and self._expect == "colon":
+                self._expect = "value"
+                self._token_start = i + 1
+                return
+            if c in ",}" and self._expect == "value":
+                self._end_field(text[self._token_start : i])
+                self._expect = "key"
+            elif c == "," or (self._expect == "key" and not c.isspace() and c != "}"):
+                self.exact = False  # e.g. an unquoted key, left to the repair step
+        if c in "{[":
+            self._depth += 1
+        elif c in "}]":
+            self._depth -= 1
+            if self._depth == 0:
+                self._end_object()
+
+    @staticmethod
+    def _parse(token: str):
+        try:
+            return json.loads(token)
+        except ValueError:
+            return None
+
+    def _end_field(self, raw: str):
+        key, raw = self._key, raw.strip()
+        self._key = None
+        if not isinstance(key, str) or not raw:
+            self.exact = False
+            return
+        name = key if key in self.properties else self._lower_names.get(key.lower())
+        if name is None:
+            self.exact = False  # unrecognized, only warned about by the model validator
+            return
+        if name != key:
+            self.exact = False
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            self.exact = False
+            return
+        expected = self.properties[name].get("type")
+        wrong_type = expected in JSON_TYPES and not isinstance(value, JSON_TYPES[expected])
+        if wrong_type or (expected in ("integer", "number") and isinstance(value, bool)):
+            self.exact = False  # e.g. "3" for an integer, which the output class may still coerce
+            return
+        self.fields[name] = value
+
+    def _end_object(self):
+        if self.exact and self.required.issubset(self.fields):
+            self.complete = True
+            return
+        # incomplete, or braces in the preamble ("fill in {placeholder}", an echoed format example): look further on
+        self._reset_object()
@@ -1,6 +1,17 @@
-from typing import Generator, Sequence
+import re
+from collections import deque
+from typing import Generator, Iterable, Iterator, Optional, Sequence, Union
 
-from metagpt.utils.token_counter import TOKEN_MAX, count_string_tokens
+from metagpt.utils.token_counter import (
+    TOKEN_MAX,
+    count_tokens,
+    count_tokens_batch,
+    get_tokenizer,
+)
+
+# split after sentence-ending punctuation: before the following whitespace, or right after CJK punctuation
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])(?=\s)|(?<=[。！？；])")
+CLAUSE_BOUNDARY = re.compile(r"(?<=[,:])(?=\s)|(?<=[，：、])")
 
 
 def reduce_message_length(
@@ -23,9 +34,9 @@ def reduce_message_length(
     Raises:
         RuntimeError: If it fails to reduce the concatenated message length.
     """
-    max_token = TOKEN_MAX.get(model_name, 2048) - count_string_tokens(system_text, model_name) - reserved
+    max_token = TOKEN_MAX.get(model_name, 2048) - count_tokens(system_text, model_name) - reserved
     for msg in msgs:
-        if count_string_tokens(msg, model_name) < max_token or model_name not in TOKEN_MAX:
+        if count_tokens(msg, model_name) < max_token or model_name not in TOKEN_MAX:
             return msg
 
     raise RuntimeError("fail to reduce message length")
@@ -50,30 +61,132 @@ def generate_prompt_chunk(
     Yields:
         The chunk of text.
     """
-    paragraphs = text.splitlines(keepends=True)
-    current_token = 0
-    current_lines = []
-
-    reserved = reserved + count_string_tokens(prompt_template + system_text, model_name)
+    reserved = reserved + count_tokens(prompt_template + system_text, model_name)
     # 100 is a magic number to ensure the maximum context length is not exceeded
     max_token = TOKEN_MAX.get(model_name, 2048) - reserved - 100
 
-    while paragraphs:
-        paragraph = paragraphs.pop(0)
-        token = count_string_tokens(paragraph, model_name)
-        if current_token + token <= max_token:
-            current_lines.append(paragraph)
-            current_token += token
-        elif token > max_token:
-            paragraphs = split_paragraph(paragraph) + paragraphs
-            continue
-        else:
-            yield prompt_template.format("".join(current_lines))
-            current_lines = [paragraph]
-            current_token = token
+    for chunk in iter_text_chunks(text, max_token, model_name):
+        yield prompt_template.format(chunk)
+
+
+def iter_lines(text: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Yield the lines (with line ends) of a string or of a stream of text pieces split anywhere, e.g. a file."""
+    if isinstance(text, str):
+        yield from text.splitlines(keepends=True)
+        return
+    pending = ""
+    for piece in text:
+        lines = (pending + piece).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _split_by_tokens(text: str, max_token: int, model_name: Optional[str]) -> Iterator[tuple[str, int]]:
+    """Cut text that has no sentence or clause boundary every `max_token` tokens, at character boundaries."""
+    tokenizer = get_tokenizer(model_name)
+    if not hasattr(tokenizer, "decode_with_offsets"):
+        yield from _split_by_measure(text, max_token, model_name)
+        return
+    tokens = tokenizer.encode_ordinary(text)
+    _, offsets = tokenizer.decode_with_offsets(tokens)
+    offsets.append(len(text))
+    start = 0
+    while start < len(tokens):
+        cut = min(start + max_token, len(tokens))
+        # several tokens can share the character they split; never cut inside it
+        while start + 1 < cut < len(tokens) and offsets[cut] == offsets[cut - 1]:
+            cut -= 1
+        yield text[offsets[start] : offsets[cut]], cut - start
+        start = cut
+
+
+def _split_by_measure(text: str, max_token: int, model_name: Optional[str]) -> Iterator[tuple[str, int]]:
+    """`_split_by_tokens` for tokenizers without offsets: the longest prefix that measures within `max_token`.
 
-    if current_lines:
-        yield prompt_template.format("".join(current_lines))
+    The average characters per token only gives the first guess; each piece is re-counted and bisected down until it
+    fits. A single character over the budget on its own is still yielded, as it cannot be cut.
+    """
+    size = max(1, len(text) * max_token // max(1, count_tokens(text, model_name)))
+    start = 0
+    while start < len(text):
+        hi = min(size, len(text) - start)
+        token = count_tokens(text[start : start + hi], model_name)
+        if token > max_token:
+            lo = 1  # bisect on the piece length: `lo` is known to fit (or is the one-character minimum)
+            lo_token = count_tokens(text[start : start + 1], model_name)
+            while lo < hi - 1:
+                mid = (lo + hi) // 2
+                mid_token = count_tokens(text[start : start + mid], model_name)
+                if mid_token <= max_token:
+                    lo, lo_token = mid, mid_token
+                else:
+                    hi = mid
+            hi, token = lo, lo_token
+        yield text[start : start + hi], token
+        start += hi
+
+
+def _fit_units(text: str, max_token: int, model_name: Optional[str], token: int) -> Iterator[tuple[str, int]]:
+    """Yield (piece, tokens) of text with every piece within max_token, preferring sentence then clause cuts."""
+    if token <= max_token:
+        yield text, token
+        return
+    for boundary in (SENTENCE_BOUNDARY, CLAUSE_BOUNDARY):
+        parts = [p for p in boundary.split(text) if p]
+        if len(parts) > 1:
+            for part, part_token in zip(parts, count_tokens_batch(parts, model_name)):
+                yield from _fit_units(part, max_token, model_name, part_token)
+            return
+    yield from _split_by_tokens(text, max_token, model_name)
+
+
+def iter_text_chunks(
+    text: Union[str, Iterable[str]],
+    max_token: int,
+    model_name: Optional[str] = None,
+    overlap: int = 0,
+) -> Iterator[str]:
+    """Lazily split text into chunks of at most `max_token` tokens, in a single pass.
+
+    Chunks are cut between lines; a line that does not fit on its own is cut between sentences, then clauses, then
+    at token offsets. Every unit is tokenized once. `text` may be a string or an iterable of text pieces (e.g. an
+    open file), which is consumed as the chunks are produced.
+
+    Args:
+        text: The text, or an iterable of its pieces.
+        max_token: The maximum number of tokens per chunk.
+        model_name: The model whose tokenizer counts tokens.
+        overlap: Up to this many tokens of trailing units of a chunk are repeated at the start of the next one.
+
+    Yields:
+        The chunks of text.
+
+    Raises:
+        ValueError: If `max_token` is not positive.
+    """
+    if max_token <= 0:
+        raise ValueError(f"max_token must be positive, got {max_token}")
+    current: deque[tuple[str, int]] = deque()
+    current_token = 0
+    for line in iter_lines(text):
+        for unit, token in _fit_units(line, max_token, model_name, count_tokens(line, model_name)):
+            if current and current_token + token > max_token:
+                yield "".join(u for u, _ in current)
+                kept = 0
+                carried = []
+                for u, t in reversed(current):
+                    if kept + t > overlap or kept + t + token > max_token:
+                        break
+                    carried.append((u, t))
+                    kept += t
+                current = deque(reversed(carried))
+                current_token = kept
+            current.append((unit, token))
+            current_token += token
+    if current:
+        yield "".join(u for u, _ in current)
 
 
 def split_paragraph(paragraph: str, sep: str = ".,", count: int = 2) -> list[str]:
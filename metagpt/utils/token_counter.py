@@ -10,8 +10,18 @@ ref3: https://github.com/Significant-Gravitas/Auto-GPT/blob/master/autogpt/llm/t
 ref4: https://github.com/hwchase17/langchain/blob/master/langchain/chat_models/openai.py
 ref5: https://ai.google.dev/models/gemini
 """
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
 import tiktoken
 
+from metagpt.logs import logger
+
 TOKEN_COSTS = {
     "gpt-3.5-turbo": {"prompt": 0.0015, "completion": 0.002},
     "gpt-3.5-turbo-0301": {"prompt": 0.0015, "completion": 0.002},
@@ -64,13 +74,207 @@ TOKEN_MAX = {
 }
 
 
-def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
-    """Return the number of tokens used by a list of messages."""
+DEFAULT_ENCODING = "cl100k_base"
+BATCH_MIN_AVG_CHARS = 4096  # batches of shorter texts on average are encoded on the calling thread
+
+# Hugging Face tokenizer repos for local models, matched by the longest prefix of the model name
+# (Ollama names such as "qwen2.5-coder:7b" included). cl100k_base under-counts these models noticeably.
+# Their tokenizer.json is never downloaded: it is read from $METAGPT_TOKENIZER_DIR/<repo>/tokenizer.json or from the
+# local Hugging Face cache, otherwise cl100k_base is used. `register_local_tokenizer` points a model at any file.
+LOCAL_TOKENIZERS = {
+    "qwen2.5": "Qwen/Qwen2.5-7B-Instruct",
+    "qwen2": "Qwen/Qwen2-7B-Instruct",
+    "qwen": "Qwen/Qwen-7B-Chat",
+    "deepseek-coder": "deepseek-ai/deepseek-coder-6.7b-instruct",
+    "deepseek": "deepseek-ai/deepseek-llm-7b-chat",
+}
+
+
+TOKENIZER_DIR_ENV = "METAGPT_TOKENIZER_DIR"
+
+
+def find_local_tokenizer(repo: str) -> Optional[Path]:
+    """tokenizer.json of `repo` under $METAGPT_TOKENIZER_DIR or in the Hugging Face hub cache, without downloading"""
+    candidates = []
+    if os.environ.get(TOKENIZER_DIR_ENV):
+        candidates.append(Path(os.environ[TOKENIZER_DIR_ENV]) / repo / "tokenizer.json")
+    hf_home = Path(os.environ.get("HF_HOME") or Path.home() / ".cache" / "huggingface")
+    hub_cache = Path(os.environ.get("HF_HUB_CACHE") or hf_home / "hub")
+    snapshots = hub_cache / f"models--{repo.replace('/', '--')}" / "snapshots"
+    if snapshots.is_dir():
+        candidates.extend(sorted(snapshots.glob("*/tokenizer.json"), key=lambda p: p.stat().st_mtime, reverse=True))
+    return next((c for c in candidates if c.is_file()), None)
+
+
+class HFTokenizer:
+    """Adapter giving a Hugging Face `tokenizers.Tokenizer` the tiktoken `encode`/`encode_batch` interface.
+
+    Loaded from a local tokenizer.json only; install the `tokenizers` extra (`pip install metagpt[tokenizers]`).
+    """
+
+    def __init__(self, repo: str, path: Optional[str] = None):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError(
+                "To count tokens of local models, you should have the `tokenizers` Python package installed. "
+                "You can install it by running the command: `pip install metagpt[tokenizers]`"
+            )
+        path = path or find_local_tokenizer(repo)
+        if path is None:
+            raise FileNotFoundError(f"no local tokenizer.json for {repo}, set {TOKENIZER_DIR_ENV} or cache it first")
+        self.name = repo
+        self._tokenizer = Tokenizer.from_file(str(path))
+
+    def encode(self, text: str) -> List[int]:
+        return self._tokenizer.encode(text, add_special_tokens=False).ids
+
+    def encode_batch(self, texts: Sequence[str], num_threads: int = 8) -> List[List[int]]:
+        # tokenizers parallelizes batches itself
+        return [e.ids for e in self._tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+    def decode(self, tokens: List[int]) -> str:
+        return self._tokenizer.decode(tokens)
+
+
+_TOKENIZER_FACTORIES: Dict[str, Callable[[], object]] = {}
+
+
+def register_tokenizer(model_prefix: str, factory: Callable[[], object]):
+    """Use `factory()` (anything with tiktoken-style `encode`/`encode_batch`) for models starting with the prefix"""
+    _TOKENIZER_FACTORIES[model_prefix] = factory
+    get_tokenizer.cache_clear()
+
+
+def register_local_tokenizer(model_prefix: str, path: str):
+    """Count tokens of models starting with the prefix with the Hugging Face tokenizer.json at `path`"""
+    register_tokenizer(model_prefix, lambda: HFTokenizer(model_prefix, path=path))
+
+
+def _match_prefix(model: str, prefixes) -> Optional[str]:
+    matches = [p for p in prefixes if model.startswith(p)]
+    return max(matches, key=len) if matches else None
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: Optional[str]):
+    """The tokenizer for `model`, created once per model name.
+
+    Registered tokenizers come first, then tiktoken's encoding for OpenAI models, then the Hugging Face tokenizer of
+    known local models, falling back to cl100k_base.
+    """
+    if not model:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    prefix = _match_prefix(model, _TOKENIZER_FACTORIES)
+    if prefix:
+        return _TOKENIZER_FACTORIES[prefix]()
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        print("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
+        pass
+    prefix = _match_prefix((model or "").lower(), LOCAL_TOKENIZERS)
+    if prefix:
+        try:
+            return HFTokenizer(LOCAL_TOKENIZERS[prefix])
+        except Exception as e:
+            logger.warning(f"Tokenizer of {model} unavailable ({e}), using {DEFAULT_ENCODING}")
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    logger.warning(f"Model {model} not found. Using {DEFAULT_ENCODING} encoding.")
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def _encode(tokenizer, text: str) -> List[int]:
+    if isinstance(tokenizer, tiktoken.Encoding):
+        return tokenizer.encode(text, disallowed_special=())
+    return tokenizer.encode(text)
+
+
+def _encode_batch(tokenizer, texts: List[str], num_threads: int) -> List[List[int]]:
+    if len(texts) < 2 or sum(len(t) for t in texts) < BATCH_MIN_AVG_CHARS * len(texts):
+        # handing short texts to worker threads costs more than encoding them
+        return [_encode(tokenizer, t) for t in texts]
+    if isinstance(tokenizer, tiktoken.Encoding):
+        return tokenizer.encode_batch(texts, num_threads=num_threads, disallowed_special=())
+    return tokenizer.encode_batch(texts, num_threads=num_threads)
+
+
+class TokenCounter:
+    """Token counts with per-model tokenizers and an LRU of counts keyed by content hash.
+
+    Short strings are keyed by themselves, long ones by a blake2b digest so the cache does not keep them alive.
+    """
+
+    SHORT_TEXT = 256
+
+    def __init__(self, max_entries: int = 65536):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._counts: OrderedDict[Hashable, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _key(cls, model: Optional[str], text: str) -> Hashable:
+        if len(text) <= cls.SHORT_TEXT:
+            return model, text
+        return model, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def _get(self, key: Hashable) -> Optional[int]:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._counts.move_to_end(key)
+            return count
+
+    def _put(self, key: Hashable, count: int):
+        with self._lock:
+            self._counts[key] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        key = self._key(model, text)
+        count = self._get(key)
+        if count is None:
+            count = len(_encode(get_tokenizer(model), text))
+            self._put(key, count)
+        return count
+
+    def count_batch(self, texts: Sequence[str], model: Optional[str] = None, num_threads: int = 8) -> List[int]:
+        """Counts of many strings; uncached ones are encoded together with the tokenizer's `encode_batch`."""
+        keys = [self._key(model, t) for t in texts]
+        counts = [self._get(k) for k in keys]
+        missing: Dict[Hashable, str] = {k: t for k, t, c in zip(keys, texts, counts) if c is None}
+        computed: Dict[Hashable, int] = {}
+        if missing:
+            encoded = _encode_batch(get_tokenizer(model), list(missing.values()), num_threads)
+            for key, tokens in zip(missing, encoded):
+                computed[key] = len(tokens)
+                self._put(key, len(tokens))
+        return [c if c is not None else computed[k] for k, c in zip(keys, counts)]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._counts), "hits": self.hits, "misses": self.misses}
+
+
+token_counter = TokenCounter()
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Number of tokens of `text` for `model`, memoized; None means cl100k_base."""
+    return token_counter.count(text, model)
+
+
+def count_tokens_batch(texts: Sequence[str], model: Optional[str] = None, num_threads: int = 8) -> List[int]:
+    """Token counts of `texts` for `model`, encoding the uncached ones in one batch."""
+    return token_counter.count_batch(texts, model, num_threads=num_threads)
+
+
+def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
+    """Return the number of tokens used by a list of messages."""
     if model in {
         "gpt-3.5-turbo-0613",
         "gpt-3.5-turbo-16k-0613",
@@ -94,12 +298,12 @@ def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
         tokens_per_message = 4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
         tokens_per_name = -1  # if there's a name, the role is omitted
     elif "gpt-3.5-turbo" == model:
-        print("Warning: gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613.")
+        # gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613.
         return count_message_tokens(messages, model="gpt-3.5-turbo-0613")
     elif "gpt-4" == model:
-        print("Warning: gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.")
+        # gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.
         return count_message_tokens(messages, model="gpt-4-0613")
-    elif "open-llm-model" == model:
+    elif "open-llm-model" == model or _match_prefix((model or "").lower(), LOCAL_TOKENIZERS):
         """
         For self-hosted open_llm api, they include lots of different models. The message tokens calculation is
         inaccurate. It's a reference result.
@@ -113,6 +317,7 @@ def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
             f"for information on how messages are converted to tokens."
         )
     num_tokens = 0
+    contents = []
     for message in messages:
         num_tokens += tokens_per_message
         for key, value in message.items():
@@ -122,9 +327,10 @@ def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
                 for item in value:
                     if isinstance(item, dict) and item.get("type") in ["text"]:
                         content = item.get("text", "")
-            num_tokens += len(encoding.encode(content))
+            contents.append(content)
             if key == "name":
                 num_tokens += tokens_per_name
+    num_tokens += sum(count_tokens_batch(contents, model))
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
     return num_tokens
 
@@ -140,12 +346,7 @@ def count_string_tokens(string: str, model_name: str) -> int:
     Returns:
         int: The number of tokens in the text string.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        print("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(string))
+    return count_tokens(string, model_name)
 
 
 def get_max_completion_tokens(messages: list[dict], model: str, default: int) -> int:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from maswe.eval.humaneval_execute import (
+    STATUS_ERROR,
+    STATUS_FAILED,
+    STATUS_PASSED,
+    STATUS_TIMEOUT,
+    SandboxPool,
+    resource,
+)
+
+TEST_CODE = "assert add(1, 2) == 3\n"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with SandboxPool(workers=2, timeout_sec=1.0, memory_limit_mb=256, max_tasks_per_worker=3) as pool:
+        yield pool
+
+
+def test_statuses(pool):
+    results = pool.map(
+        [
+            ("def add(a, b):\n    return a + b\n", TEST_CODE),
+            ("def add(a, b):\n    return a - b\n", TEST_CODE),
+            ("def add(a, b):\n    return a +\n", TEST_CODE),
+            ("def add(a, b):\n    return a // 0\n", TEST_CODE),
+        ]
+    )
+
+    assert [r.status for r in results] == [STATUS_PASSED, STATUS_FAILED, STATUS_ERROR, STATUS_ERROR]
+    assert results[0].passed and results[0].error is None
+    assert "AssertionError" in results[1].error
+    assert "SyntaxError" in results[2].error
+    assert "ZeroDivisionError" in results[3].error
+
+
+def test_timeout_does_not_block_other_samples(pool):
+    busy = "def add(a, b):\n    while True:\n        pass\n"
+    results = pool.map([(busy, TEST_CODE), ("def add(a, b):\n    return a + b\n", TEST_CODE)])
+
+    assert [r.status for r in results] == [STATUS_TIMEOUT, STATUS_PASSED]
+    assert results[0].duration_sec < 5
+
+
+def test_timeout_in_a_c_call_is_killed(pool):
+    # a single huge bigint power does not return to the interpreter, so only the parent's hard kill ends it
+    results = pool.map([("x = 10 ** (10 ** 10)\n", ""), ("def add(a, b):\n    return a + b\n", TEST_CODE)])
+
+    assert [r.status for r in results] == [STATUS_TIMEOUT, STATUS_PASSED]
+
+
+@pytest.mark.skipif(resource is None, reason="memory limits need the resource module")
+def test_memory_limit(pool):
+    hog = "data = [0] * (1024 * 1024 * 1024)\n"
+    results = pool.map([(hog, ""), ("def add(a, b):\n    return a + b\n", TEST_CODE)])
+
+    assert results[0].status == STATUS_ERROR
+    assert "memory" in results[0].error
+    assert results[1].passed
+
+
+def test_workers_are_recycled(pool):
+    results = pool.map([("def add(a, b):\n    return a + b\n", TEST_CODE)] * 10)
+
+    assert all(r.passed for r in results)
+
+
+def test_submit_after_shutdown_raises():
+    pool = SandboxPool(workers=1)
+    pool.shutdown()
+
+    with pytest.raises(RuntimeError):
+        pool.submit("", "")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from maswe.eval.humaneval_execute import STATUS_FAILED, STATUS_PASSED, SampleResult
+from maswe.eval.humaneval_pipeline import HumanEvalCheckpoint, run_humaneval_pipeline
+
+META = {"model": "m", "n_samples": 2, "k": 2, "temperature": 0.8, "max_token": 2048}
+
+
+class FakePool:
+    """Scores a sample in-process: it passes when its code is "ok"."""
+
+    workers = 2
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, code: str, test_code: str) -> Future:
+        self.submitted.append(code)
+        future = Future()
+        future.set_result(SampleResult(status=STATUS_PASSED if code == "ok" else STATUS_FAILED))
+        return future
+
+
+def _dataset(n: int):
+    return [{"task_id": f"T/{i}", "test": "", "prompt": ""} for i in range(n)]
+
+
+def _tear(checkpoint: HumanEvalCheckpoint, filename: str, tail: bytes):
+    """Simulate a crash in the middle of writing a record."""
+    checkpoint.close()
+    with open(os.path.join(checkpoint.run_dir, filename), "ab") as f:
+        f.write(tail)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_summary_in_dataset_order():
+    dataset = _dataset(4)
+    in_flight, peak, done_order = 0, 0, []
+
+    async def generate(problem, sample_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # later problems finish first
+        await asyncio.sleep(0.01 * (len(dataset) - int(problem["task_id"][2:])))
+        in_flight -= 1
+        return "ok" if sample_id == 0 else "bad"
+
+    summary = await run_humaneval_pipeline(
+        generate,
+        dataset,
+        n_samples=2,
+        pool=FakePool(),
+        concurrency=8,
+        on_problem_done=lambda problem, entry: done_order.append(problem["task_id"]),
+    )
+
+    assert [s["task_id"] for s in summary] == ["T/0", "T/1", "T/2", "T/3"]
+    assert all(s["results"] == [True, False] and s["num_total"] == 2 for s in summary)
+    assert done_order == ["T/3", "T/2", "T/1", "T/0"]  # reported as soon as each is scored
+    assert peak == 8
+
+
+@pytest.mark.asyncio
+async def test_pipeline_bounds_generations_in_flight():
+    in_flight, peak = 0, 0
+
+    async def generate(problem, sample_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return "ok"
+
+    summary = await run_humaneval_pipeline(generate, _dataset(5), n_samples=2, pool=FakePool(), concurrency=3)
+
+    assert peak == 3
+    assert all(s["pass@k"] == 1.0 for s in summary)
+
+
+@pytest.mark.parametrize("tail", [b'{"task_id": "T/1", "sample_id": 0, "co', b"x" * 10000], ids=["short", "long"])
+def test_resume_after_torn_line_keeps_new_records(tmp_path, tail):
+    checkpoint = HumanEvalCheckpoint(str(tmp_path), "run")
+    checkpoint.record_generation("T/0", 0, "a")
+    _tear(checkpoint, HumanEvalCheckpoint.GENERATIONS, tail)
+
+    resumed = HumanEvalCheckpoint(str(tmp_path), "run")
+    assert set(resumed.generations) == {("T/0", 0)}
+    resumed.record_generation("T/1", 0, "b")
+    resumed.close()
+
+    assert HumanEvalCheckpoint(str(tmp_path), "run").generations == {("T/0", 0): "a", ("T/1", 0): "b"}
+
+
+def test_resume_when_only_a_torn_line_was_written(tmp_path):
+    checkpoint = HumanEvalCheckpoint(str(tmp_path), "run")
+    _tear(checkpoint, HumanEvalCheckpoint.RESULTS, b'{"task_id": "T/0", "sam')
+
+    resumed = HumanEvalCheckpoint(str(tmp_path), "run")
+    resumed.record_result("T/0", 1, SampleResult(status=STATUS_PASSED))
+    resumed.close()
+
+    assert set(HumanEvalCheckpoint(str(tmp_path), "run").results) == {("T/0", 1)}
+
+
+def test_resume_with_other_sampling_settings_is_rejected(tmp_path):
+    HumanEvalCheckpoint(str(tmp_path), "run").check_meta(META)
+
+    HumanEvalCheckpoint(str(tmp_path), "run").check_meta(dict(META))
+    for name, value in [("temperature", 0.2), ("max_token", 512), ("k", 1)]:
+        with pytest.raises(ValueError, match=name):
+            HumanEvalCheckpoint(str(tmp_path), "run").check_meta({**META, name: value})
+
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_only_missing_work(tmp_path):
+    checkpoint = HumanEvalCheckpoint(str(tmp_path), "run")
+    checkpoint.record_generation("T/0", 0, "ok")
+    checkpoint.record_result("T/0", 0, SampleResult(status=STATUS_PASSED))
+    checkpoint.record_generation("T/0", 1, "bad")  # generated, not scored yet
+    _tear(checkpoint, HumanEvalCheckpoint.GENERATIONS, b'{"task_id": "T/1"')
+    generated = []
+
+    async def generate(problem, sample_id):
+        generated.append((problem["task_id"], sample_id))
+        return "ok"
+
+    resumed = HumanEvalCheckpoint(str(tmp_path), "run")
+    pool = FakePool()
+    summary = await run_humaneval_pipeline(generate, _dataset(2), n_samples=2, pool=pool, checkpoint=resumed)
+    resumed.close()
+
+    assert sorted(generated) == [("T/1", 0), ("T/1", 1)]
+    assert sorted(pool.submitted) == ["bad", "ok", "ok"]
+    assert [s["results"] for s in summary] == [[True, False], [True, True]]
+
+    final = HumanEvalCheckpoint(str(tmp_path), "run")
+    assert len(final.generations) == len(final.results) == 4
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+import pytest
+
+from metagpt.actions.action_node import ActionNode
+from metagpt.configs.llm_config import LLMConfig, LLMType
+from metagpt.provider.base_llm import BaseLLM, observe_stream
+from metagpt.utils.stream_parser import StreamingJSONParser
+
+
+class StreamingLLM(BaseLLM):
+    """Streams a canned reply in small chunks, stopping when the stream observer asks to.
+
+    `reply` is the reply text, or a function of the prompt returning it.
+    """
+
+    def __init__(self, config: LLMConfig, reply):
+        self.config = config
+        self.model = config.model
+        self.reply = reply
+        self.calls = 0
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def acompletion(self, messages: list[dict], timeout=3):
+        raise NotImplementedError
+
+    async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
+        self.calls += 1
+        self.prompts.append(messages[-1]["content"])
+        reply = self.reply(messages[-1]["content"]) if callable(self.reply) else self.reply
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self._stream_begin()
+        streamed = []
+        for i in range(0, len(reply), 4):
+            streamed.append(reply[i : i + 4])
+            if not self._stream_token(streamed[-1]):
+                break
+        return "".join(streamed)
+
+
+def _llm(tmp_path, reply, cache=True) -> StreamingLLM:
+    config = LLMConfig(api_key="-", api_type=LLMType.OLLAMA, model="fake", cache=cache, cache_path=str(tmp_path / "c.db"))
+    return StreamingLLM(config, reply)
+
+
+def _parent_node() -> ActionNode:
+    children = [
+        ActionNode(key=key, expected_type=int, instruction=f"the {key} count", example=1) for key in ("A", "B", "C")
+    ]
+    return ActionNode.from_children("Counts", children)
+
+
+def _child_reply(prompt: str) -> str:
+    key = next(key for key in ("A", "B", "C") if f'"{key}"' in prompt)
+    return json.dumps({key: ord(key)})
+
+
+@pytest.mark.asyncio
+async def test_repeated_structured_fill_is_cached(tmp_path):
+    llm = _llm(tmp_path, '{"Answer": 3}\nHope this helps, let me know if you need anything else!')
+
+    for _ in range(2):
+        node = ActionNode(key="Answer", expected_type=int, instruction="how many?", example=1)
+        await node.fill(context="count them", llm=llm, schema="json")
+        assert node.instruct_content.Answer == 3
+
+    assert llm.calls == 1
+    assert llm.response_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_aborted_stream_is_not_cached(tmp_path):
+    llm = _llm(tmp_path, "no json here " * 200)
+    schema = {"properties": {"Answer": {"type": "integer"}}, "required": ["Answer"]}
+
+    for _ in range(2):
+        with observe_stream(lambda: StreamingJSONParser(schema, max_preamble=100)) as stream:
+            await llm.aask("how many?")
+        assert stream.observer.error
+
+    assert llm.calls == 2
+    assert llm.response_cache.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_complex_fill_runs_children_in_order_by_default(tmp_path):
+    llm = _llm(tmp_path, _child_reply, cache=False)
+
+    node = await _parent_node().fill(context="count them", llm=llm, schema="json", strgy="complex")
+
+    assert node.instruct_content.model_dump() == {"A": 65, "B": 66, "C": 67}
+    assert [_child_reply(p) for p in llm.prompts] == ['{"A": 65}', '{"B": 66}', '{"C": 67}']
+    assert llm.max_in_flight == 1
+    assert all(stats["attempts"] == 1 for stats in node.fill_stats.values())
+
+
+@pytest.mark.asyncio
+async def test_complex_fill_concurrency_is_opt_in(tmp_path):
+    llm = _llm(tmp_path, _child_reply, cache=False)
+
+    node = await _parent_node().fill(context="count them", llm=llm, schema="json", strgy="complex", concurrency=3)
+
+    assert list(node.instruct_content.model_dump()) == ["A", "B", "C"]
+    assert llm.max_in_flight == 3
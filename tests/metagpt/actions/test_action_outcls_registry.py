@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from typing import List
+
+from pydantic import BaseModel, create_model
+
+from metagpt.actions.action_outcls_registry import (
+    ActionOutclsRegistry,
+    action_outcls_registry,
+    register_action_outcls,
+)
+
+
+@register_action_outcls
+def _create_class(class_name: str, mapping: dict):
+    return create_model(class_name, **mapping)
+
+
+def _model(name: str):
+    return create_model(name, field=(str, ...))
+
+
+def test_same_name_and_mapping_give_same_class():
+    first = _create_class("Outcls", {"field": (List[str], ...), "flag": (bool, ...)})
+    again = _create_class("Outcls", mapping={"flag": (bool, ...), "field": (list[str], ...)})
+    other = _create_class("Outcls", {"field": (List[int], ...), "flag": (bool, ...)})
+
+    assert first is again
+    assert first is not other
+    assert first.__name__ in action_outcls_registry.canonical("Outcls")
+
+
+def test_canonical_keeps_equal_values_of_different_types_apart():
+    registry = ActionOutclsRegistry()
+
+    assert registry.canonical((int, 1)) != registry.canonical((int, True))
+
+
+def test_lru_eviction():
+    registry = ActionOutclsRegistry(max_size=2)
+    a, b, c = _model("A"), _model("B"), _model("C")
+    registry.put("a", a)
+    registry.put("b", b)
+    registry.json_schema(a)
+
+    assert registry.get("a") is a  # now the most recently used
+    registry.put("c", c)
+
+    assert "b" not in registry and "a" in registry and "c" in registry
+    assert registry.get("b") is None
+    assert registry.stats()["evictions"] == 1
+    assert len(registry) == 2
+
+
+def test_evicted_class_drops_its_schema():
+    registry = ActionOutclsRegistry(max_size=1)
+    a = _model("A")
+    registry.put("a", a)
+    registry.json_schema(a)
+    registry.put("b", _model("B"))
+
+    assert a not in registry._schemas
+
+
+def test_spec_names_are_bounded():
+    registry = ActionOutclsRegistry(max_size=8)
+
+    for i in range(100):
+        registry.canonical(("field", i))
+
+    assert len(registry._spec_names) == 8
+    assert registry.canonical(("field", 99)) == ("tuple", "field", "99")
+    assert registry.canonical(("field", 0)) == ("tuple", "field", "0")  # evicted, named again
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from metagpt.memory.content_index import tokenize
+from metagpt.memory.memory import Memory
+from metagpt.schema import Message
+
+WORDS = ["alpha", "beta", "Gamma", "delta", "snake_game", "main.py", "def", "error:", "测试", "x"]
+ROLES = ["Alice", "Bob", "Eve"]
+ACTIONS = ["WritePRD", "WriteCode", "RunCode"]
+
+
+def _message(rng: random.Random) -> Message:
+    return Message(
+        content=" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 6))),
+        role=rng.choice(ROLES),
+        cause_by=rng.choice(ACTIONS),
+        send_to=set(rng.sample(ROLES, rng.randint(0, 2))) or {"<all>"},
+    )
+
+
+def _assert_consistent(memory: Memory, rng: random.Random):
+    """Every index answers what a scan of `storage` would."""
+    storage = memory.storage
+    assert len({m.id for m in storage}) == len(storage) == memory.count()
+    for role in ROLES:
+        assert memory.get_by_role(role) == [m for m in storage if m.role == role]
+        assert memory.get_by_send_to(role) == [m for m in storage if role in m.send_to]
+    for action in ACTIONS:
+        assert memory.get_by_action(action) == [m for m in storage if m.cause_by == action]
+    for m in storage:
+        assert memory.contains(m)
+    for _ in range(10):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 2)))
+        query = text[rng.randrange(len(text)) :][: rng.randint(1, 12)]
+        assert memory.get_by_content(query) == [m for m in storage if query in m.content], query
+        words = tokenize(text)
+        assert memory.search(text) == [m for m in storage if words <= tokenize(m.content)], text
+
+
+@pytest.mark.parametrize("index_content", [False, True])
+def test_indexes_stay_consistent(index_content):
+    rng = random.Random(7)
+    memory = Memory(index_content=index_content)
+    removed = []
+    for step in range(400):
+        op = rng.random()
+        if op < 0.55 or not memory.storage:
+            memory.add(_message(rng))
+        elif op < 0.65 and removed:
+            memory.add(removed.pop())  # re-added after a delete
+        elif op < 0.8:
+            message = rng.choice(memory.storage)
+            memory.delete(message)
+            removed.append(message)
+            assert not memory.contains(message)
+        elif op < 0.95:
+            removed.append(memory.delete_newest())
+        else:
+            memory.clear()
+            assert memory.count() == 0 and not memory.get_by_role("Alice") and not memory.index
+        if step % 20 == 0:
+            _assert_consistent(memory, rng)
+    _assert_consistent(memory, rng)
+
+
+def test_duplicates_are_ignored():
+    memory = Memory(index_content=True)
+    message = Message(content="hello world", role="Alice")
+    memory.add(message)
+    memory.add(message)
+    memory.add_batch([message])
+
+    assert memory.count() == 1
+    assert memory.get_by_content("hello") == memory.search("WORLD") == [message]
+
+
+def test_delete_unknown_message_raises():
+    with pytest.raises(ValueError):
+        Memory().delete(Message(content="never added"))
+
+
+def test_find_news():
+    memory = Memory()
+    seen = [Message(content=f"m{i}") for i in range(5)]
+    memory.add_batch(seen)
+    new = Message(content="new")
+
+    assert memory.find_news(seen + [new]) == [new]
+    assert memory.find_news(seen + [new], k=2) == seen[:3] + [new]
+
+
+def test_indexes_are_rebuilt_on_load():
+    memory = Memory(index_content=True)
+    memory.add_batch(
+        [Message(content="snake game", role="Alice", send_to={"Bob"}), Message(content="tests", role="Bob")]
+    )
+
+    loaded = Memory(**memory.model_dump())
+
+    assert [m.content for m in loaded.get_by_role("Alice")] == ["snake game"]
+    assert [m.content for m in loaded.get_by_send_to("Bob")] == ["snake game"]
+    assert [m.content for m in loaded.get_by_content("ake ga")] == ["snake game"]
+    assert [m.content for m in loaded.search("tests")] == ["tests"]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from metagpt.configs.llm_config import LLMConfig, LLMType
+from metagpt.const import LLM_API_TIMEOUT
+from metagpt.provider.ollama_api import OllamaLLM
+
+REPLY = {"message": {"role": "assistant", "content": "hi"}, "done": True, "prompt_eval_count": 3, "eval_count": 1}
+
+
+class StreamResponse:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for line in self.lines:
+            yield line
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def llm(mocker):
+    llm = OllamaLLM(LLMConfig(api_key="-", api_type=LLMType.OLLAMA, base_url="http://ollama.test", model="m"))
+    llm.requests = []
+
+    async def arequest(method, url, params=None, stream=False, request_timeout=None, **kwargs):
+        llm.requests.append({"params": params, "stream": stream, "request_timeout": request_timeout})
+        if stream:
+            return StreamResponse([json.dumps(REPLY).encode()]), None, None
+        return json.dumps(REPLY).encode(), None, None
+
+    mocker.patch.object(llm.client, "arequest", side_effect=arequest)
+    return llm
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_timeout_reaches_request(llm, stream):
+    messages = [{"role": "user", "content": "hello"}]
+
+    assert await llm.acompletion_text(messages, stream=stream, timeout=LLM_API_TIMEOUT + 100) == "hi"
+    assert await llm.acompletion_text(messages, stream=stream) == "hi"
+
+    # the caller's timeout extends the default one, never shortens it
+    assert [r["request_timeout"] for r in llm.requests] == [LLM_API_TIMEOUT + 100, LLM_API_TIMEOUT]
+
+
+@pytest.mark.asyncio
+async def test_acompletion_passes_timeout(llm):
+    await llm.acompletion([{"role": "user", "content": "hello"}], timeout=LLM_API_TIMEOUT + 1)
+
+    assert llm.requests[-1]["request_timeout"] == LLM_API_TIMEOUT + 1
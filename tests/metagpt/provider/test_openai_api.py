@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+from openai import BadRequestError
+
+from metagpt.configs.llm_config import LLMConfig, LLMType
+from metagpt.provider.base_llm import constrain_output
+from metagpt.provider.openai_api import OpenAILLM
+
+SCHEMA = {"title": "Counts (v2)", "type": "object", "properties": {"A": {"type": "integer"}}, "required": ["A"]}
+MESSAGES = [{"role": "user", "content": "count"}]
+
+
+def _llm(model="gpt-4o-mini", api_type=LLMType.OPENAI, **kwargs) -> OpenAILLM:
+    return OpenAILLM(LLMConfig(api_key="-", api_type=api_type, model=model, **kwargs))
+
+
+@pytest.mark.parametrize(
+    "model, constrains",
+    [
+        ("gpt-4o", True),
+        ("gpt-4o-mini", True),
+        ("gpt-4o-2024-08-06", True),
+        ("gpt-4o-2024-05-13", False),  # predates structured outputs
+        ("gpt-4.1-nano", True),
+        ("gpt-5", True),
+        ("o3-mini", True),
+        ("o4-mini", True),
+        ("gpt-4-turbo", False),
+        ("gpt-3.5-turbo", False),
+    ],
+)
+def test_json_schema_gating_per_model(model, constrains):
+    assert _llm(model).constrains_output is constrains
+
+
+def test_json_schema_needs_opt_in_elsewhere():
+    assert not _llm(base_url="http://localhost:8000/v1").constrains_output
+    assert not _llm(api_type=LLMType.AZURE).constrains_output
+    assert _llm("qwen2", base_url="http://localhost:8000/v1", constrained_output=True).constrains_output
+    assert not _llm("gpt-4o", constrained_output=False).constrains_output
+
+
+def test_response_format_follows_the_gating():
+    with constrain_output(SCHEMA):
+        kwargs = _llm("gpt-4o")._cons_kwargs(MESSAGES)
+        assert "response_format" not in _llm("gpt-4-turbo")._cons_kwargs(MESSAGES)
+        assert "response_format" not in _llm("gpt-4o")._cons_kwargs(MESSAGES, tools=[])
+    assert "response_format" not in _llm("gpt-4o")._cons_kwargs(MESSAGES)
+
+    assert kwargs["response_format"] == {
+        "type": "json_schema",
+        "json_schema": {"name": "Counts__v2_", "schema": SCHEMA},
+    }
+
+
+@pytest.mark.asyncio
+async def test_rejected_response_format_is_dropped(mocker):
+    llm = _llm("gpt-4o")
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    rejected = BadRequestError("unsupported response_format", response=httpx.Response(400, request=request), body=None)
+    create = mocker.patch.object(
+        llm.aclient.chat.completions, "create", new_callable=mocker.AsyncMock, side_effect=[rejected, "rsp", "rsp"]
+    )
+
+    with constrain_output(SCHEMA):
+        assert await llm._create_completion(**llm._cons_kwargs(MESSAGES)) == "rsp"
+        assert not llm.constrains_output
+        assert await llm._create_completion(**llm._cons_kwargs(MESSAGES)) == "rsp"
+
+    assert ["response_format" in call.kwargs for call in create.call_args_list] == [True, False, False]
+    assert _llm("gpt-4o").constrains_output  # only that client stops sending it
+
+
+@pytest.mark.asyncio
+async def test_other_bad_requests_are_raised(mocker):
+    llm = _llm("gpt-4-turbo")
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    rejected = BadRequestError("context too long", response=httpx.Response(400, request=request), body=None)
+    mocker.patch.object(llm.aclient.chat.completions, "create", new_callable=mocker.AsyncMock, side_effect=rejected)
+
+    with pytest.raises(BadRequestError):
+        await llm._create_completion(**llm._cons_kwargs(MESSAGES))
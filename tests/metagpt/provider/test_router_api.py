@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import itertools
+
+import aiohttp
+import pytest
+
+from metagpt.configs.llm_config import LLMBackendConfig, LLMConfig, LLMType
+from metagpt.provider.base_llm import BaseLLM
+from metagpt.provider.router_api import RouterLLM, router_stats
+
+_urls = itertools.count()
+
+
+class FakeBackend(BaseLLM):
+    """Replies with its name after streaming `tokens` tokens, then raises `error` if given."""
+
+    def __init__(self, name: str, error: Exception = None, tokens: int = 0):
+        self.name = name
+        self.error = error
+        self.tokens = tokens
+        self.calls = []
+
+    async def acompletion(self, messages, timeout=3):
+        return await self.acompletion_text(messages, timeout=timeout)
+
+    async def acompletion_text(self, messages, stream=False, timeout=3):
+        self.calls.append(timeout)
+        for _ in range(self.tokens):
+            self._stream_token(".")
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+
+def _router(*fakes: FakeBackend, max_concurrency: int = 4) -> RouterLLM:
+    """A router whose backends (fresh urls, as backends are shared process-wide by url) are the given fakes."""
+    backends = [
+        LLMBackendConfig(base_url=f"http://backend-{next(_urls)}.test", max_concurrency=max_concurrency) for _ in fakes
+    ]
+    router = RouterLLM(LLMConfig(api_key="-", api_type=LLMType.ROUTER, model="m", backends=backends))
+    router._clients = {b.base_url: fake for b, fake in zip(backends, fakes)}
+    return router
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error", [aiohttp.ClientConnectionError("refused"), ConnectionRefusedError("refused")], ids=["aiohttp", "os"]
+)
+async def test_fails_over_on_connection_error(error):
+    down, up = FakeBackend("down", error=error), FakeBackend("up")
+    router = _router(down, up)
+
+    assert await router.acompletion_text(MESSAGES, timeout=42) == "up"
+    assert down.calls == [42] and up.calls == [42]
+
+    stats = router_stats()
+    assert stats[router.backends[0].config.base_url]["failures"] == 1
+    assert not stats[router.backends[0].config.base_url]["up"]
+    assert router.last_backend == router.backends[1].config.base_url
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error",
+    [asyncio.TimeoutError(), aiohttp.ServerTimeoutError("slow"), ValueError("bad reply")],
+    ids=["asyncio-timeout", "aiohttp-timeout", "other"],
+)
+async def test_does_not_fail_over_on_other_errors(error):
+    first, second = FakeBackend("first", error=error), FakeBackend("second")
+    router = _router(first, second)
+
+    with pytest.raises(type(error)):
+        await router.acompletion_text(MESSAGES)
+    assert second.calls == []
+
+
+@pytest.mark.asyncio
+async def test_does_not_fail_over_mid_stream():
+    first, second = FakeBackend("first", error=ConnectionResetError("dropped"), tokens=3), FakeBackend("second")
+    router = _router(first, second)
+
+    with pytest.raises(ConnectionResetError):
+        await router.acompletion_text(MESSAGES, stream=True)
+    assert second.calls == []
+
+
+def test_backend_slots_work_across_event_loops():
+    fake = FakeBackend("only")
+    router = _router(fake, max_concurrency=1)
+
+    async def burst():
+        return await asyncio.gather(*(router.acompletion_text(MESSAGES) for _ in range(3)))
+
+    for _ in range(2):  # the second asyncio.run() must not reuse a semaphore bound to the first loop
+        assert asyncio.run(burst()) == ["only"] * 3
+    assert len(fake.calls) == 6
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+
+import pytest
+
+from metagpt.roles import Role  # noqa: F401  # before metagpt.environment, whose models refer to it
+from metagpt.environment.base_env import RoleScheduler
+from metagpt.schema import Message, MessageQueue
+from metagpt.team import Team
+
+
+class _Context:
+    def __init__(self):
+        self.msg_buffer = MessageQueue()
+
+
+class ChainRole:
+    """Answers each message and passes the answer to `next_role`; fails instead when `fail` is set."""
+
+    def __init__(self, name: str, next_role: "ChainRole" = None, fail: bool = False):
+        self.name = name
+        self.next_role = next_role
+        self.fail = fail
+        self.rc = _Context()
+
+    async def run(self):
+        msg = self.rc.msg_buffer.pop()
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        rsp = Message(content=f"{self.name}: {msg.content}", role=self.name)
+        if self.next_role is not None:
+            self.next_role.rc.msg_buffer.push(rsp)
+        return rsp
+
+
+class ChainEnv:
+    def __init__(self):
+        self.roles = {}
+
+    def add_role(self, role):
+        self.roles[role.name] = role
+
+    async def run_until_idle(self, max_round=100, concurrency=None, outputs=None):
+        return await RoleScheduler(self.roles.values(), max_round=max_round, concurrency=concurrency).run(outputs)
+
+
+def _team(fail_last: bool) -> Team:
+    qa = ChainRole("qa", fail=fail_last)
+    dev = ChainRole("dev", next_role=qa)
+    pm = ChainRole("pm", next_role=dev)
+    pm.rc.msg_buffer.push(Message(content="task", role="user"))
+    return Team(roles=[pm, dev, qa], env=ChainEnv())
+
+
+@pytest.mark.asyncio
+async def test_run_until_idle_returns_outputs():
+    outputs = await _team(fail_last=False).run()
+
+    assert [m.content for m in outputs] == ["pm: task", "dev: pm: task", "qa: dev: pm: task"]
+
+
+@pytest.mark.asyncio
+async def test_failed_run_keeps_partial_history(caplog):
+    with caplog.at_level(logging.ERROR, logger="metagpt.team"):
+        outputs = await _team(fail_last=True).run()
+
+    assert [m.content for m in outputs] == ["pm: task", "dev: pm: task"]
+    (record,) = [r for r in caplog.records if r.name == "metagpt.team"]
+    assert record.exc_info and "qa failed" in str(record.exc_info[1])
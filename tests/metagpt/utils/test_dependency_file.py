@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import random
+
+import pytest
+
+from metagpt.utils.dependency_file import DependencyFile
+
+
+def _written(workdir):
+    filename = workdir / ".dependencies.json"
+    return json.loads(filename.read_text()) if filename.exists() else None
+
+
+@pytest.mark.asyncio
+async def test_updates_are_written_once_after_the_delay(tmp_path, mocker):
+    file = DependencyFile(workdir=tmp_path, flush_delay=0.05)
+    replace = mocker.spy(file, "_replace")
+
+    await file.update(tmp_path / "a.py", {tmp_path / "b.py"})
+    await file.update("c.py", {"a.py", "b.py"})
+    await file.update("c.py", {"a.py"})
+    assert _written(tmp_path) is None
+
+    await asyncio.sleep(0.2)
+    assert replace.call_count == 1
+    assert _written(tmp_path) == {"a.py": ["b.py"], "c.py": ["a.py"]}
+    assert not (tmp_path / ".dependencies.json.tmp").exists()
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_pending_updates_now(tmp_path):
+    file = DependencyFile(workdir=tmp_path, flush_delay=60)
+    await file.update("a.py", {"b.py"})
+
+    file.flush()
+
+    assert _written(tmp_path) == {"a.py": ["b.py"]}
+    assert file._flush_task is None
+
+
+@pytest.mark.asyncio
+async def test_get_dependents_matches_a_scan(tmp_path):
+    rng = random.Random(19)
+    names = [f"{i}.py" for i in range(12)]
+    file = DependencyFile(workdir=tmp_path, flush_delay=0)
+    for _ in range(300):
+        await file.update(rng.choice(names), set(rng.sample(names, rng.randint(0, 3))))
+        name = rng.choice(names)
+        expected = {key for key in names if name in await file.get(key)}
+        assert await file.get_dependents(name) == expected
+    file.flush()
+
+    reloaded = DependencyFile(workdir=tmp_path)
+    for name in names:
+        assert await reloaded.get(name) == await file.get(name)
+        assert await reloaded.get_dependents(name) == await file.get_dependents(name)
+
+
+@pytest.mark.asyncio
+async def test_changes_made_by_others_are_picked_up(tmp_path):
+    file = DependencyFile(workdir=tmp_path, flush_delay=0)
+    await file.update("a.py", {"b.py"})
+    file.flush()
+
+    other = DependencyFile(workdir=tmp_path)
+    await other.update("c.py", {"b.py"})
+    other.flush()
+
+    assert await file.get("c.py") == {"b.py"}
+    assert await file.get_dependents("b.py") == {"a.py", "c.py"}
+
+
+@pytest.mark.asyncio
+async def test_delete_file_drops_pending_updates(tmp_path):
+    file = DependencyFile(workdir=tmp_path, flush_delay=0.05)
+    await file.update("a.py", {"b.py"})
+
+    file.delete_file()
+    await asyncio.sleep(0.1)
+
+    assert not file.exists
+    assert await file.get_dependents("b.py") == set()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import random
+import shutil
+
+import pytest
+
+from metagpt.utils.git_repository import ChangeType, GitRepository
+
+GITIGNORE = "__pycache__\n*.pyc\nbuild/\n/top.txt\nlogs/\n!logs/\ndata/*\n!data/keep/\n"
+
+
+def _git_status(repo: GitRepository):
+    """What `git status` reports, as `changed_files` would."""
+    changed = {i: ChangeType.UNTRACTED for i in repo._repository.untracked_files}
+    changed.update({d.a_path: ChangeType(d.change_type) for d in repo._repository.index.diff(None)})
+    return changed
+
+
+def _write(path, content="z"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = GitRepository(tmp_path / "repo", auto_init=True)
+    (repo.workdir / ".gitignore").write_text(GITIGNORE)
+    repo.open(repo.workdir)
+    yield repo
+    repo.delete_repository()
+
+
+def test_gitignore_anchoring_and_negation(repo):
+    workdir = repo.workdir
+    for rel in ["top.txt", "src/top.txt", "logs/a.txt", "data/x.txt", "data/keep/y.txt", "src/build/o.txt", "a.pyc"]:
+        _write(workdir / rel)
+
+    assert repo.is_ignored(workdir / "top.txt")
+    assert not repo.is_ignored(workdir / "src/top.txt")
+    assert not repo.is_ignored(f"{workdir}/logs/")
+    assert repo.is_ignored(workdir / "data/x.txt")
+    assert not repo.is_ignored(f"{workdir}/data/keep/")
+    assert repo.is_ignored(f"{workdir}/src/build/")
+    expected = {".gitignore", "src/top.txt", "logs/a.txt", "data/keep/y.txt"}
+    assert set(repo.changed_files) == set(_git_status(repo)) == expected
+
+
+@pytest.mark.asyncio
+async def test_changed_files_matches_git_status(repo):
+    workdir = repo.workdir
+    file_repo = repo.new_file_repository("src")
+    for i in range(50):
+        await file_repo.save(f"p{i % 5}/m{i}.py", f"x={i}\n")
+    assert repo.changed_files == _git_status(repo)
+    repo.archive()
+    assert repo.changed_files == _git_status(repo) == {}
+
+    rng = random.Random(20)
+    for step in range(30):
+        for _ in range(10):
+            i = rng.randrange(80)
+            rel = f"p{i % 7}/m{i}.py"
+            path = workdir / "src" / rel
+            op = rng.random()
+            if op < 0.2:
+                await file_repo.save(rel, f"y={rng.random()}\n")
+            elif op < 0.4:
+                _write(path, f"z={rng.randrange(3)}\n")
+            elif op < 0.5 and path.exists():
+                await file_repo.delete(rel)
+            elif op < 0.6 and path.exists():
+                path.unlink()
+            elif op < 0.7 and path.exists():
+                path.write_text(f"x={i}\n")  # back to the committed content
+            elif op < 0.75 and path.parent.exists():
+                shutil.rmtree(path.parent)
+            elif op < 0.8:
+                _write(path.parent / "build/b.txt")
+            elif op < 0.85:
+                _write(path.parent / f"deep/er/f{i}.txt")
+        assert repo.changed_files == _git_status(repo), step
+        if step % 10 == 9:
+            repo.archive()
+            assert repo.changed_files == {}
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from metagpt.configs.llm_config import LLMConfig, LLMType
+from metagpt.provider.base_llm import BaseLLM, cache_sample
+from metagpt.utils import response_cache
+from metagpt.utils.response_cache import (
+    MemoryLRUBackend,
+    ResponseCache,
+    SQLiteBackend,
+    make_cache_key,
+)
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class CountingLLM(BaseLLM):
+    """Replies with the number of calls made so far."""
+
+    def __init__(self, config: LLMConfig):
+        self.config = config
+        self.model = config.model
+        self.calls = 0
+
+    async def acompletion(self, messages, timeout=3):
+        raise NotImplementedError
+
+    async def acompletion_text(self, messages, stream=False, timeout=3):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+
+def _llm(tmp_path, temperature: float) -> CountingLLM:
+    config = LLMConfig(
+        api_key="-",
+        api_type=LLMType.OLLAMA,
+        model="m",
+        temperature=temperature,
+        cache=True,
+        cache_path=str(tmp_path / "cache.db"),
+    )
+    return CountingLLM(config)
+
+
+@pytest.mark.asyncio
+async def test_greedy_requests_are_cached(tmp_path):
+    llm = _llm(tmp_path, temperature=0)
+
+    assert await llm.aask("hello", stream=False) == await llm.aask("  hello ", stream=False) == "reply 1"
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_are_cached_per_sample_only(tmp_path):
+    llm = _llm(tmp_path, temperature=0.8)
+
+    # without a sample id every call is a new sample
+    assert [await llm.aask("hello", stream=False) for _ in range(2)] == ["reply 1", "reply 2"]
+
+    replies = []
+    for _ in range(2):
+        for sample_id in range(3):
+            with cache_sample(sample_id):
+                replies.append(await llm.aask("hello", stream=False))
+    assert replies == ["reply 3", "reply 4", "reply 5"] * 2
+    assert llm.calls == 5
+
+
+def test_key_covers_model_params_and_messages():
+    base = make_cache_key("ollama", "m", MESSAGES, {"temperature": 0})
+
+    named = [{"role": "user", "content": "hello\n", "name": "x"}]
+    assert base == make_cache_key("ollama", "m", named, {"temperature": 0})
+    assert base != make_cache_key("ollama", "m2", MESSAGES, {"temperature": 0})
+    assert base != make_cache_key("openai", "m", MESSAGES, {"temperature": 0})
+    assert base != make_cache_key("ollama", "m", MESSAGES, {"temperature": 0, "sample": 1})
+    assert base != make_cache_key("ollama", "m", [{"role": "system", "content": "hello"}], {"temperature": 0})
+
+
+def test_ttl(mocker):
+    now = [1000.0]
+    mocker.patch.object(response_cache.time, "time", side_effect=lambda: now[0])
+    cache = ResponseCache([MemoryLRUBackend()], ttl=60)
+    cache.set("k", "v")
+
+    now[0] += 59
+    assert cache.get("k") == "v"
+    now[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_lru_eviction():
+    backend = MemoryLRUBackend(max_entries=2)
+    backend.set("a", "1", 0)
+    backend.set("b", "2", 0)
+    backend.get("a")
+    backend.set("c", "3", 0)
+
+    assert backend.get("b") is None and backend.get("a") and backend.get("c")
+    assert backend.evictions == 1
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path, mocker):
+    now = [1000.0]
+    mocker.patch.object(response_cache.time, "time", side_effect=lambda: now[0])
+    backend = SQLiteBackend(tmp_path / "cache.db", max_size_bytes=25)
+    for key in "abc":
+        now[0] += 1
+        backend.set(key, "x" * 10, now[0])
+    assert backend.get("a") is None  # 30 bytes > 25: the oldest went
+    now[0] += 1
+    backend.get("b")  # b is now more recent than c
+
+    now[0] += 1
+    backend.set("d", "x" * 10, now[0])
+
+    assert backend.get("c") is None
+    assert backend.get("b") and backend.get("d")
+    assert backend.size_bytes == 20 and backend.evictions == 2
+    backend.close()
+
+    reopened = SQLiteBackend(tmp_path / "cache.db", max_size_bytes=25)
+    assert reopened.size_bytes == 20 and reopened.get("b")[0] == "x" * 10
+    reopened.close()
+
+
+def test_disk_hits_are_promoted(tmp_path):
+    memory, disk = MemoryLRUBackend(), SQLiteBackend(tmp_path / "cache.db")
+    ResponseCache([MemoryLRUBackend(), disk]).set("k", "v")  # e.g. written by an earlier run
+    cache = ResponseCache([memory, disk])
+
+    assert cache.get("k") == "v" and memory.get("k")[0] == "v"
+    assert cache.stats()["tiers"][1]["hits"] == 1
+    disk.close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import gc
+import os
+import sys
+import time
+
+import pytest
+
+from metagpt.utils.script_runner import ScriptRunner
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="warm interpreters need fork")
+
+
+def _exited(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    return False
+
+
+async def _run_warm(runner: ScriptRunner, workdir) -> tuple:
+    (workdir / "hello.py").write_text("print('hello')\n")
+    stdout, _ = await runner.run([sys.executable, "hello.py"], str(workdir), dict(os.environ), timeout=30)
+    assert stdout.strip() == "hello"
+    (worker,) = runner._workers.values()
+    assert worker.alive and os.path.isdir(worker._outdir)
+    return worker._process.pid, worker._outdir
+
+
+@pytest.mark.asyncio
+async def test_aclose_reaps_warm_worker(tmp_path):
+    runner = ScriptRunner()
+    pid, outdir = await _run_warm(runner, tmp_path)
+
+    await runner.aclose()
+
+    assert _exited(pid)
+    assert not os.path.exists(outdir)
+    assert not runner._workers
+
+
+# asyncio complains when the transport of a subprocess outliving its loop is collected
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+def test_close_after_loop_ended_reaps_warm_worker(tmp_path):
+    runner = ScriptRunner()
+    pid, outdir = asyncio.run(_run_warm(runner, tmp_path))
+
+    runner.close()  # as at exit, once asyncio.run() closed the loop
+
+    deadline = time.monotonic() + 5
+    while not _exited(pid) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _exited(pid)
+    assert not os.path.exists(outdir)
+    del runner  # let asyncio warn about the orphaned transport here, where it is ignored
+    gc.collect()
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_script(tmp_path):
+    runner = ScriptRunner()
+    (tmp_path / "slow.py").write_text("import time\nprint('start', flush=True)\ntime.sleep(60)\n")
+    try:
+        start = time.monotonic()
+        stdout, _ = await runner.run([sys.executable, "slow.py"], str(tmp_path), dict(os.environ), timeout=0.5)
+        assert time.monotonic() - start < 10
+        assert stdout.strip() == "start"
+    finally:
+        await runner.aclose()
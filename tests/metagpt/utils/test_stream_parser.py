@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from functools import partial
+
+import pytest
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.provider.base_llm import _STREAM_ABORTED, BaseLLM, observe_stream
+from metagpt.utils.stream_parser import StreamingJSONParser
+
+SCHEMA = {
+    "properties": {"Answer": {"type": "integer"}, "Reason": {"type": "string"}, "Steps": {"type": "array"}},
+    "required": ["Answer", "Reason"],
+}
+
+
+def _feed(parser: StreamingJSONParser, text: str, size: int = 3) -> str:
+    """Feed `text` in chunks until the parser stops, returning what was fed."""
+    for i in range(0, len(text), size):
+        if not parser.feed(text[i : i + size]):
+            return text[: i + size]
+    return text
+
+
+class RetryingLLM(BaseLLM):
+    """Streams each of `attempts` in turn, like a provider retrying a failed stream."""
+
+    def __init__(self, attempts: list):
+        self.config = LLMConfig(api_key="-", model="fake")
+        self.attempts = attempts
+
+    async def acompletion(self, messages: list[dict], timeout=3):
+        raise NotImplementedError
+
+    async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
+        for attempt in self.attempts:
+            self._stream_begin()
+            streamed = []
+            for token in attempt:
+                streamed.append(token)
+                if not self._stream_token(token):
+                    break
+        return "".join(streamed)
+
+
+def test_stops_once_the_object_is_complete():
+    parser = StreamingJSONParser(SCHEMA)
+    text = 'Sure!\n```json\n{"Answer": 42, "Reason": "a } and \\" {", "Steps": [1, {"x": "]"}]}\n```\nAnything else?'
+
+    fed = _feed(parser, text)
+
+    assert fed.rstrip("`\n").endswith("}") and len(fed) < len(text)
+    assert parser.complete and parser.exact and parser.error is None
+    assert parser.fields == {"Answer": 42, "Reason": 'a } and " {', "Steps": [1, {"x": "]"}]}
+    assert parser.feed("more") is False
+
+
+def test_stops_on_prose_without_json():
+    parser = StreamingJSONParser(SCHEMA, max_preamble=50)
+
+    fed = _feed(parser, "I cannot answer this, because " * 10)
+
+    assert parser.error and not parser.complete
+    assert 50 < len(fed) < 100
+
+
+def test_skips_echoed_and_incomplete_objects():
+    parser = StreamingJSONParser(SCHEMA)
+    text = 'Fill in {placeholder}, e.g. {"Answer": 1}. Here: {"Answer": 2, "Reason": "r"} trailing'
+
+    _feed(parser, text)
+
+    assert parser.complete and parser.fields == {"Answer": 2, "Reason": "r"}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"Answer": "3", "Reason": "r"}',  # a string for an integer
+        '{"Answer": true, "Reason": "r"}',  # bools are not numbers
+        '{answer: 3, "Reason": "r"}',  # unquoted key
+        '{"answer": 3, "Reason": "r"}',  # case-insensitive match
+        '{"Answer": 3, "Reason": "r", "Extra": 1}',
+        '{"Answer": 3,}',
+    ],
+)
+def test_inexact_objects_do_not_stop_the_generation(text):
+    parser = StreamingJSONParser(SCHEMA)
+
+    assert _feed(parser, text + " and more") == text + " and more"
+    assert not parser.complete and parser.error is None
+
+
+@pytest.mark.asyncio
+async def test_each_attempt_gets_a_new_parser():
+    _STREAM_ABORTED.set(False)
+    complete = '{"Answer": 1, "Reason": "r"} bye'
+    llm = RetryingLLM([list('{"Answer": 1, "Rea'), list(complete)])
+    parsers = []
+
+    def factory():
+        parsers.append(StreamingJSONParser(SCHEMA))
+        return parsers[-1]
+
+    with observe_stream(factory) as stream:
+        rsp = await llm.acompletion_text([{"role": "user", "content": "q"}], stream=True)
+
+    assert rsp == complete[: complete.index("}") + 1]
+    assert len(parsers) == 2 and not parsers[0].complete
+    assert stream.finished and stream.observer is parsers[1]
+    assert stream.observer.fields == {"Answer": 1, "Reason": "r"}
+    assert not _STREAM_ABORTED.get()
+
+
+@pytest.mark.asyncio
+async def test_stopping_on_an_error_aborts_the_reply():
+    _STREAM_ABORTED.set(False)
+    llm = RetryingLLM([list("no json here, " * 20)])
+
+    with observe_stream(partial(StreamingJSONParser, SCHEMA, max_preamble=20)) as stream:
+        await llm.acompletion_text([{"role": "user", "content": "q"}], stream=True)
+
+    assert not stream.finished and stream.observer.error
+    assert _STREAM_ABORTED.get()
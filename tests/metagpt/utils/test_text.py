@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import random
+import re
+
+import pytest
+
+from metagpt.utils.text import iter_text_chunks
+from metagpt.utils.token_counter import count_tokens, register_tokenizer
+
+
+class WordTokenizer:
+    """Tokenizer without `decode_with_offsets`: words of up to 3 characters, whitespace runs and single symbols."""
+
+    PATTERN = re.compile(r"\w{1,3}|\s+|[^\w\s]")
+
+    def encode(self, text):
+        return self.PATTERN.findall(text)
+
+    def encode_batch(self, texts, num_threads=8):
+        return [self.encode(t) for t in texts]
+
+
+register_tokenizer("test-words", WordTokenizer)
+
+WORDS = ["a", "lorem", "ipsum", "tokenization", "x1", "测试文本", "Hello,", "world.", "end;", "\n", "  ", "\t"]
+
+
+def _random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(WORDS) + rng.choice(["", " "]) for _ in range(rng.randint(0, 300)))
+
+
+def _tokenizer_available(model_name) -> bool:
+    try:
+        count_tokens("probe", model_name)
+    except Exception:  # cl100k_base is downloaded on first use
+        return False
+    return True
+
+
+@pytest.mark.parametrize("model_name", [None, "test-words"])
+def test_iter_text_chunks_fit_budget(model_name):
+    if not _tokenizer_available(model_name):
+        pytest.skip(f"tokenizer of {model_name} unavailable")
+    rng = random.Random(0)
+    for _ in range(200):
+        text = _random_text(rng)
+        max_token = rng.randint(1, 40)
+        chunks = list(iter_text_chunks(text, max_token, model_name))
+        assert "".join(chunks) == text
+        for chunk in chunks:
+            assert count_tokens(chunk, model_name) <= max_token
+
+
+def test_iter_text_chunks_no_boundaries():
+    text = "abcdefghij" * 50
+    chunks = list(iter_text_chunks(text, 10, "test-words"))
+    assert "".join(chunks) == text
+    assert all(count_tokens(c, "test-words") <= 10 for c in chunks)
+
+
+@pytest.mark.parametrize("max_token", [0, -1])
+def test_iter_text_chunks_rejects_empty_budget(max_token):
+    with pytest.raises(ValueError):
+        list(iter_text_chunks("some text", max_token))